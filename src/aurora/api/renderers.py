@@ -0,0 +1,35 @@
+from django.conf import settings
+
+import orjson
+from rest_framework import renderers
+
+from aurora.core.utils import JSON_OPTIONS
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer encoding with orjson.
+
+    `encoder_class.default` is used for the types orjson does not handle, so the output matches
+    the stdlib renderer. Indented output (BrowsableAPI, `; indent=`), `ensure_ascii` and payloads
+    orjson refuses fall back to the stdlib renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if (
+            settings.JSON_FAST_ENCODER
+            and self.compact
+            and not self.ensure_ascii
+            and self.get_indent(accepted_media_type, renderer_context or {}) is None
+        ):
+            try:
+                ret = orjson.dumps(data, default=self.encoder_class().default, option=JSON_OPTIONS)
+            except orjson.JSONEncodeError:
+                pass
+            else:
+                # same as rest_framework: escape \u2028 and \u2029 to output a strict javascript subset
+                if b"\xe2\x80" in ret:
+                    ret = ret.replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
+                return ret
+        return super().render(data, accepted_media_type, renderer_context)
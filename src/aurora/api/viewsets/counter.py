@@ -30,11 +30,13 @@ class CounterViewSet(SmartViewSet):
         detail=False, permission_classes=[AllowAny], authentication_classes=[], throttle_classes=[ScopedRateThrottle2]
     )
     def refresh(self, request):
-        Counter.objects.collect()
+        from aurora.tasks import collect_counters
+
+        collect_counters.delay()
         latest = Counter.objects.latest()
         return Response(
             {
-                "message": "Done",
+                "message": "Scheduled",
                 "latest": latest.day,
             }
         )
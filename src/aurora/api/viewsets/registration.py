@@ -1,25 +1,34 @@
-import csv
-import io
+import base64
+import json
 import logging
 import os
+import time
 from collections import OrderedDict
+from tempfile import TemporaryFile
 from urllib import parse
 
-from django.http import HttpRequest, HttpResponse
+from django.conf import settings
+from django.db.models import Q
+from django.http import FileResponse, HttpRequest, StreamingHttpResponse
 from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
 
 from django_filters import rest_framework as filters
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.exceptions import PermissionDenied
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import ParseError, PermissionDenied
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.permissions import AllowAny
-from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
-from ...core.utils import build_dict, get_etag, get_session_id
-from ...registration.models import Record, Registration
+from ...core.db import get_read_db, read_only, read_only_view
+from ...core.utils import get_etag, get_session_id
+from ...registration.admin.paginator import estimate_count
+from ...registration.export import enqueue_export, ExportLimitExceeded, ExportNotSupported, RecordExport
+from ...registration.models import get_watermark, Record, Registration
+from ..renderers import JSONRenderer
 from ..serializers import RegistrationDetailSerializer, RegistrationListSerializer
 from ..serializers.record import DataTableRecordSerializer
 from .base import SmartViewSet
@@ -42,6 +51,64 @@ class RecordPageNumberPagination(PageNumberPagination):
         )
 
 
+class RecordCursorPagination(BasePagination):
+    """Keyset pagination on (timestamp, id).
+
+    Pages cost the same whatever their depth: no COUNT(*) and no OFFSET.
+    `next` is an opaque cursor encoding the position of the last record returned.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "size"
+    page_size = 100
+    max_page_size = 1000
+
+    @staticmethod
+    def encode_cursor(timestamp, pk):
+        return base64.urlsafe_b64encode(json.dumps([timestamp.isoformat(), pk]).encode()).decode()
+
+    @staticmethod
+    def decode_cursor(value):
+        try:
+            timestamp, pk = json.loads(base64.urlsafe_b64decode(value.encode()))
+            if (timestamp := parse_datetime(timestamp)) is None:
+                raise ValueError(value)
+            return timestamp, int(pk)
+        except (TypeError, ValueError):
+            raise ParseError("Invalid cursor")
+
+    def get_page_size(self, request):
+        try:
+            return max(1, min(int(request.query_params[self.page_size_query_param]), self.max_page_size))
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        size = self.get_page_size(request)
+        queryset = queryset.order_by("timestamp", "id")
+        if cursor := request.query_params.get(self.cursor_query_param):
+            timestamp, pk = self.decode_cursor(cursor)
+            # `timestamp__gte` lets the (registration, timestamp, id) index bound the scan
+            queryset = queryset.filter(timestamp__gte=timestamp).filter(
+                Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=pk)
+            )
+        rows = list(queryset[: size + 1])
+        self.next_cursor = None
+        if len(rows) > size:
+            rows = rows[:size]
+            self.next_cursor = self.encode_cursor(rows[-1]["timestamp"], rows[-1]["id"])
+        return rows
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([("next", self.get_next_link()), ("results", data)]))
+
+
 class RecordFilter(filters.FilterSet):
     start_date = filters.DateFilter(field_name="timestamp", lookup_expr="gte")
 
@@ -73,7 +140,13 @@ class RegistrationViewSet(SmartViewSet):
     @action(detail=True, permission_classes=[AllowAny])
     def metadata(self, request, pk=None):
         reg: Registration = self.get_object()
-        return Response(reg.metadata)
+        etag = get_etag(request, reg.metadata_signature)
+        response = get_conditional_response(request, etag)
+        if response is None:
+            response = Response(reg.metadata)
+        response.headers.setdefault("ETag", etag)
+        response.headers.setdefault("Cache-Control", "no-cache")
+        return response
 
     @action(detail=True, permission_classes=[AllowAny], url_path="((?P<language>[a-z-]*)/)*version")
     def version1(self, request, pk, language=""):
@@ -100,41 +173,65 @@ class RegistrationViewSet(SmartViewSet):
         obj: Registration = self.get_object()
         if not request.user.has_perm("registration.view_data", obj):
             raise PermissionDenied()
+        watermark = get_watermark(obj.pk)
         self.res_etag = get_etag(
             request,
             str(obj.active),
             str(obj.version),
             os.environ.get("BUILD_DATE", ""),
+            watermark,
         )
         response = get_conditional_response(request, str(self.res_etag))
         if response is None:
-            queryset = (
-                Record.objects.defer(
-                    "files",
-                    "storage",
-                )
-                .filter(registration=obj)
-                .values()
-            )
-            flt = RecordFilter(request.GET, queryset=queryset)
-            if flt.form.is_valid():
-                queryset = flt.filter_queryset(queryset)
-            page = self.paginate_queryset(queryset)
-
-            if page is None:
-                serializer = DataTableRecordSerializer(
-                    queryset, many=True, context={"request": request}, metadata=obj.metadata
-                )
-                return Response(serializer.data, status=status.HTTP_200_OK)
-            else:
-                serializer = DataTableRecordSerializer(
-                    page, many=True, context={"request": request}, metadata=obj.metadata
-                )
-                response = self.get_paginated_response(serializer.data)
+            with read_only(self.watermark_max_lag(watermark)):
+                response = self._records(request, obj)
         response.headers.setdefault("ETag", self.res_etag)
-        response.headers.setdefault("Cache-Control", "private, max-age=120")
+        response.headers.setdefault("Cache-Control", "private, no-cache")
         return response
 
+    @staticmethod
+    def watermark_max_lag(watermark):
+        """a replica older than the last change would be cached under the new ETag: read from `default`"""
+        return max(0, min(settings.READ_ONLY_MAX_LAG, (time.time_ns() - watermark) / 1e9))
+
+    def _records(self, request, obj):
+        queryset = (
+            Record.objects.defer(
+                "files",
+                "storage",
+            )
+            .filter(registration=obj)
+            .values()
+        )
+        flt = RecordFilter(request.GET, queryset=queryset)
+        if flt.form.is_valid():
+            queryset = flt.filter_queryset(queryset)
+        if "cursor" in request.GET:
+            self._paginator = RecordCursorPagination()
+        page = self.paginate_queryset(queryset)
+
+        if page is None:
+            serializer = DataTableRecordSerializer(
+                queryset, many=True, context={"request": request}, metadata=obj.metadata
+            )
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        else:
+            serializer = DataTableRecordSerializer(page, many=True, context={"request": request}, metadata=obj.metadata)
+            return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, url_path="records/count")
+    @read_only_view()
+    def records_count(self, request, pk=None):
+        obj: Registration = self.get_object()
+        if not request.user.has_perm("registration.view_data", obj):
+            raise PermissionDenied()
+        queryset = Record.objects.filter(registration=obj)
+        flt = RecordFilter(request.GET, queryset=queryset)
+        if flt.form.is_valid():
+            queryset = flt.filter_queryset(queryset)
+        count, estimated = estimate_count(queryset)
+        return Response({"count": count, "estimated": estimated})
+
     @action(detail=True)
     def csv(self, request: HttpRequest, pk):
         """
@@ -162,6 +259,17 @@ class RegistrationViewSet(SmartViewSet):
         }
         """
         reg: Registration = self.get_object()
+        watermark = get_watermark(reg.pk)
+        etag = get_etag(request, str(reg.version), os.environ.get("BUILD_DATE", ""), watermark)
+        response = get_conditional_response(request, etag)
+        if response is None:
+            response = self._csv(request, reg, get_read_db(self.watermark_max_lag(watermark)))
+        if response.status_code == 200:
+            response.headers.setdefault("ETag", etag)
+            response.headers.setdefault("Cache-Control", "private, no-cache")
+        return response
+
+    def _csv(self, request, reg, using):
         from aurora.core.forms import CSVOptionsForm, DateFormatsForm
         from aurora.registration.forms import RegistrationExportForm
 
@@ -176,29 +284,17 @@ class RegistrationViewSet(SmartViewSet):
                             frm.cleaned_data[k] = frm.defaults[k]
                 filters, exclude = form.cleaned_data["filters"]
                 include_fields = form.cleaned_data["include"]
-                exclude_fields = form.cleaned_data["exclude"]
-                qs = (
-                    Record.objects.filter(registration__pk=pk)
-                    .defer(
-                        "storage",
-                        "counters",
-                        "files",
-                    )
-                    .filter(**filters)
-                    .exclude(**exclude)
-                    .values("fields", "id", "ignored", "timestamp", "registration_id")
+                export = RecordExport(
+                    reg,
+                    filters=filters,
+                    exclude=exclude,
+                    include_fields=include_fields,
+                    exclude_fields=form.cleaned_data["exclude"],
+                    using=using,
+                    **fmt_form.cleaned_data,
                 )
-                if qs.count() >= 5000:
-                    raise Exception("Too many records please change your filters. (max 5000)")
-                skipped = []
-                all_fields = []
-                records = [build_dict(r, **fmt_form.cleaned_data) for r in qs]
-                for r in records:
-                    for field_name in r.keys():
-                        if field_name not in skipped and field_name in exclude_fields:
-                            skipped.append(field_name)
-                        elif field_name not in all_fields and field_name in include_fields:
-                            all_fields.append(field_name)
+                export.check_limit()
+                all_fields, skipped = export.get_fieldnames()
                 csv_options = opts_form.cleaned_data
                 add_header = csv_options.pop("header")
                 date_format = csv_options.pop("date_format")  # noqa
@@ -211,21 +307,8 @@ class RegistrationViewSet(SmartViewSet):
                     else:
                         headers = {"Content-Disposition": 'attachment;filename="%s"' % filename}
 
-                    out = io.StringIO()
-                    writer = csv.DictWriter(
-                        out,
-                        fieldnames=all_fields,
-                        restval="-",
-                        extrasaction="ignore",
-                        **csv_options,
-                    )
-                    if add_header:
-                        writer.writeheader()
-                    writer.writerows(records)
-                    out.seek(0)
-                    content = out.read()
-                    return HttpResponse(
-                        content,
+                    return StreamingHttpResponse(
+                        export.iter_csv(all_fields, add_header, **csv_options),
                         headers=headers,
                         content_type="text/plain",
                     )
@@ -244,7 +327,7 @@ class RegistrationViewSet(SmartViewSet):
                                 "preview": request.build_absolute_uri(
                                     "?preview=1&" + parse.urlencode(request.GET.dict(), doseq=False)
                                 ),
-                                "count": qs.count(),
+                                "count": export.count(),
                                 "filters": filters,
                                 "exclude": exclude,
                                 "include_fields": [r.pattern for r in include_fields],
@@ -264,6 +347,47 @@ class RegistrationViewSet(SmartViewSet):
                         "csv": opts_form.errors,
                     }
                 )
+        except ExportLimitExceeded as e:
+            return Response({"message": str(e)}, status=400)
         except Exception as e:
             logger.exception(e)
             return Response({"message": "Error"}, status=500)
+
+    @action(detail=True)
+    def parquet(self, request: HttpRequest, pk):
+        """
+        Same filters as `csv` (`filters`, `include`, `exclude`).
+        Returns a single .parquet file or, if the registration has formsets,
+        a zip with one .parquet file per table.
+        Exports larger than EXPORT_SYNC_MAX_RECORDS are scheduled as ExportJob (202)
+        """
+        reg: Registration = self.get_object()
+        if not request.user.has_perm("registration.view_data", reg):
+            raise PermissionDenied()
+        from aurora.registration.forms import RegistrationExportForm
+        from aurora.registration.parquet import ParquetExport
+
+        form = RegistrationExportForm(request.GET, initial=RegistrationExportForm.defaults)
+        if not form.is_valid():
+            return Response({"form": form.errors}, status=400)
+        filters, exclude = form.cleaned_data["filters"]
+        export = ParquetExport(
+            reg,
+            filters=filters,
+            exclude=exclude,
+            include_fields=form.cleaned_data["include"],
+            exclude_fields=form.cleaned_data["exclude"],
+            using=get_read_db(),
+        )
+        try:
+            ParquetExport.check_registration(reg)
+            export.check_limit()
+        except (ExportLimitExceeded, ExportNotSupported) as e:
+            return Response({"message": str(e)}, status=400)
+        if export.count() > settings.EXPORT_SYNC_MAX_RECORDS:
+            job = enqueue_export(reg, request.user, {**request.GET.dict(), "format": "parquet"})
+            return Response({"job": job.pk, "status": job.status}, status=status.HTTP_202_ACCEPTED)
+        out = TemporaryFile()
+        filename = export.to_file(out)
+        out.seek(0)
+        return FileResponse(out, as_attachment=True, filename=filename)
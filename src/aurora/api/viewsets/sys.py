@@ -3,8 +3,7 @@ import os
 from django.conf import settings
 from django.http import JsonResponse
 
-from constance import config
-
+from aurora.core.snapshot import get_config
 from aurora.core.utils import has_token
 
 
@@ -15,7 +14,7 @@ def system_info(request):
         "debug": settings.DEBUG,
         "env": settings.SMART_ADMIN_HEADER,
         "sentry_dsn": settings.SENTRY_DSN,
-        "cache": config.CACHE_VERSION,
+        "cache": get_config().CACHE_VERSION,
         "has_token": has_token(request),
     }
     return JsonResponse(data)
@@ -43,14 +43,23 @@ OPTIONS = {
     "AZURE_POLICY_NAME": (str, ""),
     "AZURE_TENANT_ID": (str, ""),
     "AZURE_TENANT_KEY": (str, ""),
+    "CACHE_LOCAL_MAX_ENTRIES": (int, 1000),
+    "CACHE_LOCAL_TIMEOUT": (int, 60),
     "CAPTCHA_TEST_MODE": (bool, "false"),
     "TRANSLATOR_SERVICE": (str, ""),
     "AZURE_TRANSLATOR_KEY": (str, ""),
     "AZURE_TRANSLATOR_LOCATION": (str, ""),
+    "CELERY_BROKER_URL": (str, "redis://localhost:6379/0"),
+    "CELERY_TASK_ALWAYS_EAGER": (bool, False),
     "CONSTANCE_DATABASE_CACHE_BACKEND": (str, ""),
+    "CONSTANCE_SNAPSHOT_INTERVAL": (int, 5),
     "CORS_ALLOWED_ORIGINS": (list, []),
+    "COUNTERS_COLLECT_INTERVAL": (int, 60 * 15),
+    "COUNTERS_FLUSH_INTERVAL": (int, 60),
+    "COUNTERS_LIVE": (bool, True),
     "CSP_REPORT_ONLY": (bool, True),
     "CSRF_COOKIE_NAME": (str, "aurora"),
+    "DATABASE_READ_ONLY_URL": (str, ""),
     "DEBUG": (bool, False),
     "DEBUG_PROPAGATE_EXCEPTIONS": (bool, False),
     "DEFAULT_FILE_STORAGE": (str, "django.core.files.storage.FileSystemStorage"),
@@ -64,18 +73,34 @@ OPTIONS = {
     "EMAIL_USE_LOCALTIME": (bool, False),
     "EMAIL_USE_SSL": (bool, False),
     "EMAIL_USE_TLS": (bool, True),
+    "EXPORT_CHUNK_SIZE": (int, 2000),
+    "EXPORT_MAX_RECORDS": (int, 500000),
+    "EXPORT_SAMPLE_SIZE": (int, 100),
+    "EXPORT_SYNC_MAX_RECORDS": (int, 50000),
+    "FEED_MAX_RECORDS": (int, 100000),
     "FRONT_DOOR_ENABLED": (bool, False),
     "FRONT_DOOR_ALLOWED_PATHS": (str, ".*"),
     "FRONT_DOOR_TOKEN": (str, uuid.uuid4()),
     "FRONT_DOOR_LOG_LEVEL": (str, "ERROR"),
     # "FERNET_KEY": (str, "2jQklRvSAZUdsVOKH-521Wbf_p5t2nTDA0LgD9sgim4="),
+    "I18N_DELTA_RELOAD": (bool, True),
+    "IMAGE_WORKERS": (int, 4),
     "INTERNAL_IPS": (list, ["127.0.0.1", "localhost"]),
+    "JSON_FAST_ENCODER": (bool, True),
     "LANGUAGE_CODE": (str, "en-us"),
     "LOG_LEVEL": (str, "ERROR"),
     "MIGRATION_LOCK_KEY": (str, "django-migrations"),
+    "OFFLINE_BATCH_MAX_RECORDS": (int, 1000),
+    "OFFLINE_BATCH_MAX_SIZE": (int, 50 * 1024 * 1024),
+    "PAGE_CACHE_TTL": (int, 60 * 60),
     "PRODUCTION_SERVER": (str, ""),
     "PRODUCTION_TOKEN": (str, ""),
+    "READ_ONLY_LAG_CHECK": (int, 5),
+    "READ_ONLY_MAX_LAG": (int, 30),
+    "RECORDS_FILE_LOCATION": (str, ""),
+    "RECORDS_FILE_STORAGE": (str, "django.core.files.storage.FileSystemStorage"),
     "REDIS_CONNSTR": (str, ""),
+    "ROLES_CACHE_TTL": (int, 60),
     "ROOT_KEY": (str, uuid.uuid4().hex),
     "ROOT_TOKEN": (str, uuid.uuid4().hex),
     "SECRET_KEY": (str, ""),
@@ -88,8 +113,13 @@ OPTIONS = {
     "SESSION_COOKIE_SECURE": (bool, "false"),
     "SMART_ADMIN_BOOKMARKS": (parse_bookmarks, ""),
     "STATICFILES_STORAGE": (str, "aurora.web.storage.ForgivingManifestStaticFilesStorage"),
+    "SUBMISSION_BATCH_SIZE": (int, 100),
+    "SUBMISSION_SWEEP_INTERVAL": (int, 60),
     "USE_HTTPS": (bool, False),
     "USE_X_FORWARDED_HOST": (bool, "false"),
+    "VALIDATOR_POOL_MAX_MEMORY": (int, 64 * 1024 * 1024),
+    "VALIDATOR_POOL_SIZE": (int, 4),
+    "VALIDATOR_POOL_TIMEOUT": (int, 30),
     "SITE_ID": (int, 1),
     # "CSP_DEFAULT_SRC": (list, ),
     # "CSP_SCRIPT_SRC": (str, None),
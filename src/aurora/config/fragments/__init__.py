@@ -3,6 +3,7 @@ from .admin_sync import *
 from .anymail import *
 from .azure_graph_api import *
 from .capcha import *
+from .celery import *
 from .channels import *
 from .concurrency import *
 from .constance import *
@@ -0,0 +1,22 @@
+from .. import env
+
+CELERY_BROKER_URL = env("CELERY_BROKER_URL")
+CELERY_TASK_ALWAYS_EAGER = env("CELERY_TASK_ALWAYS_EAGER")
+CELERY_TASK_EAGER_PROPAGATES = True
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_ACCEPT_CONTENT = ["json"]
+CELERY_TASK_SERIALIZER = "json"
+CELERY_BEAT_SCHEDULE = {
+    "collect-counters": {
+        "task": "aurora.tasks.collect_counters",
+        "schedule": env("COUNTERS_COLLECT_INTERVAL"),
+    },
+    "flush-live-counters": {
+        "task": "aurora.tasks.flush_live_counters",
+        "schedule": env("COUNTERS_FLUSH_INTERVAL"),
+    },
+    "process-submissions": {
+        "task": "aurora.tasks.process_submissions",
+        "schedule": env("SUBMISSION_SWEEP_INTERVAL"),
+    },
+}
@@ -10,6 +10,8 @@ CONSTANCE_ADDITIONAL_FIELDS = {
 }
 CONSTANCE_BACKEND = "constance.backends.database.DatabaseBackend"
 CONSTANCE_DATABASE_CACHE_BACKEND = env("CONSTANCE_DATABASE_CACHE_BACKEND")
+# max seconds a worker serves constance values changed by another worker (see aurora.core.snapshot)
+CONSTANCE_SNAPSHOT_INTERVAL = env("CONSTANCE_SNAPSHOT_INTERVAL")
 CONSTANCE_CONFIG = OrderedDict(
     {
         "CACHE_FORMS": (False, "", bool),
@@ -15,6 +15,7 @@ SYSINFO = {
     "modules": True,
     "masker": "aurora.config.settings.masker",
     "masked_environment": "API|TOKEN|KEY|SECRET|PASS|SIGNATURE|AUTH|_ID|SID|DATABASE_URL",
+    "extra": {"caches": "aurora.core.cache.cache_stats"},
     # "project": {
     #     "mail": False,
     #     "installed_apps": False,
@@ -119,6 +119,9 @@ TEMPLATE_LOADERS = (
     "django.template.loaders.filesystem.Loader",
     "django.template.loaders.app_directories.Loader",
 )
+if not DEBUG:
+    # compiled templates kept per process, dropped when a database template changes
+    TEMPLATE_LOADERS = (("dbtemplates.loader.CachedLoader", TEMPLATE_LOADERS),)
 
 TEMPLATES = [
     {
@@ -143,7 +146,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
-                "constance.context_processors.config",
+                "aurora.core.snapshot.config",
                 "aurora.i18n.context_processors.itrans",
                 "aurora.web.context_processors.smart",
                 "django.template.context_processors.i18n",
@@ -165,17 +168,26 @@ main_conn = env.db("DATABASE_URL")
 main_conn["CONN_MAX_AGE"] = 60
 main_conn.update({"OPTIONS": {"options": "-c statement_timeout=10000"}})
 
-ro_conn = main_conn.copy()
+if env("DATABASE_READ_ONLY_URL"):
+    ro_conn = env.db("DATABASE_READ_ONLY_URL")
+    ro_conn["CONN_MAX_AGE"] = 60
+else:
+    ro_conn = main_conn.copy()
 ro_conn.update(
     {
         "OPTIONS": {"options": "-c default_transaction_read_only=on"},
         "TEST": {
             "READ_ONLY": True,  # Do not manage this database during tests
+            "MIRROR": "default",
         },
     }
 )
 
 DATABASES = {"default": main_conn, "read_only": ro_conn}
+DATABASE_ROUTERS = ["aurora.core.db.ReadOnlyRouter"]
+# seconds of replica lag tolerated by views reading from `read_only`
+READ_ONLY_MAX_LAG = env("READ_ONLY_MAX_LAG")
+READ_ONLY_LAG_CHECK = env("READ_ONLY_LAG_CHECK")
 
 DEFAULT_AUTO_FIELD = "django.db.models.AutoField"
 
@@ -188,8 +200,16 @@ try:
 except Exception as e:  # pragma: no cover
     logging.exception(e)
 
+# per-process LRU in front of "default" for hot, rarely changing, lookups (see aurora.core.cache.TwoTierCache)
+LOCAL_CACHE = {
+    "BACKEND": "aurora.core.cache.TwoTierCache",
+    "LOCATION": "default",
+    "OPTIONS": {"MAX_ENTRIES": env("CACHE_LOCAL_MAX_ENTRIES"), "LOCAL_TIMEOUT": env("CACHE_LOCAL_TIMEOUT")},
+}
 CACHES = {
     "default": env.cache_url("CACHE_DEFAULT"),
+    "local": LOCAL_CACHE,
+    "dbtemplates": LOCAL_CACHE,
 }
 
 if DEBUG:  # pragma: no cover
@@ -236,6 +256,8 @@ LANGUAGES = (
     ("hi-hi", "हिंदी | Hindi"),  # Hindi
 )
 LOCALE_PATHS = (str(PACKAGE_DIR / "LOCALE"),)
+# reload only changed messages when the "i18n" serial changes
+I18N_DELTA_RELOAD = env("I18N_DELTA_RELOAD")
 
 SESSION_COOKIE_AGE = 60 * 60 * 24 * 7  # 7 days
 # SESSION_COOKIE_DOMAIN = env('SESSION_COOKIE_DOMAIN')
@@ -272,6 +294,11 @@ STORAGES = {
     "staticfiles": {
         "BACKEND": env("STATICFILES_STORAGE"),
     },
+    # files uploaded to registrations using the SaveToStorage strategy
+    "records": {
+        "BACKEND": env("RECORDS_FILE_STORAGE"),
+        "OPTIONS": {"location": env("RECORDS_FILE_LOCATION")} if env("RECORDS_FILE_LOCATION") else {},
+    },
 }
 
 STATICFILES_DIRS = [
@@ -288,6 +315,8 @@ AUTHENTICATION_BACKENDS = [
     # "django.contrib.auth.backends.ModelBackend",
     "social_core.backends.azuread_tenant.AzureADTenantOAuth2",
 ] + env("AUTHENTICATION_BACKENDS")
+# seconds the AuroraRole permissions of a user are cached (invalidated on roles/groups changes)
+ROLES_CACHE_TTL = env("ROLES_CACHE_TTL")
 
 CSRF_COOKIE_NAME = env("CSRF_COOKIE_NAME")
 CSRF_HEADER_NAME = "HTTP_X_CSRFTOKEN"
@@ -373,6 +402,36 @@ DATE_INPUT_FORMATS = [
 
 MAX_OBSERVED = 1
 
+# records export: server side cursor chunk size and max number of records (0: no limit)
+EXPORT_CHUNK_SIZE = env("EXPORT_CHUNK_SIZE")
+EXPORT_MAX_RECORDS = env("EXPORT_MAX_RECORDS")
+EXPORT_SAMPLE_SIZE = env("EXPORT_SAMPLE_SIZE")
+# larger Parquet exports run as ExportJob
+EXPORT_SYNC_MAX_RECORDS = env("EXPORT_SYNC_MAX_RECORDS")
+# max records returned by a single call of the incremental records feed
+FEED_MAX_RECORDS = env("FEED_MAX_RECORDS")
+# limits of a batch of offline (PWA) submissions: max (inflated) body size and number of records
+OFFLINE_BATCH_MAX_SIZE = env("OFFLINE_BATCH_MAX_SIZE")
+OFFLINE_BATCH_MAX_RECORDS = env("OFFLINE_BATCH_MAX_RECORDS")
+# records saved by a single insert of `aurora.tasks.process_submissions` (QueueToDB strategy)
+SUBMISSION_BATCH_SIZE = env("SUBMISSION_BATCH_SIZE")
+# seconds rendered registration pages are cached for anonymous users (0 disables the cache)
+PAGE_CACHE_TTL = env("PAGE_CACHE_TTL")
+
+# encode JSON (records, API, JsonResponse) with orjson. See aurora.core.utils.json_dumpb
+JSON_FAST_ENCODER = env("JSON_FAST_ENCODER")
+
+# threads used to downscale/re-encode submitted images (see aurora.core.images)
+IMAGE_WORKERS = env("IMAGE_WORKERS")
+
+# per-worker pool of V8 contexts used by server side validators
+VALIDATOR_POOL_SIZE = env("VALIDATOR_POOL_SIZE")
+VALIDATOR_POOL_MAX_MEMORY = env("VALIDATOR_POOL_MAX_MEMORY")
+VALIDATOR_POOL_TIMEOUT = env("VALIDATOR_POOL_TIMEOUT")
+
+# hourly submission counters kept in redis and folded into Counter by `aurora.tasks.flush_live_counters`
+COUNTERS_LIVE = env("COUNTERS_LIVE")
+
 
 RATELIMIT = {
     "PERIODS": {
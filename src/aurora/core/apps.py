@@ -10,13 +10,17 @@ class Config(AppConfig):
     name = "aurora.core"
 
     def ready(self):
+        from constance.signals import config_updated
+
         from aurora.core.models import CustomFieldType
         from aurora.core.registry import field_registry
+        from aurora.core.snapshot import on_config_updated
 
         from . import flags  # noqa
         from .handlers import cache_handler
 
         cache_handler()
+        config_updated.connect(on_config_updated, dispatch_uid="constance_snapshot")
         try:
             for field in CustomFieldType.objects.all():
                 try:
@@ -1,8 +1,17 @@
 import logging
-from collections import OrderedDict
+import os
+import pickle
+import re
+import socket
+import threading
+import time
+from collections import defaultdict, OrderedDict
 from functools import wraps
 
-from aurora.state import state
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.utils.functional import cached_property
+from django.utils.translation import get_language
 
 logger = logging.getLogger(__name__)
 
@@ -27,37 +36,326 @@ class Cache(OrderedDict):
             self.popitem(last=False)
 
 
-cache = Cache(size=100)
+class LRUCache(Cache):
+    """Cache that evicts the least recently read entry"""
+
+    def __getitem__(self, key):
+        value = OrderedDict.__getitem__(self, key)
+        try:
+            self.move_to_end(key)
+        except KeyError:  # evicted by another thread
+            pass
+        return value
+
+
+# per-worker compiled FlexForm/FormSet classes
+cache = LRUCache(size=100)
+
+# per-worker Registration.metadata, in front of the shared cache
+metadata_cache = LRUCache(size=100)
+
+FORMS_VERSION_KEY = "forms:version"
+
+
+def get_forms_version():
+    """shared version of what compiled forms depend on besides the FlexForm itself (OptionSet, CustomFieldType)"""
+    return caches["local"].get_or_set(FORMS_VERSION_KEY, time.time_ns, timeout=None)
+
+
+def bump_forms_version():
+    caches["local"].set(FORMS_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def get_formsets_signature(flex_form):
+    """`(formset.pk, formset.version, child.pk, child.version)` of the formsets of `flex_form`, nested ones included"""
+    FormSet = flex_form.formsets.model
+    signature, parents, seen = [], [flex_form.pk], {flex_form.pk}
+    while parents:
+        rows = list(
+            FormSet.objects.filter(parent_id__in=parents, enabled=True)
+            .order_by("pk")
+            .values_list("pk", "version", "flex_form_id", "flex_form__version")
+        )
+        signature.extend(rows)
+        parents = {row[2] for row in rows} - seen
+        seen |= parents
+    return tuple(signature)
 
 
 def cache_form(f):
+    """cache FlexForm.get_form_class() by (pk, version, language, forms version).
+
+    The FlexForm version is bumped each time one of its fields (or field validators) changes,
+    the forms version when an OptionSet (select choices) or a CustomFieldType changes.
+    `get_form_class` also collects fields initial values, they are restored on cache hit.
+    """
+
     @wraps(f)
-    def _inner(*args, **kwargs):
-        key = f"{args[0].pk}-{args[0].version}-{state.request.LANGUAGE_CODE}"
-        if key not in cache:
-            logger.debug("cache missing")
-            ret = f(*args, **kwargs)
-            cache[key] = ret
-        else:
+    def _inner(flex_form):
+        if not flex_form.pk:
+            return f(flex_form)
+        key = (flex_form.pk, flex_form.version, get_language(), get_forms_version())
+        try:
+            form_class, initial = cache[key]
             logger.debug("cache hit")
-
-        return cache[key]
+        except KeyError:
+            logger.debug("cache missing")
+            form_class = f(flex_form)
+            initial = flex_form.get_initial().copy()
+            cache[key] = form_class, initial
+        flex_form._initial.update(initial)
+        return form_class
 
     return _inner
 
 
 def cache_formset(f):
+    """cache FlexForm.get_formsets_classes() by (pk, version, language, forms version) and the formsets signature.
+
+    Changes to a formset or to a (nested) child form do not bump the parent version,
+    the signature (see `get_formsets_signature`) is part of the key to catch them.
+    """
+
     @wraps(f)
-    def _inner(*args, **kwargs):
-        flex_form = args[0].registration.flex_form
-        key = f"{flex_form.pk}-{flex_form.version}-formset-{state.request.LANGUAGE_CODE}"
-        if key not in cache:
+    def _inner(flex_form):
+        if not flex_form.pk:
+            return f(flex_form)
+        signature = get_formsets_signature(flex_form)
+        key = (flex_form.pk, flex_form.version, get_language(), get_forms_version(), "formsets", signature)
+        try:
+            ret = cache[key]
+            logger.debug("cache hit")
+        except KeyError:
             logger.debug("cache missing")
-            ret = f(*args, **kwargs)
+            ret = f(flex_form)
             cache[key] = ret
-        else:
-            logger.debug("cache hit")
-
-        return cache[key]
+        return ret
 
     return _inner
+
+
+PREFIX_RE = re.compile(r"[:.-]")
+
+
+class LocalTier:
+    """Process wide LRU of pickled values shared by the TwoTierCache instances of a channel (one per thread).
+
+    Entries are only stored while the listener is subscribed to the invalidation channel:
+    messages lost while disconnected cannot leave stale entries behind.
+    """
+
+    def __init__(self, size):
+        self.entries = LRUCache(size=size)
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.active = False
+        self.pid = None
+        # prefix: [local hits, remote hits, misses]
+        self.stats = defaultdict(lambda: [0, 0, 0])
+
+    @property
+    def node(self):
+        return f"{os.getpid()}@{socket.gethostname()}"
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                return entry[1]
+        return None
+
+    def set(self, key, blob, timeout, generation):
+        with self.lock:
+            # skip if an invalidation arrived while the value was read from the remote cache
+            if self.active and generation == self.generation:
+                self.entries[key] = (time.monotonic() + timeout, blob)
+
+    def evict(self, key):
+        with self.lock:
+            self.generation += 1
+            if key == "*":
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+
+    def on_message(self, data):
+        node, key = (data.decode() if isinstance(data, bytes) else data).split("|", 1)
+        if node != self.node:
+            self.evict(key)
+
+    def count(self, key, index):
+        self.stats[PREFIX_RE.split(key, 1)[0]][index] += 1
+
+
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    """Per-process LRU in front of another cache alias (LOCATION), usually the redis `default`.
+
+    Writes go to the remote cache and publish the key on a redis channel, the other processes evict it.
+    Entries expire from the local tier after LOCAL_TIMEOUT seconds, whatever the remote timeout is.
+
+        CACHES["local"] = {
+            "BACKEND": "aurora.core.cache.TwoTierCache",
+            "LOCATION": "default",
+            "OPTIONS": {"MAX_ENTRIES": 1000, "LOCAL_TIMEOUT": 60},
+        }
+
+    Without a django_redis remote there is no channel and the local tier is disabled.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._alias = location
+        self.local_timeout = int(options.get("LOCAL_TIMEOUT", 60))
+        self.channel = options.get("CHANNEL", f"cache:invalidate:{location}")
+        with _tiers_lock:
+            self.tier = _tiers.setdefault(self.channel, LocalTier(self._max_entries))
+
+    @cached_property
+    def remote(self):
+        return caches[self._alias]
+
+    def get_connection(self):
+        from django_redis import get_redis_connection
+
+        return get_redis_connection(self._alias)
+
+    def has_channel(self):
+        return type(self.remote).__module__.startswith("django_redis")
+
+    def listen(self):
+        tier = self.tier
+        while True:
+            try:
+                pubsub = self.get_connection().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                tier.active = True
+                for message in pubsub.listen():
+                    tier.on_message(message["data"])
+            except Exception as e:
+                logger.exception(e)
+            tier.active = False
+            tier.evict("*")
+            time.sleep(1)
+
+    def ensure_listener(self):
+        # (re)started in forked workers, threads do not survive fork()
+        tier = self.tier
+        if tier.pid != os.getpid():
+            with _tiers_lock:
+                if tier.pid != os.getpid():
+                    tier.pid = os.getpid()
+                    tier.active = False
+                    tier.evict("*")
+                    if self.has_channel():
+                        threading.Thread(target=self.listen, name="cache-invalidation", daemon=True).start()
+
+    def invalidate(self, key):
+        self.tier.evict(key)
+        if self.has_channel():
+            try:
+                self.get_connection().publish(self.channel, f"{self.tier.node}|{key}")
+            except Exception as e:
+                logger.exception(e)
+
+    def make_key(self, key, version=None):
+        return self.remote.make_key(key, version=version)
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        self.ensure_listener()
+        ret = {}
+        missing = {}
+        for key in keys:
+            local_key = self.make_key(key, version)
+            blob = self.tier.get(local_key)
+            if blob is None:
+                missing[key] = local_key
+            else:
+                self.tier.count(key, 0)
+                ret[key] = pickle.loads(blob)
+        if missing:
+            generation = self.tier.generation
+            found = self.remote.get_many(missing.keys(), version=version)
+            for key, local_key in missing.items():
+                if key in found:
+                    self.tier.count(key, 1)
+                    blob = pickle.dumps(found[key], pickle.HIGHEST_PROTOCOL)
+                    self.tier.set(local_key, blob, self.local_timeout, generation)
+                else:
+                    self.tier.count(key, 2)
+            ret.update(found)
+        return ret
+
+    def has_key(self, key, version=None):
+        return key in self.get_many([key], version=version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.remote.set(key, value, timeout=timeout, version=version)
+        self.invalidate(self.make_key(key, version))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.remote.add(key, value, timeout=timeout, version=version)
+        if added:
+            self.invalidate(self.make_key(key, version))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.remote.touch(key, timeout=timeout, version=version)
+
+    def delete(self, key, version=None):
+        deleted = self.remote.delete(key, version=version)
+        self.invalidate(self.make_key(key, version))
+        return deleted
+
+    def incr(self, key, delta=1, version=None):
+        value = self.remote.incr(key, delta, version=version)
+        self.invalidate(self.make_key(key, version))
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        value = self.remote.decr(key, delta, version=version)
+        self.invalidate(self.make_key(key, version))
+        return value
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.remote.set_many(data, timeout=timeout, version=version)
+        for key in data:
+            self.invalidate(self.make_key(key, version))
+        return failed
+
+    def delete_many(self, keys, version=None):
+        self.remote.delete_many(keys, version=version)
+        for key in keys:
+            self.invalidate(self.make_key(key, version))
+
+    def clear(self):
+        self.remote.clear()
+        self.invalidate("*")
+
+    def close(self, **kwargs):
+        self.remote.close(**kwargs)
+
+
+def cache_stats(request=None):
+    """hit ratios of the TwoTierCache local tiers by key prefix, for this process"""
+    ret = {}
+    for channel, tier in _tiers.items():
+        ret[channel] = {}
+        for prefix, (local, remote, missing) in sorted(tier.stats.items()):
+            total = local + remote + missing
+            ret[channel][prefix] = {
+                "local": local,
+                "remote": remote,
+                "missing": missing,
+                "hit_ratio": round((local + remote) / total, 3),
+                "local_ratio": round(local / total, 3),
+            }
+    return ret
@@ -53,6 +53,13 @@ class Crypto:
             logger.exception(e)
         return value
 
+    def encrypt_bytes(self, value: bytes) -> bytes:
+        """encrypt binary content. Unlike `encrypt()` errors are raised and the token is not base64 encoded"""
+        return base64.urlsafe_b64decode(Fernet(self.key).encrypt(value))
+
+    def decrypt_bytes(self, value: bytes) -> bytes:
+        return Fernet(self.key).decrypt(base64.urlsafe_b64encode(value))
+
 
 class RSACrypto:
     def __init__(self, public_pem: str = None, private_pem: str = None):
@@ -83,8 +90,9 @@ def get_public_keys(pem):
     return symmetric_key, enc_symmetric_key
 
 
-def crypt(data: str, public_pem: bytes) -> bytes:
-    data = data.encode("utf-8")
+def crypt(data: Union[str, bytes], public_pem: bytes) -> bytes:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
     file_out = io.BytesIO()
     file_in = io.BytesIO(data)
     symmetric_key, enc_symmetric_key = get_public_keys(public_pem)
@@ -100,7 +108,7 @@ def crypt(data: str, public_pem: bytes) -> bytes:
     return file_out.read()
 
 
-def decrypt(data: bytes, private_pem: bytes):
+def decrypt(data: bytes, private_pem: bytes, decode=True) -> Union[str, bytes]:
     file_in = io.BytesIO(data)
     file_in.seek(0)
     file_out = io.BytesIO()
@@ -116,7 +124,9 @@ def decrypt(data: bytes, private_pem: bytes):
         nonce = file_in.read(NONCE_SIZE)
 
     file_out.seek(0)
-    return file_out.read().decode()
+    if decode:
+        return file_out.read().decode()
+    return file_out.read()
 
 
 def decrypt_offline(data: str, private_pem: bytes) -> Union[str, bytes]:
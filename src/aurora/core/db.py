@@ -0,0 +1,92 @@
+import logging
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections, DEFAULT_DB_ALIAS
+
+from aurora.state import state
+
+logger = logging.getLogger(__name__)
+
+READ_ONLY_DB = "read_only"
+
+LAG_SQL = (
+    "SELECT CASE WHEN pg_is_in_recovery() "
+    "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) ELSE 0 END"
+)
+
+# (checked_at, lag)
+_lag = [0.0, 0.0]
+
+
+def replica_lag():
+    """seconds the read_only database is behind the primary. Checked at most every READ_ONLY_LAG_CHECK seconds"""
+    checked_at, lag = _lag
+    if time.monotonic() - checked_at > settings.READ_ONLY_LAG_CHECK:
+        try:
+            with connections[READ_ONLY_DB].cursor() as cursor:
+                cursor.execute(LAG_SQL)
+                lag = float(cursor.fetchone()[0])
+        except Exception as e:
+            logger.exception(e)
+            lag = float("inf")
+        _lag[:] = [time.monotonic(), lag]
+    return lag
+
+
+def get_read_db(max_lag=None):
+    """database alias to use for a read-heavy query tolerating `max_lag` seconds of stale data"""
+    if READ_ONLY_DB not in settings.DATABASES or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    if max_lag is None:
+        max_lag = settings.READ_ONLY_MAX_LAG
+    if replica_lag() > max_lag:
+        return DEFAULT_DB_ALIAS
+    return READ_ONLY_DB
+
+
+@contextmanager
+def read_only(max_lag=None):
+    """route reads to the read_only database for the duration of the block"""
+    previous = state.database
+    state.database = get_read_db(max_lag)
+    try:
+        yield state.database
+    finally:
+        state.database = previous
+
+
+def read_only_view(max_lag=None):
+    def decorator(view):
+        @wraps(view)
+        def _inner(*args, **kwargs):
+            with read_only(max_lag):
+                return view(*args, **kwargs)
+
+        return _inner
+
+    return decorator
+
+
+class ReadOnlyRouter:
+    """Send reads to the database selected by `read_only()`.
+
+    Anything running inside a transaction on `default` stays on `default`, so a view
+    never reads from the replica what it has just written.
+    """
+
+    def db_for_read(self, model, **hints):
+        if state.database and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return state.database
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -1,6 +1,8 @@
+from django.db import transaction
 from django.db.models.signals import post_delete, post_save
 
-from aurora.core.models import FlexForm, FlexFormField, Validator
+from aurora.core.cache import bump_forms_version
+from aurora.core.models import CustomFieldType, FlexForm, FlexFormField, local_cache, OptionSet, Validator
 
 
 def update_cache(sender, instance, **kwargs):
@@ -11,6 +13,9 @@ def update_cache(sender, instance, **kwargs):
         elif instance.target == Validator.FORM:
             for r in instance.flexform_set.all():
                 r.save()
+        elif instance.target == Validator.FORMSET:
+            for r in instance.formset_set.all():
+                r.save()
         elif instance.target == Validator.MODULE:
             for r in instance.registration_set.all():
                 r.save()
@@ -26,9 +31,23 @@ def update_cache(sender, instance, **kwargs):
             r.save()
 
 
+def update_forms_version(sender, instance, **kwargs):
+    if isinstance(instance, OptionSet):
+        local_cache.delete(f"option-set-{instance.name}")
+    # again once committed: another worker may have compiled the old version in between
+    bump_forms_version()
+    transaction.on_commit(bump_forms_version)
+
+
 def cache_handler():
     post_save.connect(update_cache, sender=FlexForm, dispatch_uid="form_dip")
     post_save.connect(update_cache, sender=FlexFormField, dispatch_uid="field_dip")
+    post_save.connect(update_cache, sender=Validator, dispatch_uid="validator_dip")
 
     post_delete.connect(update_cache, sender=FlexForm, dispatch_uid="form_del_dip")
     post_delete.connect(update_cache, sender=FlexFormField, dispatch_uid="field_del_dip")
+
+    post_save.connect(update_forms_version, sender=OptionSet, dispatch_uid="optionset_dip")
+    post_save.connect(update_forms_version, sender=CustomFieldType, dispatch_uid="fieldtype_dip")
+    post_delete.connect(update_forms_version, sender=OptionSet, dispatch_uid="optionset_del_dip")
+    post_delete.connect(update_forms_version, sender=CustomFieldType, dispatch_uid="fieldtype_del_dip")
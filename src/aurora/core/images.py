@@ -0,0 +1,90 @@
+import base64
+import io
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.utils import FileProxyMixin
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# defaults of `FlexFormField.advanced["smart"]["image"]`
+DEFAULTS = {"max_width": 1600, "max_height": 1600, "quality": 80, "format": "JPEG"}
+FORMATS = {"JPEG": ("image/jpeg", "jpg"), "WEBP": ("image/webp", "webp")}
+
+DATA_URL_RE = re.compile(r"^data:image/[\w.+-]+;base64,", re.I)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.IMAGE_WORKERS, thread_name_prefix="images")
+    return _executor
+
+
+def get_options(smart_attrs):
+    """image options of a field, None if the field has no `image` entry in its smart attrs"""
+    options = smart_attrs.get("image")
+    if not options:
+        return None
+    options = {**DEFAULTS, **(options if isinstance(options, dict) else {})}
+    options["format"] = str(options["format"]).upper()
+    if options["format"] not in FORMATS:
+        logger.warning(f"Unsupported image format '{options['format']}'")
+        return None
+    return options
+
+
+def resize(content: bytes, max_width, max_height, quality, format) -> bytes:
+    """downscale `content` to fit `max_width`x`max_height` and re-encode it. EXIF (and other metadata) is dropped"""
+    with Image.open(io.BytesIO(content)) as img:
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_width, max_height), Image.LANCZOS)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        out = io.BytesIO()
+        img.save(out, format=format, quality=quality)
+    return out.getvalue()
+
+
+def normalize(value, options):
+    """normalize an uploaded image or an image data URL. Anything else is returned as is"""
+    mime, ext = FORMATS[options["format"]]
+    try:
+        if isinstance(value, str) and DATA_URL_RE.match(value):
+            header, data = value.split(",", 1)
+            content = resize(base64.b64decode(data), **options)
+            return f"data:{mime};base64,{base64.b64encode(content).decode()}"
+        elif isinstance(value, FileProxyMixin):
+            value.seek(0)
+            content = resize(value.read(), **options)
+            name = "%s.%s" % ((value.name or "image").rsplit(".", 1)[0], ext)
+            return SimpleUploadedFile(name, content, content_type=mime)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError) as e:
+        logger.warning(f"Unable to normalize image: {e}")
+        if isinstance(value, FileProxyMixin):
+            value.seek(0)
+    return value
+
+
+def normalize_images(forms):
+    """normalize, in place, the images in the `cleaned_data` of `forms`.
+
+    Fields opt in with an `image` entry in their smart attrs, ie. `{"image": {"max_width": 1024, "format": "WEBP"}}`.
+    Images are processed in a shared thread pool, in parallel.
+    """
+    jobs = []
+    for form in forms:
+        for name, field in form.fields.items():
+            if (options := get_options(getattr(field, "smart_attrs", {}))) and form.cleaned_data.get(name):
+                jobs.append(
+                    (form.cleaned_data, name, get_executor().submit(normalize, form.cleaned_data[name], options))
+                )
+    for cleaned_data, name, future in jobs:
+        cleaned_data[name] = future.result()
@@ -0,0 +1,237 @@
+import json
+import logging
+import threading
+from datetime import date
+from queue import Empty, LifoQueue
+
+from django.conf import settings
+
+from py_mini_racer import MiniRacer
+from py_mini_racer.py_mini_racer import (
+    JSEvalException,
+    JSOOMException,
+    JSParseException,
+    JSTimeoutException,
+    MiniRacerBaseException,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PoolExhausted(MiniRacerBaseException):
+    pass
+
+
+# installed before the preamble: the names of the builtin globals
+PRELUDE = "var __builtins = new Set(Object.getOwnPropertyNames(globalThis));"
+
+# installed after the preamble: holder of the compiled validators, runner of the unsaved ones
+# and a shallow snapshot of the objects defined by the LIB to detect state leaking between calls
+SETUP = """
+var __validators = new Map();
+function __run(code, value) { return eval(code); }
+function __stamp(value) { return value instanceof Date ? value.getTime() : value; }
+function __props(obj) {
+    var props = new Map();
+    if (obj !== null && (typeof obj === "object" || typeof obj === "function")) {
+        Object.getOwnPropertyNames(obj).forEach(function (name) {
+            // set by sloppy mode functions while they run
+            if (name === "arguments" || name === "caller") return;
+            var d = Object.getOwnPropertyDescriptor(obj, name);
+            props.set(name, "value" in d ? __stamp(d.value) : d.get);
+        });
+    }
+    return props;
+}
+var __lib = [];
+Object.getOwnPropertyNames(globalThis).forEach(function (name) {
+    // the helpers defined here are not part of the LIB
+    if (__builtins.has(name) || name.startsWith("__")) return;
+    var value = globalThis[name];
+    __lib.push([name, value, __stamp(value), __props(value)]);
+});
+var __known = new Set(Object.getOwnPropertyNames(globalThis));
+function __polluted() {
+    var names = Object.getOwnPropertyNames(globalThis);
+    if (names.length !== __known.size) {
+        for (var name of names) {
+            // globals assigned without `var` are dropped
+            if (!__known.has(name) && !delete globalThis[name]) return true;
+        }
+        if (Object.getOwnPropertyNames(globalThis).length !== __known.size) return true;
+    }
+    for (var [name, value, stamp, props] of __lib) {
+        if (!Object.is(globalThis[name], value) || !Object.is(__stamp(value), stamp)) return true;
+        var current = __props(value);
+        if (current.size !== props.size) return true;
+        for (var [key, original] of props) {
+            if (!Object.is(current.get(key), original)) return true;
+        }
+    }
+    return false;
+}
+"""
+
+# compiled validators kept by each context
+MAX_VALIDATORS = 500
+# calls after which a context is recycled anyway (ie. changes to the builtins are not detected)
+MAX_CALLS = 10000
+
+
+class PooledContext:
+    """V8 isolate with the validation LIB already loaded.
+
+    Validators are compiled once into functions; the validator code is evaluated with a direct `eval`
+    inside the function so the script completion value is still the validation result, `value` is bound
+    as the function argument and `var` declarations stay local to the call.
+    Globals created by a call (ie. assignments without `var`) are deleted after it; changes to the objects
+    defined by the LIB (ie. `_`, `TODAY`) taint the context, which is then discarded by the pool.
+    """
+
+    def __init__(self, preamble, max_memory=0):
+        self.max_memory = max_memory
+        self.ctx = MiniRacer()
+        self.ctx.eval(PRELUDE)
+        self.ctx.eval(preamble, max_memory=max_memory or None)
+        self.ctx.eval(SETUP)
+        self.functions = set()
+        self.calls = 0
+        self.tainted = False
+        # the LIB computes TODAY when loaded
+        self.day = date.today()
+
+    @staticmethod
+    def function_name(key):
+        return "_".join(str(k) for k in key)
+
+    def compile(self, name, code):
+        if name not in self.functions:
+            if len(self.functions) >= MAX_VALIDATORS:
+                self.ctx.eval("__validators.clear()")
+                self.functions.clear()
+            self.ctx.eval(
+                f"__validators.set({json.dumps(name)}, function(value){{ return eval({json.dumps(code)}); }})"
+            )
+            self.functions.add(name)
+
+    def run(self, key, code, pickled):
+        try:
+            self.calls += 1
+            if key:
+                name = self.function_name(key)
+                self.compile(name, code)
+                call = f"__validators.get({json.dumps(name)})({pickled})"
+            else:
+                # unsaved validators are not compiled
+                call = f"__run({json.dumps(code)}, {pickled})"
+            return self.ctx.eval(call, max_memory=self.max_memory or None)
+        except (JSOOMException, JSTimeoutException):
+            # the isolate may be left in an inconsistent state
+            self.tainted = True
+            raise
+        except (JSEvalException, JSParseException):
+            # errors of the validator code
+            raise
+        except Exception:
+            # anything unexpected: the isolate may be left in an inconsistent state
+            self.tainted = True
+            raise
+        finally:
+            if not self.tainted:
+                self.tainted = self.is_polluted()
+
+    def is_polluted(self):
+        try:
+            return self.ctx.eval("__polluted()") is not False
+        except Exception as e:
+            logger.exception(e)
+            return True
+
+    def is_healthy(self):
+        if self.tainted or self.calls >= MAX_CALLS or self.day != date.today():
+            return False
+        if self.max_memory and self.ctx.heap_stats()["used_heap_size"] > self.max_memory:
+            return False
+        return True
+
+
+class ContextPool:
+    def __init__(self, preamble, size=None, max_memory=None, timeout=None):
+        self.preamble = preamble
+        self._size = size
+        self._max_memory = max_memory
+        self._timeout = timeout
+        self._idle = LifoQueue()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.stats = {"created": 0, "reset": 0, "calls": 0}
+
+    @property
+    def size(self):
+        return self._size or settings.VALIDATOR_POOL_SIZE
+
+    @property
+    def max_memory(self):
+        if self._max_memory is None:
+            return settings.VALIDATOR_POOL_MAX_MEMORY
+        return self._max_memory
+
+    @property
+    def timeout(self):
+        if self._timeout is None:
+            return settings.VALIDATOR_POOL_TIMEOUT
+        return self._timeout
+
+    def _create(self):
+        ctx = PooledContext(self.preamble, self.max_memory)
+        self.stats["created"] += 1
+        return ctx
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            pass
+        with self._lock:
+            if self.created < self.size:
+                self.created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._create()
+            except Exception:
+                with self._lock:
+                    self.created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except Empty:
+            raise PoolExhausted(f"No V8 context available after {self.timeout} seconds")
+
+    def release(self, ctx):
+        if ctx.is_healthy():
+            self._idle.put(ctx)
+        else:
+            logger.info("Discarding tainted V8 context")
+            self.stats["reset"] += 1
+            with self._lock:
+                self.created -= 1
+
+    def run(self, key, code, pickled):
+        ctx = self.acquire()
+        try:
+            self.stats["calls"] += 1
+            return ctx.run(key, code, pickled)
+        finally:
+            self.release(ctx)
+
+    def reset(self):
+        while True:
+            try:
+                self._idle.get_nowait()
+            except Empty:
+                break
+            with self._lock:
+                self.created -= 1
@@ -2,6 +2,7 @@ import json
 import logging
 import re
 from datetime import date, datetime, time
+from functools import lru_cache
 from inspect import isclass
 from json import JSONDecodeError
 from pathlib import Path
@@ -35,15 +36,18 @@ from ..i18n.gettext import gettext as _
 from ..i18n.models import I18NModel
 from ..state import state
 from . import fields
+from .cache import cache_form, cache_formset
 from .compat import RegexField, StrategyClassField
 from .fields import SmartFieldMixin, WIDGET_FOR_FORMFIELD_DEFAULTS
 from .forms import CustomFieldMixin, FlexFormBaseForm, SmartBaseFormSet
+from .jspool import ContextPool
 from .registry import field_registry, form_registry, import_custom_field
 from .utils import dict_setdefault, JSONEncoder, jsonfy, namify, underscore_to_camelcase
 
 logger = logging.getLogger(__name__)
 
 cache = caches["default"]
+local_cache = caches["local"]
 
 
 class AdminReverseMixin:
@@ -217,8 +221,6 @@ _.is_adult = function(d) { return !_.is_child(d)};
         cache.set(f"validator-{state.request.user.pk}-{self.pk}-payload", self.jspickle(value))
 
     def validate(self, value, registration=None):
-        from py_mini_racer import MiniRacer
-
         set_tag("validator", self.name)
 
         if self.active:
@@ -227,14 +229,10 @@ _.is_adult = function(d) { return !_.is_child(d)};
             self.monitor(self.STATUS_INACTIVE, value)
 
         if self.active or (self.draft and state.request.user.is_staff):
-            ctx = MiniRacer()
             try:
                 pickled = self.jspickle(value or "")
-                base = f"{self.CONSOLE};{self.LIB}; var value = {pickled};"
-
-                ctx.eval(base)
-
-                result = ctx.eval(self.code)
+                key = (self.pk, self.version) if self.pk else None
+                result = validator_pool.run(key, self.code or "", pickled)
 
                 if result is None:
                     ret = False
@@ -290,6 +288,9 @@ _.is_adult = function(d) { return !_.is_child(d)};
         return reverse("api:validator-script", args=[self.pk])
 
 
+validator_pool = ContextPool(f"{Validator.CONSOLE};{Validator.LIB};")
+
+
 def get_validators(field):
     if field.validator:
 
@@ -357,7 +358,7 @@ class FlexForm(AdminReverseMixin, I18NModel, NaturalKeyModel):
         defaults.update(extra)
         return FormSet.objects.update_or_create(parent=self, flex_form=form, defaults=defaults)[0]
 
-    # @cache_form
+    @cache_form
     def get_form_class(self):
         from aurora.core.fields import CompilationTimeField
 
@@ -384,6 +385,7 @@ class FlexForm(AdminReverseMixin, I18NModel, NaturalKeyModel):
         flexForm = type(f"{self.name}FlexForm", (self.base_type,), form_class_attrs)
         return flexForm
 
+    @cache_formset
     def get_formsets_classes(self):
         formsets = {}
         for fs in self.formsets.select_related("flex_form", "parent").filter(enabled=True):
@@ -526,6 +528,11 @@ FIELD_KWARGS = {
 }
 
 
+@lru_cache(maxsize=None)
+def get_smart_field_class(field_type):
+    return type(field_type.__name__, (SmartFieldMixin, field_type), dict())
+
+
 @deconstructible
 class RegexPatternValidator:
     def __call__(self, value):
@@ -702,8 +709,7 @@ class FlexFormField(AdminReverseMixin, NaturalKeyModel, I18NModel, OrderableMode
                 field_type = self.field_type
             kwargs = self.get_field_kwargs()
             kwargs.setdefault("flex_field", self)
-            tt = type(field_type.__name__, (SmartFieldMixin, field_type), dict())
-            fld = tt(**kwargs)
+            fld = get_smart_field_class(field_type)(**kwargs)
         except Exception as e:
             logger.exception(e)
             raise
@@ -741,10 +747,10 @@ class FlexFormField(AdminReverseMixin, NaturalKeyModel, I18NModel, OrderableMode
 class OptionSetManager(NaturalKeyModelManager):
     def get_from_cache(self, name):
         key = f"option-set-{name}"
-        value = cache.get(key)
+        value = local_cache.get(key)
         if value is None:
             value = self.get(name=name)
-            cache.set(key, value)
+            local_cache.set(key, value)
         return value
 
 
@@ -801,9 +807,9 @@ class OptionSet(AdminReverseMixin, NaturalKeyModel, models.Model):
             label_col = 0
 
         key = self.get_cache_key(requested_language)
-        value = cache.get(key, version=self.version)
-        value = None
-        if not value:
+        # unsaved instances share the same key
+        value = local_cache.get(key) if self.pk else None
+        if value is None:
             value = []
             for line in self.data.split("\r\n"):
                 if not line.strip():
@@ -827,9 +833,15 @@ class OptionSet(AdminReverseMixin, NaturalKeyModel, models.Model):
                     "label": label,
                 }
                 value.append(values)
-            cache.set(key, value)
+            if self.pk:
+                local_cache.set(key, value)
         return value
 
+    def get_index(self, requested_language=None):
+        from .options import get_index
+
+        return get_index(self, requested_language)
+
     def as_choices(self, language=None):
         data = self.get_data(language or get_language())
         for entry in data:
@@ -0,0 +1,72 @@
+from bisect import bisect_left
+
+from .cache import Cache
+
+# per-worker parsed OptionSet, keyed by (pk, version, language)
+index_cache = Cache(size=50)
+
+
+class OptionSetIndex:
+    """In memory lookup structure for OptionSet records.
+
+    - `labels`: sorted (casefolded label, position) pairs used for prefix search
+    - `children`: parent -> positions
+    - `pks`: lowercase pk -> positions
+
+    Positions are indexes in `records`, results preserve the OptionSet order.
+    """
+
+    def __init__(self, records):
+        self.records = records
+        self.labels = sorted((str(r["label"]).casefold(), i) for i, r in enumerate(records))
+        self.children = {}
+        self.pks = {}
+        for i, r in enumerate(records):
+            self.children.setdefault(str(r["parent"]), []).append(i)
+            self.pks.setdefault(str(r["pk"]).lower(), []).append(i)
+
+    def __len__(self):
+        return len(self.records)
+
+    def startswith(self, term):
+        term = term.casefold()
+        start = bisect_left(self.labels, (term, -1))
+        positions = []
+        for label, pos in self.labels[start:]:
+            if not label.startswith(term):
+                break
+            positions.append(pos)
+        return sorted(positions)
+
+    def filter(self, pk=None, term=None, parent=None):
+        candidates = None
+        if pk:
+            candidates = self.pks.get(pk.lower(), [])
+        if parent:
+            children = self.children.get(str(parent), [])
+            if candidates is None:
+                candidates = children
+            else:
+                children = set(children)
+                candidates = [p for p in candidates if p in children]
+        if term:
+            if candidates is None:
+                candidates = self.startswith(term)
+            else:
+                term = term.casefold()
+                candidates = [p for p in candidates if str(self.records[p]["label"]).casefold().startswith(term)]
+        if candidates is None:
+            return self.records
+        return [self.records[p] for p in candidates]
+
+
+def get_index(optionset, language):
+    if not optionset.pk:
+        return OptionSetIndex(optionset.get_data(language))
+    key = (optionset.pk, optionset.version, language)
+    try:
+        return index_cache[key]
+    except KeyError:
+        index = OptionSetIndex(optionset.get_data(language))
+        index_cache[key] = index
+        return index
@@ -0,0 +1,95 @@
+import logging
+import re
+import time
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "constance:snapshot:version"
+
+# values compiled once per snapshot, see `Snapshot.regex()`
+REGEX_KEYS = ["MINIFY_IGNORE_PATH", "WAF_ADMIN_ALLOWED_HOSTNAMES", "WAF_REGISTRATION_ALLOWED_HOSTNAMES"]
+
+
+class Snapshot:
+    """Read only view of all the constance values, as `constance.config`"""
+
+    def __init__(self, values, version):
+        regex = {}
+        for key in REGEX_KEYS:
+            try:
+                regex[key] = re.compile(values.get(key) or "")
+            except re.error as e:
+                logger.error(f"Invalid regex in {key}: {e}")
+                regex[key] = None
+        object.__setattr__(self, "_values", MappingProxyType(values))
+        object.__setattr__(self, "_regex", MappingProxyType(regex))
+        object.__setattr__(self, "version", version)
+
+    def __getattr__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Snapshot is read only, use `constance.config`")
+
+    def __dir__(self):
+        return list(self._values)
+
+    def items(self):
+        return self._values.items()
+
+    def regex(self, name):
+        """compiled value of `name`, None if invalid"""
+        return self._regex[name]
+
+
+_snapshot = None
+_checked_at = 0.0
+
+
+def get_config() -> Snapshot:
+    """constance values of this worker.
+
+    The snapshot is rebuilt (one query) when the shared version changes. The version is checked at most
+    every CONSTANCE_SNAPSHOT_INTERVAL seconds, changes made by this worker are seen immediately.
+    """
+    from constance.utils import get_values
+
+    global _snapshot, _checked_at
+
+    snapshot = _snapshot
+    now = time.monotonic()
+    if snapshot is None or now - _checked_at > settings.CONSTANCE_SNAPSHOT_INTERVAL:
+        version = cache.get_or_set(VERSION_KEY, time.time_ns, timeout=None)
+        if snapshot is None or snapshot.version != version:
+            snapshot = _snapshot = Snapshot(get_values(), version)
+        _checked_at = now
+    return snapshot
+
+
+def reset_snapshot():
+    global _snapshot
+    _snapshot = None
+
+
+def bump_version():
+    reset_snapshot()
+    cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def on_config_updated(sender, key, old_value, new_value, **kwargs):
+    # again once committed: another worker may have loaded the old values in between
+    bump_version()
+    transaction.on_commit(bump_version)
+
+
+def config(request):
+    """context processor, replaces `constance.context_processors.config`"""
+    return {"config": get_config()}
@@ -33,6 +33,7 @@
                     data: function (params) {
                         var query = {
                             q: params.term,
+                            page: params.page || 1,
                         };
                         if ($parent) {
                             query.parent = $parent.val();
@@ -23,7 +23,7 @@ from django import forms
 from django.conf import settings
 from django.core.files.utils import FileProxyMixin
 from django.core.serializers.json import DjangoJSONEncoder
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.template import loader
 from django.template.defaultfilters import date
 from django.urls import reverse
@@ -31,16 +31,18 @@ from django.utils import timezone
 from django.utils.cache import patch_cache_control
 from django.utils.functional import keep_lazy_text
 from django.utils.html import format_html
+from django.utils.http import quote_etag
 from django.utils.safestring import mark_safe
 from django.utils.text import slugify
 from django.utils.timezone import is_aware
 
 import faker
+import orjson
 import qrcode
-from constance import config
 from dateutil.relativedelta import relativedelta
 
 from aurora import VERSION
+from aurora.core.snapshot import get_config
 from aurora.state import state
 
 UNDEFINED = object()
@@ -123,12 +125,63 @@ class JSONEncoder(DjangoJSONEncoder):
             return super().default(o)
 
 
+# Fast JSON path: orjson, with `JSONEncoder.default` as hook for the types it does not handle
+# natively (date/time are passed through to keep the ECMA-262 format). Payloads orjson refuses
+# (ie. non-str keys, integers > 64 bits) are encoded by the stdlib. Output is compact and
+# NaN/Infinity are encoded as null. JSON_FAST_ENCODER=False always uses the stdlib.
+JSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME
+NON_ASCII_RE = re.compile(r"[^\x00-\x7f]")
+
+_json_default = JSONEncoder().default
+
+
+def _escape_non_ascii(match):
+    c = ord(match.group(0))
+    if c > 0xFFFF:
+        c -= 0x10000
+        return "\\u%04x\\u%04x" % (0xD800 | (c >> 10), 0xDC00 | (c & 0x3FF))
+    return "\\u%04x" % c
+
+
+def ascii_escape(value: str) -> str:
+    """escape non ascii chars as `json.dumps(ensure_ascii=True)`. In json they can only appear inside strings"""
+    if value.isascii():
+        return value
+    return NON_ASCII_RE.sub(_escape_non_ascii, value)
+
+
+def json_dumpb(data, encoder=JSONEncoder) -> bytes:
+    if settings.JSON_FAST_ENCODER:
+        default = _json_default if encoder is JSONEncoder else encoder().default
+        try:
+            return orjson.dumps(data, default=default, option=JSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(data, cls=encoder, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def json_loads(data):
+    if settings.JSON_FAST_ENCODER:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 def safe_json(data):
-    return json.dumps(data, cls=JSONEncoder)
+    return ascii_escape(json_dumpb(data).decode())
 
 
 def jsonfy(data):
-    return json.loads(safe_json(data))
+    return json_loads(json_dumpb(data))
+
+
+class JSONResponse(HttpResponse):
+    """`django.http.JsonResponse` encoded with `json_dumpb()`"""
+
+    def __init__(self, data, encoder=JSONEncoder, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError("In order to allow non-dict objects to be serialized set the safe parameter to False.")
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=json_dumpb(data, encoder), **kwargs)
 
 
 def underscore_to_camelcase(value):
@@ -164,7 +217,7 @@ def clean(v):
 
 def get_bookmarks(request):
     quick_links = []
-    for entry in config.SMART_ADMIN_BOOKMARKS.split("\n"):
+    for entry in get_config().SMART_ADMIN_BOOKMARKS.split("\n"):
         if entry := clean(entry):
             try:
                 if entry == "--":
@@ -282,7 +335,7 @@ def get_etag(request, *args, **kwargs):
         params = [time.time()]
     else:
         params = (VERSION,) + args
-    return md5("/".join(map(str, params)).encode()).hexdigest()
+    return quote_etag(md5("/".join(map(str, params)).encode()).hexdigest())
 
 
 def last_day_of_month(date):
@@ -424,7 +477,9 @@ def build_form_fake_data(form_class):
 
 
 def get_system_cache_version():
-    return "/".join(map(str, [config.CACHE_VERSION, os.environ.get("VERSION", ""), os.environ.get("BUILD_DATE", "")]))
+    return "/".join(
+        map(str, [get_config().CACHE_VERSION, os.environ.get("VERSION", ""), os.environ.get("BUILD_DATE", "")])
+    )
 
 
 def never_ever_cache(decorated_function):
@@ -495,3 +550,48 @@ def get_registration_id(record):
 
 def oneline(value):
     return value.replace("\r\n", ";").replace("\n", ";").replace("\r", ";").replace(";;", ";")
+
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def iter_file(f, start, length, block_size=64 * 1024):
+    try:
+        f.seek(start)
+        while length > 0:
+            data = f.read(min(block_size, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        f.close()
+
+
+def ranged_file_response(request, fieldfile, filename=None, content_type="application/octet-stream"):
+    """stream a stored file honouring single `Range: bytes=` requests, so interrupted downloads can be resumed"""
+    size = fieldfile.size
+    start, end, status = 0, size - 1, 200
+    if m := RANGE_RE.match(request.headers.get("Range", "").strip()):
+        first, last = m.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        elif last:
+            start = max(0, size - int(last))
+        if not (first or last) or start > end or start >= size:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+        status = 206
+    length = end - start + 1
+    response = StreamingHttpResponse(
+        iter_file(fieldfile.open("rb"), start, length), status=status, content_type=content_type
+    )
+    response["Content-Length"] = str(length)
+    response["Accept-Ranges"] = "bytes"
+    if status == 206:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    if filename:
+        response["Content-Disposition"] = f'attachment;filename="{filename}"'
+    return response
@@ -1,7 +1,7 @@
 import time
 
 from django.conf import settings
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.utils.cache import get_conditional_response
 from django.utils.translation import get_language
@@ -12,17 +12,14 @@ from aurora.core.utils import get_etag
 from aurora.state import state
 
 
-def filter_optionset(obj: OptionSet, pk, term, lang, parent=None):
-    def _filter(record):
-        valid = True
-        if pk:
-            valid = valid and record["pk"].lower() == pk.lower()
-        if term:
-            valid = valid and record["label"].lower().startswith(term.lower())
-        if parent:
-            valid = valid and str(record["parent"]) == str(parent)
-        return valid
-
+def filter_optionset(obj: OptionSet, pk, term, lang, parent=None, page=1, limit=None):
+    records = obj.get_index(lang).filter(pk=pk, term=term, parent=parent)
+    if limit:
+        start = (page - 1) * limit
+        selection = records[start : start + limit]
+        more = len(records) > start + limit
+    else:
+        selection, more = records, False
     data = {
         "results": [
             {
@@ -30,15 +27,31 @@ def filter_optionset(obj: OptionSet, pk, term, lang, parent=None):
                 "parent": record["parent"],
                 "text": record["label"],
             }
-            for record in obj.as_json(lang)
-            if _filter(record)
+            for record in selection
         ],
     }
+    if more:
+        data["pagination"] = {"more": True}
     return data
 
 
 # @method_decorator(cache_page(60 * 60), name="dispatch")
 class OptionsListView(BaseListView):
+    paginate_by = 100
+    max_paginate_by = 1000
+
+    def get_limit(self):
+        # without select2 parameters (ie. PWA prefetch) the whole list is returned
+        if "page" not in self.request.GET and "limit" not in self.request.GET:
+            return None
+        return max(1, min(int(self.request.GET.get("limit", self.paginate_by)), self.max_paginate_by))
+
+    def get_page(self):
+        try:
+            return max(int(self.request.GET.get("page", 1)), 1)
+        except ValueError:
+            return 1
+
     def get(self, request, *args, **kwargs):
         name = self.kwargs["name"]
 
@@ -46,8 +59,13 @@ class OptionsListView(BaseListView):
         term = request.GET.get("q")
         parent = request.GET.get("parent", self.kwargs.get("parent", None))
         pk = request.GET.get("pk")
+        page = self.get_page()
+        try:
+            limit = self.get_limit()
+        except ValueError:
+            return HttpResponseBadRequest("Invalid limit")
 
-        obj: OptionSet = get_object_or_404(OptionSet, name=name)
+        obj: OptionSet = get_object_or_404(OptionSet.objects.defer("data"), name=name)
 
         if state.collect_messages:
             etag = get_etag(request, time.time())
@@ -60,10 +78,12 @@ class OptionsListView(BaseListView):
                 term,
                 parent,
                 pk,
+                page,
+                limit,
             )
         response = get_conditional_response(request, str(etag))
         if response is None:
-            data = filter_optionset(obj, pk, term, lang, parent)
+            data = filter_optionset(obj, pk, term, lang, parent, page, limit)
             response = JsonResponse(data)
             response["Cache-Control"] = "public, max-age=315360000"
             response["ETag"] = etag
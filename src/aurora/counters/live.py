@@ -0,0 +1,117 @@
+import datetime
+import logging
+
+from django.conf import settings
+from django.utils import timezone
+
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+KEYS = "counters:live"
+TTL = 60 * 60 * 48
+
+# atomically read and remove a bucket: increments landing after the read go to a new bucket
+TAKE = """
+local values = redis.call('HGETALL', KEYS[1])
+redis.call('DEL', KEYS[1])
+redis.call('SREM', ARGV[1], KEYS[1])
+return values
+"""
+
+
+def is_enabled():
+    return settings.COUNTERS_LIVE and settings.CACHES["default"]["BACKEND"].startswith("django_redis")
+
+
+def get_connection():
+    return get_redis_connection("default")
+
+
+def bucket_key(registration_id, day):
+    return f"{KEYS}:{registration_id}:{day.isoformat()}"
+
+
+def parse_key(key):
+    __, __, registration_id, day = key.rsplit(":", 3)
+    return int(registration_id), datetime.date.fromisoformat(day)
+
+
+def increment(registration_id, timestamp=None, count=1):
+    """count `count` new records in the hourly bucket of their registration. Errors never reach the caller"""
+    if not is_enabled():
+        return
+    timestamp = timezone.localtime(timestamp or timezone.now())
+    key = bucket_key(registration_id, timestamp.date())
+    try:
+        pipe = get_connection().pipeline(transaction=False)
+        pipe.hincrby(key, str(timestamp.hour), count)
+        pipe.expire(key, TTL)
+        pipe.sadd(KEYS, key)
+        pipe.execute()
+    except Exception as e:
+        logger.exception(e)
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def get_buckets(registration_id, days):
+    """returns {day: {hour: count}} for the live buckets of `registration_id`"""
+    if not is_enabled():
+        return {}
+    days = list(days)
+    pipe = get_connection().pipeline(transaction=False)
+    for day in days:
+        pipe.hgetall(bucket_key(registration_id, day))
+    return {day: {_decode(h): int(c) for h, c in values.items()} for day, values in zip(days, pipe.execute()) if values}
+
+
+def merge_hours(persisted, live):
+    """buckets count every insert of the hour, `collect()` the records existing when it ran: keep the fresher"""
+    hours = dict(persisted)
+    for hour, count in live.items():
+        hours[hour] = max(hours.get(hour, 0), count)
+    return hours
+
+
+def _pairs(values):
+    """HGETALL from a lua script is a flat [field, value, ...] list"""
+    return dict(zip(values[::2], values[1::2]))
+
+
+def flush():
+    """fold live buckets into the existing Counter rows. Buckets of past days are removed once folded.
+
+    Rows are never created here: the latest `Counter.day` is the watermark of `CounterManager.collect()`,
+    days without a counter are left to it.
+    """
+    from aurora.counters.models import Counter
+
+    if not is_enabled():
+        return 0
+    con = get_connection()
+    keys = sorted(_decode(k) for k in con.smembers(KEYS))
+    if not keys:
+        return 0
+    today = timezone.localdate()
+    current = [key for key in keys if parse_key(key)[1] >= today]
+    pipe = con.pipeline(transaction=False)
+    for key in current:
+        pipe.hgetall(key)
+    values = dict(zip(current, pipe.execute()))
+    take = con.register_script(TAKE)
+    for key in keys:
+        if key not in values:
+            values[key] = _pairs(take(keys=[key], args=[KEYS]))
+
+    buckets = {parse_key(key): {_decode(h): int(c) for h, c in v.items()} for key, v in values.items() if v}
+    counters = []
+    for c in Counter.objects.filter(registration_id__in={r for r, __ in buckets}, day__in={d for __, d in buckets}):
+        if (c.registration_id, c.day) in buckets:
+            hours = merge_hours((c.details or {}).get("hours", {}), buckets[(c.registration_id, c.day)])
+            c.records, c.details = sum(hours.values()), {**(c.details or {}), "hours": hours}
+            counters.append(c)
+    Counter.objects.bulk_update(counters, ["records", "details"], batch_size=1000)
+    return len(counters)
@@ -1,71 +1,77 @@
 from collections import defaultdict
-from datetime import datetime, timedelta
+from datetime import datetime, time
 
 from django.db import models
-from django.db.models import Count
-from django.db.models.functions import ExtractHour, TruncDay
+from django.db.models import Count, Max, Q
+from django.db.models.functions import ExtractHour, TruncDate
+from django.utils import timezone
 from django.utils.functional import cached_property
 
 from aurora.registration.models import Record, Registration
 
 
+def start_of_day(day):
+    return datetime.combine(day, time.min, tzinfo=timezone.get_current_timezone())
+
+
 class CounterManager(models.Manager):
     def collect(self, *, registrations=None):
+        """(re)compute counters for every day starting from the latest collected one.
+
+        The latest `Counter.day` of each registration is its watermark: records since that day are counted
+        with a single query grouped by registration, day and hour and stored with one bulk upsert.
+        Counters of the watermark day (usually today) are always overwritten as they may be partial.
+        """
         result = {"registration": 0, "records": 0, "days": 0, "details": {}}
-        today = datetime.today()
-        yesterday = datetime.combine(today - timedelta(days=1), datetime.max.time())
-        selection = Registration.objects.filter(archived=False)
+        counters = self.filter(registration__archived=False)
+        records = Record.objects.filter(registration__archived=False)
+        if registrations:
+            counters = counters.filter(registration_id__in=registrations)
+            records = records.filter(registration_id__in=registrations)
+        watermarks = dict(counters.values_list("registration").annotate(m=Max("day")))
+        if watermarks:
+            # registrations without counters are counted from the beginning
+            condition = ~Q(registration_id__in=list(watermarks))
+            for registration_id, day in watermarks.items():
+                condition |= Q(registration_id=registration_id, timestamp__gte=start_of_day(day))
+            records = records.filter(condition)
 
-        def annotate(qs):
-            return (
-                qs.annotate(hour=ExtractHour("timestamp"), day=TruncDay("timestamp"))
-                .values("day", "hour")
-                .annotate(c=Count("id"))
-                .order_by("day", "hour")
-            )
+        qs = (
+            records.annotate(hour=ExtractHour("timestamp"), day=TruncDate("timestamp"))
+            .values("registration_id", "registration__slug", "day", "hour")
+            .annotate(c=Count("id"))
+            .order_by("registration_id", "day", "hour")
+        )
+        values = defaultdict(lambda: {"records": 0, "hours": {}})
+        for match in qs:
+            entry = values[(match["registration_id"], match["registration__slug"], match["day"])]
+            entry["records"] += match["c"]
+            entry["hours"][str(match["hour"])] = match["c"]
+            result["days"] += 1
 
-        if registrations:
-            selection = selection.filter(id__in=registrations)
-        querysets = []
-        for registration in selection:
-            result["registration"] += 1
-            result["details"][registration.slug] = {"range": [], "days": 0}
-            latest = Counter.objects.filter(registration=registration).order_by("-day").first()
-            if latest:
-                latest = latest.day + timedelta(days=1)
-            else:
-                latest = datetime.min
-            qs = annotate(Record.objects.filter(registration=registration, timestamp__range=(latest, yesterday)))
-            today_data = annotate(Record.objects.filter(registration=registration, timestamp__date=today))
-            querysets.append(qs)
-            counter = defaultdict(lambda: {"records": 0, "extra": {}})
-            for q in [qs, today_data]:
-                for match in q.all():
-                    counter[match["day"]]["records"] += match["c"]
-                    counter[match["day"]]["extra"][match["hour"]] = match["c"]
-                    result["days"] += 1
-            for day, values in counter.items():
-                result["records"] += values["records"]
-                result["details"][registration.slug]["days"] += 1
-                if today.date() == day.date():
-                    Counter.objects.update_or_create(
-                        registration=registration,
-                        day=day,
-                        defaults={
-                            "records": values["records"],
-                            "details": {"hours": values["extra"]},
-                        },
-                    )
-                else:
-                    Counter.objects.get_or_create(
-                        registration=registration,
-                        day=day,
-                        defaults={
-                            "records": values["records"],
-                            "details": {"hours": values["extra"]},
-                        },
-                    )
-        return querysets, result
+        objs = []
+        for (registration_id, slug, day), entry in values.items():
+            if slug not in result["details"]:
+                result["registration"] += 1
+                result["details"][slug] = {"range": [], "days": 0}
+            result["details"][slug]["days"] += 1
+            result["records"] += entry["records"]
+            objs.append(
+                Counter(
+                    registration_id=registration_id,
+                    day=day,
+                    records=entry["records"],
+                    details={"hours": entry["hours"]},
+                )
+            )
+        self.bulk_create(
+            objs,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["registration", "day"],
+            update_fields=["records", "details"],
+        )
+        return [qs], result
 
 
 class Counter(models.Model):
@@ -1,28 +1,33 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import UserPassesTestMixin
 from django.core.exceptions import PermissionDenied
-from django.http import HttpResponseRedirect, JsonResponse
+from django.http import HttpResponseRedirect
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.views import View
 
+from aurora.core.db import read_only_view
 from aurora.core.models import Organization, Project
-from aurora.core.utils import get_session_id, last_day_of_month, render
+from aurora.core.utils import get_session_id, JSONResponse, last_day_of_month, render
+from aurora.counters import live as live_counters
 from aurora.counters.models import Counter
 from aurora.registration.models import Registration
+from aurora.security.backend import filter_permitted
 
 User = get_user_model()
 
+ONE_DAY = timedelta(days=1)
+
 
 @login_required()
 def index(request, org):
     o: Organization = Organization.objects.get(slug=org)
     if not request.user.has_perm("counters.view_counter", o):
         raise PermissionDenied("----")
-    context = {"organization": o, "projects": o.projects.filter(members__user=request.user)}
+    context = {"organization": o, "projects": filter_permitted(request.user, "counters.view_counter", o.projects.all())}
     return render(request, "counters/index.html", context)
 
 
@@ -32,7 +37,10 @@ def project_index(request, org, prj):
     p: Project = Project.objects.get(organization=o, pk=prj)
     if not request.user.has_perm("counters.view_counter", p):
         raise PermissionDenied("----")
-    context = {"project": p, "registrations": p.registrations.filter(members__user=request.user)}
+    context = {
+        "project": p,
+        "registrations": filter_permitted(request.user, "counters.view_counter", p.registrations.all()),
+    }
     return render(request, "counters/project.html", context)
 
 
@@ -54,11 +62,11 @@ class ChartView(UserPassesTestMixin, View):
 
 
 class MonthlyDataView(ChartView):
+    @read_only_view()
     def get(self, request, org, prj, registration_id):
         registration = self.get_registration(request, org, prj, registration_id)
         qs = Counter.objects.filter(registration_id=registration_id).order_by("day")
         param_month = request.GET.get("m", None)
-        total = 0
         if param_month:
             date = datetime.strptime(param_month, "%Y-%m-%d")
         else:
@@ -73,9 +81,15 @@ class MonthlyDataView(ChartView):
             dt = date.replace(day=d).date()
             values[dt] = {"total": 0, "pk": 0}
 
+        live = live_counters.get_buckets(registration_id, [d for d in values if d >= timezone.localdate() - ONE_DAY])
         for record in qs.all():
             values[record.day] = {"total": record.records, "pk": record.pk}
-            total += record.records
+            if record.day in live:
+                hours = live_counters.merge_hours(record.details.get("hours", {}), live.pop(record.day))
+                values[record.day]["total"] = sum(hours.values())
+        for day, hours in live.items():
+            values[day] = {"total": sum(hours.values()), "pk": 0}
+        total = sum(v["total"] for v in values.values())
 
         if not labels:
             labels = [d.strftime("%-d, %a") for d in values.keys()]
@@ -88,7 +102,7 @@ class MonthlyDataView(ChartView):
             "labels": labels,
             "data": list(values.values()),
         }
-        response = JsonResponse(data)
+        response = JSONResponse(data)
         # response["Cache-Control"] = "max-age=315360000"
         # response["Last-Modified"] = "max-age=315360000"
         # response["ETag"] = etag
@@ -10,12 +10,12 @@ from django.conf import settings
 from django.contrib import messages
 from django.contrib.admin import register
 from django.core.cache import caches
-from django.db.transaction import atomic
+from django.db.transaction import atomic, on_commit
 from django.http import HttpResponseRedirect
 from django.shortcuts import render
 from django.template import loader
 from django.urls import reverse
-from django.utils import translation
+from django.utils import timezone, translation
 from django.utils.translation import get_language
 
 from admin_extra_buttons.decorators import button, view
@@ -30,6 +30,7 @@ from ..core.models import FlexForm
 from ..state import state
 from .engine import translator
 from .forms import ImportLanguageForm, LanguageForm
+from .handlers import bump_serial
 from .models import Message
 
 logger = logging.getLogger(__name__)
@@ -73,7 +74,9 @@ class MessageAdmin(SyncMixin, SmartModelAdmin):
     actions = ["approve", "rehash", "publish_action"]
 
     def approve(self, request, queryset):
-        queryset.update(draft=False)
+        queryset.update(draft=False, last_modified=timezone.now())
+        # update() sends no signal
+        on_commit(lambda: bump_serial(reset=True))
 
     def get_queryset(self, request):
         return (
@@ -1,5 +1,7 @@
 import logging
+from datetime import timedelta
 
+from django.conf import settings
 from django.core.cache import caches
 from django.utils import timezone
 
@@ -12,21 +14,76 @@ logger = logging.getLogger(__name__)
 
 cache = caches["default"]
 
+SERIAL_KEY = "i18n"
+RESET_KEY = "i18n:reset"
+# tolerance used when selecting changed messages, covers clock skew and late commits
+DELTA_OVERLAP = timedelta(seconds=5)
+
+
+def get_serial():
+    """current "i18n" serial, changed by any Message update"""
+    return cache.get(SERIAL_KEY)
+
 
 class Dictionary:
     def __init__(self, locale):
         self.locale = locale
         self.messages = {}
+        self.serial = None
+        self.reset_serial = None
+        self.watermark = None
         self._loaded = False
 
     def reset(self):
         self.messages = {}
+        self._loaded = False
 
     def load_all(self):
-        entries = Message.objects.filter(locale=self.locale, draft=False).values("msgid", "msgstr")
-        self.messages = {k["msgid"]: k["msgstr"] for k in entries}
+        entries = Message.objects.filter(locale=self.locale, draft=False).values("msgid", "msgstr", "last_modified")
+        messages = {}
+        watermark = None
+        for entry in entries:
+            messages[entry["msgid"]] = entry["msgstr"]
+            if entry["last_modified"] and (watermark is None or entry["last_modified"] > watermark):
+                watermark = entry["last_modified"]
+        self.messages = messages
+        self.watermark = watermark
         self._loaded = True
 
+    def load_changes(self):
+        qs = Message.objects.filter(locale=self.locale)
+        if self.watermark:
+            qs = qs.filter(last_modified__gte=self.watermark - DELTA_OVERLAP)
+        messages = dict(self.messages)
+        watermark = self.watermark
+        for entry in qs.values("msgid", "msgstr", "draft", "last_modified"):
+            if entry["draft"]:
+                messages.pop(entry["msgid"], None)
+            else:
+                messages[entry["msgid"]] = entry["msgstr"]
+            if entry["last_modified"] and (watermark is None or entry["last_modified"] > watermark):
+                watermark = entry["last_modified"]
+        self.messages = messages
+        self.watermark = watermark
+
+    def refresh(self):
+        """load messages only if the "i18n" serial changed since the last load.
+
+        returns one of "hit", "miss" (first load or full reload) or "reload" (delta reload)
+        """
+        values = cache.get_many([SERIAL_KEY, RESET_KEY])
+        serial, reset_serial = values.get(SERIAL_KEY), values.get(RESET_KEY)
+        if self._loaded and serial == self.serial and reset_serial == self.reset_serial:
+            return "hit"
+        if self._loaded and self.watermark and reset_serial == self.reset_serial and settings.I18N_DELTA_RELOAD:
+            self.load_changes()
+            result = "reload"
+        else:
+            self.load_all()
+            result = "miss"
+        self.serial, self.reset_serial = serial, reset_serial
+        return result
+
     def __getitem__(self, msgid):
         translation = msgid or ""
         if not msgid.strip():
@@ -64,6 +121,7 @@ class Dictionary:
 class Cache:
     def __init__(self):
         self.locales = {}
+        self.stats = {"hit": 0, "miss": 0, "reload": 0}
 
     def reset(self):
         for __, locale in self.locales.items():
@@ -71,7 +129,7 @@ class Cache:
 
     def activate(self, locale):
         e = self[locale]
-        e.load_all()
+        self.stats[e.refresh()] += 1
         return e
 
     def __getitem__(self, locale):
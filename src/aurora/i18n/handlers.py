@@ -1,17 +1,36 @@
+import uuid
+
 from django.core.cache import caches
+from django.db import transaction
 from django.db.models.signals import post_delete, post_save
 from django.utils import timezone
 
+from .engine import RESET_KEY, SERIAL_KEY
 from .models import Message
 
 cache = caches["default"]
 
 
-def update_cache(sender, instance, **kwargs):
+def bump_serial(reset=False):
     tznow = timezone.now()
-    serial = "{:%d-%m-%Y:%H:%M:%S}.{:03d}".format(tznow, tznow.microsecond // 1000)
-    cache.set("i18n", serial)
+    # two changes within the same millisecond must still produce different serials
+    serial = "{:%d-%m-%Y:%H:%M:%S}.{:03d}-{}".format(tznow, tznow.microsecond // 1000, uuid.uuid4().hex[:8])
+    cache.set(SERIAL_KEY, serial)
+    if reset:
+        # deleted messages cannot be detected by a delta reload
+        cache.set(RESET_KEY, serial)
+    return serial
+
+
+def update_cache(sender, instance, raw=False, **kwargs):
+    # a worker refreshing before the commit would store the new serial with the old rows.
+    # Fixtures (`raw`) keep their own `last_modified`, which a delta reload would miss
+    transaction.on_commit(lambda: bump_serial(reset=raw))
+
+
+def reset_cache(sender, instance, **kwargs):
+    transaction.on_commit(lambda: bump_serial(reset=True))
 
 
 post_save.connect(update_cache, sender=Message, dispatch_uid="update_message_version")
-post_delete.connect(update_cache, sender=Message, dispatch_uid="update_message_version")
+post_delete.connect(reset_cache, sender=Message, dispatch_uid="update_message_version")
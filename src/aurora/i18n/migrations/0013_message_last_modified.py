@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("i18n", "0012_alter_message_locale"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="last_modified",
+            field=models.DateTimeField(auto_now=True, blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -25,6 +25,7 @@ class Message(NaturalKeyModel):
     draft = models.BooleanField(default=True)
     used = models.BooleanField(default=True)
     last_hit = models.DateTimeField(blank=True, null=True)
+    last_modified = models.DateTimeField(auto_now=True, blank=True, null=True, db_index=True)
 
     class Meta:
         unique_together = ("msgid", "locale")
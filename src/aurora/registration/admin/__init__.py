@@ -1,8 +1,12 @@
 from django.contrib.admin import register
 
-from ..models import Record, Registration
+from ..models import ExportJob, Record, Registration, Submission
+from .export import ExportJobAdmin
 from .record import RecordAdmin
 from .registration import RegistrationAdmin
+from .submission import SubmissionAdmin
 
 register(Registration)(RegistrationAdmin)
 register(Record)(RecordAdmin)
+register(ExportJob)(ExportJobAdmin)
+register(Submission)(SubmissionAdmin)
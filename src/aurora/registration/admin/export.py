@@ -0,0 +1,60 @@
+import logging
+import mimetypes
+
+from django.contrib import messages
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseRedirect
+from django.utils.html import format_html
+
+from admin_extra_buttons.decorators import button
+from adminfilters.autocomplete import AutoCompleteFilter
+from smart_admin.modeladmin import SmartModelAdmin
+
+from ...core.utils import is_root, ranged_file_response
+from ..models import ExportJob
+
+logger = logging.getLogger(__name__)
+
+
+def can_see_all(request):
+    return request.user.is_superuser or is_root(request)
+
+
+def is_owner(request, obj, handler=None):
+    return obj is None or obj.owner_id == request.user.pk or can_see_all(request)
+
+
+class ExportJobAdmin(SmartModelAdmin):
+    list_display = ("created", "registration", "owner", "status", "progress_bar", "size")
+    list_filter = (("registration", AutoCompleteFilter), "status")
+    readonly_fields = [f.name for f in ExportJob._meta.fields]
+    raw_id_fields = ("registration", "owner")
+    change_form_template = None
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request).select_related("registration", "owner")
+        if not can_see_all(request):
+            qs = qs.filter(owner=request.user)
+        return qs
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def progress_bar(self, obj):
+        return format_html('<progress value="{}" max="100"></progress> {}/{}', obj.progress, obj.processed, obj.total)
+
+    progress_bar.short_description = "progress"
+
+    @button(permission=is_owner, html_attrs={"class": "aeb-green"})
+    def download(self, request, pk):
+        job = self.get_object(request, pk)
+        if not is_owner(request, job):
+            raise PermissionDenied
+        if job.status != ExportJob.SUCCESS or not job.file:
+            self.message_user(request, f"Export is {job.get_status_display().lower()}", messages.WARNING)
+            return HttpResponseRedirect("..")
+        content_type = mimetypes.guess_type(job.filename)[0] or "application/octet-stream"
+        return ranged_file_response(request, job.file, filename=job.filename, content_type=content_type)
@@ -1,20 +1,55 @@
+import json
+
 from django.core.paginator import Paginator
-from django.db import connection, OperationalError, transaction
+from django.db import connections, OperationalError, transaction
 from django.utils.functional import cached_property
 
 
+def estimate_count(queryset, timeout=5):
+    """
+    Number of rows of `queryset`, estimated if the exact count is too slow.
+
+    - Try to get the real count limiting the query execution time to `timeout` ms.
+    - If it takes longer, the database kills the query and raises OperationError. In that case
+    use the table statistics (`pg_class.reltuples`) if the queryset is not filtered, or the rows
+    estimated by the query planner otherwise (estimates can be stale and hence not fit for situations
+    where the count of objects actually matter).
+    - If any other exception occurred fall back to the exact count.
+
+    Returns a (count, is_estimate) tuple
+    """
+    conn = connections[queryset.db]
+    try:
+        with transaction.atomic(using=queryset.db), conn.cursor() as cursor:
+            cursor.execute("SET LOCAL statement_timeout TO %s;" % int(timeout))
+            return queryset.count(), False
+    except OperationalError:
+        pass
+    try:
+        with transaction.atomic(using=queryset.db), conn.cursor() as cursor:
+            # Obtain estimated values (only valid with PostgreSQL)
+            if not queryset.query.where:
+                cursor.execute("SELECT reltuples FROM pg_class WHERE relname = %s", [queryset.model._meta.db_table])
+                return int(cursor.fetchone()[0]), True
+            sql, params = queryset.order_by().values("pk").query.sql_with_params()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"]), True
+    except Exception:
+        # If any other exception occurred fall back to default behaviour
+        pass
+    return queryset.count(), False
+
+
 class LargeTablePaginator(Paginator):
     """
     Combination of ideas from:
      - https://gist.github.com/safar/3bbf96678f3e479b6cb683083d35cb4d
      - https://medium.com/@hakibenita/optimizing-django-admin-paginator-53c4eb6bfca3
 
-    Overrides the count method of QuerySet objects to avoid timeouts.
-    - Try to get the real count limiting the queryset execution time to 150 ms.
-    - If count takes longer than 150 ms the database kills the query and raises OperationError. In that case,
-    get an estimate instead of actual count when not filtered (this estimate can be stale and hence not fit for
-    situations where the count of objects actually matter).
-    - If any other exception occured fall back to default behaviour.
+    Overrides the count method of QuerySet objects to avoid timeouts (see `estimate_count`).
     """
 
     @cached_property
@@ -22,25 +57,6 @@ class LargeTablePaginator(Paginator):
         """
         Returns an estimated number of objects, across all pages.
         """
-        try:
-            with transaction.atomic(), connection.cursor() as cursor:
-                # Limit to 150 ms
-                cursor.execute("SET LOCAL statement_timeout TO 5;")
-                return super().count
-        except OperationalError:
-            pass
-
-        if not self.object_list.query.where:
-            try:
-                with transaction.atomic(), connection.cursor() as cursor:
-                    # Obtain estimated values (only valid with PostgreSQL)
-                    cursor.execute(
-                        "SELECT reltuples FROM pg_class WHERE relname = %s",
-                        [self.object_list.query.model._meta.db_table],
-                    )
-                    estimate = int(cursor.fetchone()[0])
-                    return estimate
-            except Exception:
-                # If any other exception occurred fall back to default behaviour
-                pass
-        return super().count
+        if not hasattr(self.object_list, "query"):
+            return super().count
+        return estimate_count(self.object_list)[0]
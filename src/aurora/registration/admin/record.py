@@ -11,6 +11,7 @@ from adminfilters.numbers import NumberFilter
 from adminfilters.value import ValueFilter
 from smart_admin.modeladmin import SmartModelAdmin
 
+from ...core.db import get_read_db
 from ...core.utils import is_root
 from ..forms import DecryptForm
 from .filters import DateRangeFilter, HourFilter
@@ -52,7 +53,13 @@ class RecordAdmin(SmartModelAdmin):
     def get_queryset(self, request):
         qs = super().get_queryset(request)
         qs = qs.select_related("registration", "registrar")
-        return qs
+        return qs.using(getattr(request, "read_db", None))
+
+    def changelist_view(self, request, extra_context=None):
+        # the changelist is evaluated while rendering, route it explicitly
+        if request.method == "GET":
+            request.read_db = get_read_db()
+        return super().changelist_view(request, extra_context)
 
     def get_common_context(self, request, pk=None, **kwargs):
         return super().get_common_context(request, pk, is_root=is_root(request), **kwargs)
@@ -1,8 +1,8 @@
 import csv
-import io
 import json
 import logging
 from hashlib import md5
+from tempfile import TemporaryFile
 
 from django import forms
 from django.conf import settings
@@ -11,11 +11,12 @@ from django.core.cache import cache
 from django.db.models import JSONField
 from django.db.models.signals import post_delete, post_save
 from django.db.transaction import atomic
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
 from django.shortcuts import render
 from django.template import Template
 from django.template.loader import select_template
 from django.urls import reverse, translate_url
+from django.utils.html import format_html
 from django.utils.module_loading import import_string
 from django.utils.text import slugify
 
@@ -28,16 +29,18 @@ from jsoneditor.forms import JSONEditor
 from smart_admin.modeladmin import SmartModelAdmin
 
 from aurora.core.admin.base import ConcurrencyVersionAdmin
+from aurora.core.db import get_read_db
 from aurora.core.forms import CSVOptionsForm, DateFormatsForm, VersionMedia
 from aurora.core.models import FlexForm, FlexFormField, FormSet, Validator
-from aurora.core.utils import build_dict, build_form_fake_data, clone_model, get_system_cache_version, is_root, namify
+from aurora.core.utils import build_form_fake_data, clone_model, get_system_cache_version, is_root, namify
 from aurora.i18n.forms import TemplateForm, TranslationForm
 from aurora.i18n.translate import Translator
 from aurora.registration.admin.filters import OrganizationFilter, RegistrationProjectFilter
 from aurora.registration.admin.forms import DebugForm
 from aurora.registration.admin.protocol import AuroraSyncRegistrationProtocol
+from aurora.registration.export import enqueue_export, RecordExport
 from aurora.registration.forms import CloneForm, JamesForm, RegistrationExportForm, RegistrationForm
-from aurora.registration.models import Record, Registration
+from aurora.registration.models import Registration
 
 logger = logging.getLogger(__name__)
 
@@ -165,54 +168,36 @@ class RegistrationAdmin(ConcurrencyVersionAdmin, AdminAutoCompleteSearchMixin, S
             try:
                 if form.is_valid() and opts_form.is_valid() and fmt_form.is_valid():
                     filters, exclude = form.cleaned_data["filters"]
-                    include_fields = form.cleaned_data["include"]
-                    exclude_fields = form.cleaned_data["exclude"]
                     ctx["filters"] = filters
                     ctx["exclude"] = exclude
-                    qs = (
-                        Record.objects.filter(registration__id=pk)
-                        .defer(
-                            "storage",
-                            "counters",
-                            "files",
-                        )
-                        .filter(**filters)
-                        .exclude(**exclude)
-                        .values("fields", "id", "ignored", "timestamp", "registration_id")
+                    export = RecordExport(
+                        reg,
+                        filters=filters,
+                        exclude=exclude,
+                        include_fields=form.cleaned_data["include"],
+                        exclude_fields=form.cleaned_data["exclude"],
+                        using=get_read_db(),
+                        **fmt_form.cleaned_data,
                     )
-                    if qs.count() >= 5000:
-                        raise Exception("Too many records please change your filters. (max 5000)")
-                    valid = fmt_form.cleaned_data
-                    records = [build_dict(r, **valid) for r in qs]
-                    if not records:
+                    export.check_limit()
+                    if not export.get_queryset().exists():
                         raise Exception("No records matching filtering criteria")
-                    skipped = []
-                    all_fields = []
-                    for r in records:
-                        for field_name in r.keys():
-                            if field_name not in skipped and field_name in exclude_fields:
-                                skipped.append(field_name)
-                            elif field_name not in all_fields and field_name in include_fields:
-                                all_fields.append(field_name)
+                    if "enqueue" in request.POST:
+                        return self._enqueue_export(request, reg)
+                    if "parquet" in request.POST:
+                        from aurora.registration.parquet import ParquetExport
+
+                        ParquetExport.check_registration(reg)
+                        if export.count() > settings.EXPORT_SYNC_MAX_RECORDS:
+                            return self._enqueue_export(request, reg, format="parquet")
+                        return self._export_parquet(reg, form.cleaned_data)
+                    all_fields, skipped = export.get_fieldnames()
                     if "export" in request.POST:
                         csv_options = opts_form.cleaned_data
                         add_header = csv_options.pop("header")
-                        out = io.StringIO()
-                        writer = csv.DictWriter(
-                            out,
-                            # dialect="excel",
-                            fieldnames=all_fields,
-                            restval="-",
-                            extrasaction="ignore",
-                            **csv_options,
-                        )
-                        if add_header:
-                            writer.writeheader()
-                        writer.writerows(records)
-                        out.seek(0)
                         filename = f"Registration_{reg.slug}.csv"
-                        response = HttpResponse(
-                            out.read(),
+                        response = StreamingHttpResponse(
+                            export.iter_csv(all_fields, add_header, **csv_options),
                             headers={"Content-Disposition": 'attachment;filename="%s"' % filename},
                             content_type="text/csv",
                         )
@@ -220,7 +205,7 @@ class RegistrationAdmin(ConcurrencyVersionAdmin, AdminAutoCompleteSearchMixin, S
                     else:
                         ctx["all_fields"] = sorted(set(all_fields))
                         ctx["skipped"] = skipped
-                        ctx["qs"] = records[:10]
+                        ctx["qs"] = export.sample(10)
             except Exception as e:
                 logger.exception(e)
                 self.message_error_to_user(request, e)
@@ -234,6 +219,32 @@ class RegistrationAdmin(ConcurrencyVersionAdmin, AdminAutoCompleteSearchMixin, S
         ctx["fmt_form"] = fmt_form
         return render(request, "admin/registration/registration/export.html", ctx)
 
+    def _export_parquet(self, reg, cleaned_data):
+        from aurora.registration.parquet import ParquetExport
+
+        filters, exclude = cleaned_data["filters"]
+        export = ParquetExport(
+            reg,
+            filters=filters,
+            exclude=exclude,
+            include_fields=cleaned_data["include"],
+            exclude_fields=cleaned_data["exclude"],
+            using=get_read_db(),
+        )
+        out = TemporaryFile()
+        filename = export.to_file(out)
+        out.seek(0)
+        return FileResponse(out, as_attachment=True, filename=filename)
+
+    def _enqueue_export(self, request, reg, format="csv"):
+        options = {k: v for k, v in request.POST.items() if k not in ["csrfmiddlewaretoken", "enqueue", "parquet"]}
+        job = enqueue_export(reg, request.user, {**options, "format": format})
+        url = reverse("admin:registration_exportjob_change", args=[job.pk])
+        self.message_user(
+            request, format_html('Export scheduled. Check <a href="{}">job #{}</a> progress', url, job.pk)
+        )
+        return HttpResponseRedirect(url)
+
     @view(label="invalidate cache", html_attrs={"class": "aeb-warn"})
     def invalidate_cache(self, request, pk):
         obj = self.get_object(request, pk)
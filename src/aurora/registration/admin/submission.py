@@ -0,0 +1,23 @@
+from adminfilters.autocomplete import AutoCompleteFilter
+from smart_admin.modeladmin import SmartModelAdmin
+
+from ..models import Submission
+
+
+class SubmissionAdmin(SmartModelAdmin):
+    list_display = ("created", "registration", "receipt", "status", "record")
+    list_filter = (("registration", AutoCompleteFilter), "status")
+    search_fields = ("receipt",)
+    exclude = ("payload",)
+    readonly_fields = [f.name for f in Submission._meta.fields if f.name != "payload"]
+    raw_id_fields = ("registration", "registrar", "record")
+    change_form_template = None
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("registration", "record")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -1,7 +1,7 @@
 import re
 
 from django.apps import AppConfig
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 
 rex1 = re.compile(r"registration/(?P<lang>.*)/(?P<name>.*)\.html")
 rex2 = re.compile(r"registration/(?P<name>.*)\.html")
@@ -13,10 +13,20 @@ class Config(AppConfig):
     def ready(self):
         from dbtemplates.models import Template
 
+        from aurora.registration.models import Record
+
         post_save.connect(
             on_templates_change,
             sender=Template,
         )
+        post_save.connect(on_record_change, sender=Record, dispatch_uid="record_watermark_save")
+        post_delete.connect(on_record_change, sender=Record, dispatch_uid="record_watermark_delete")
+
+
+def on_record_change(sender, instance, **kwargs):
+    from aurora.registration.models import touch_watermark
+
+    touch_watermark(instance.registration_id)
 
 
 def on_templates_change(sender, instance, *args, **kwargs):
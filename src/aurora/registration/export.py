@@ -0,0 +1,215 @@
+import csv
+import logging
+from itertools import islice
+from tempfile import TemporaryFile
+
+from django.conf import settings
+from django.core.files import File
+from django.forms.formsets import DEFAULT_MAX_NUM
+from django.utils import timezone
+
+from aurora.core.db import get_read_db
+from aurora.core.forms import CSVOptionsForm, DateFormatsForm
+from aurora.core.utils import build_dict
+from aurora.registration.forms import RegistrationExportForm
+from aurora.registration.models import ExportJob, Record, Registration
+
+logger = logging.getLogger(__name__)
+
+RECORD_COLUMNS = ["timestamp", "id", "ignored", "code"]
+
+
+class ExportLimitExceeded(Exception):
+    pass
+
+
+class InvalidExportOptions(Exception):
+    pass
+
+
+class ExportNotSupported(Exception):
+    pass
+
+
+class Echo:
+    """file-like object that returns what is written, used to stream csv rows"""
+
+    def write(self, value):
+        return value
+
+
+class RecordExport:
+    """Export registration records without loading them in memory.
+
+    Records are read through a server side cursor and converted one by one with `build_dict`.
+    Columns are computed from `Registration.metadata`, formset columns are expanded up to the formset
+    `max_num` (the longest formset of the sample when unbounded). Keys not described by the metadata
+    (ie. removed fields, compound values) are only found in the first `EXPORT_SAMPLE_SIZE` records.
+    """
+
+    def __init__(
+        self,
+        registration: Registration,
+        filters=None,
+        exclude=None,
+        include_fields=None,
+        exclude_fields=None,
+        chunk_size=None,
+        using=None,
+        **fmt,
+    ):
+        self.registration = registration
+        self.filters = filters or {}
+        self.exclude = exclude or {}
+        self.include_fields = include_fields
+        self.exclude_fields = exclude_fields
+        self.chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+        self.using = using
+        self.fmt = fmt
+
+    @classmethod
+    def from_options(cls, registration, options, **kwargs):
+        """build export and csv options from the submitted RegistrationExportForm/CSVOptionsForm/DateFormatsForm"""
+        form = RegistrationExportForm(options, initial={"include": ".*"})
+        opts_form = CSVOptionsForm(options, prefix="csv", initial=CSVOptionsForm.defaults)
+        fmt_form = DateFormatsForm(options, prefix="fmt", initial=DateFormatsForm.defaults)
+        if not (form.is_valid() and opts_form.is_valid() and fmt_form.is_valid()):
+            raise InvalidExportOptions({**form.errors, **opts_form.errors, **fmt_form.errors})
+        filters, exclude = form.cleaned_data["filters"]
+        export = cls(
+            registration,
+            filters=filters,
+            exclude=exclude,
+            include_fields=form.cleaned_data["include"],
+            exclude_fields=form.cleaned_data["exclude"],
+            **kwargs,
+            **fmt_form.cleaned_data,
+        )
+        return export, opts_form.cleaned_data
+
+    def get_queryset(self):
+        return (
+            Record.objects.using(self.using)
+            .filter(registration__id=self.registration.pk)
+            .filter(**self.filters)
+            .exclude(**self.exclude)
+            .values("fields", "id", "ignored", "timestamp", "registration_id")
+            .order_by("id")
+        )
+
+    def count(self):
+        return self.get_queryset().count()
+
+    def check_limit(self):
+        limit = settings.EXPORT_MAX_RECORDS
+        if limit and self.get_queryset()[: limit + 1].count() > limit:
+            raise ExportLimitExceeded(f"Too many records please change your filters. (max {limit})")
+
+    def get_columns(self):
+        metadata = self.registration.metadata
+        rows = list(self.get_queryset()[: settings.EXPORT_SAMPLE_SIZE])
+        columns = list(metadata["base"]["fields"].keys())
+        for name, info in metadata.items():
+            if name not in ["base", "scripts", "validator"]:
+                size = info.get("max_num")
+                if size is None or size >= DEFAULT_MAX_NUM:
+                    size = max((len(r["fields"][name]) for r in rows if self._is_formset(r, name)), default=0)
+                for i in range(size):
+                    columns.extend(f"{name}_{i}_{field_name}" for field_name in info["fields"].keys())
+        columns.extend(RECORD_COLUMNS)
+        seen = set(columns)
+        for record in rows:
+            for field_name in build_dict(record, **self.fmt).keys():
+                if field_name not in seen:
+                    columns.append(field_name)
+                    seen.add(field_name)
+        return columns
+
+    @staticmethod
+    def _is_formset(row, name):
+        return isinstance(row["fields"], dict) and isinstance(row["fields"].get(name), list)
+
+    def get_fieldnames(self):
+        skipped = []
+        all_fields = []
+        for field_name in self.get_columns():
+            if self.exclude_fields is not None and field_name not in skipped and field_name in self.exclude_fields:
+                skipped.append(field_name)
+            elif self.include_fields is None or field_name in self.include_fields:
+                all_fields.append(field_name)
+        return all_fields, skipped
+
+    def sample(self, size=None):
+        return [build_dict(r, **self.fmt) for r in self.get_queryset()[: size or settings.EXPORT_SAMPLE_SIZE]]
+
+    def records(self):
+        for r in self.get_queryset().iterator(chunk_size=self.chunk_size):
+            yield build_dict(r, **self.fmt)
+
+    def iter_csv(self, fieldnames=None, header=True, callback=None, **csv_options):
+        if fieldnames is None:
+            fieldnames, __ = self.get_fieldnames()
+        writer = csv.DictWriter(Echo(), fieldnames=fieldnames, restval="-", extrasaction="ignore", **csv_options)
+        if header:
+            yield writer.writeheader()
+        records = self.records()
+        processed = 0
+        while rows := list(islice(records, self.chunk_size)):
+            yield "".join(writer.writerow(row) for row in rows)
+            processed += len(rows)
+            if callback:
+                callback(processed)
+
+
+def enqueue_export(registration, owner, options):
+    """create an ExportJob for `options` and schedule it"""
+    from aurora.tasks import export_registration
+
+    job = ExportJob.objects.create(registration=registration, owner=owner, options=options)
+    result = export_registration.delay(job.pk)
+    ExportJob.objects.filter(pk=job.pk).update(task_id=result.id or "")
+    return job
+
+
+def run_export_job(job: ExportJob):
+    """write the export to the default storage, chunk by chunk, tracking the progress on the job"""
+
+    def update_progress(processed):
+        ExportJob.objects.filter(pk=job.pk).update(processed=processed)
+
+    job.status = ExportJob.RUNNING
+    job.started = timezone.now()
+    job.save(update_fields=["status", "started"])
+    try:
+        if job.options.get("format") == "parquet":
+            from aurora.registration.parquet import ParquetExport
+
+            ParquetExport.check_registration(job.registration)
+            export, __ = ParquetExport.from_options(job.registration, job.options, using=get_read_db())
+        else:
+            export, csv_options = RecordExport.from_options(job.registration, job.options, using=get_read_db())
+        export.check_limit()
+        job.total = export.count()
+        job.save(update_fields=["total"])
+        with TemporaryFile() as out:
+            if job.options.get("format") == "parquet":
+                export.to_file(out, callback=update_progress)
+                ext = export.get_extension()
+            else:
+                add_header = csv_options.pop("header")
+                fieldnames, __ = export.get_fieldnames()
+                for chunk in export.iter_csv(fieldnames, add_header, callback=update_progress, **csv_options):
+                    out.write(chunk.encode())
+                ext = "csv"
+            out.seek(0)
+            job.file.save(f"Registration_{job.registration.slug}_{job.pk}.{ext}", File(out), save=False)
+        job.refresh_from_db(fields=["processed"])
+        job.size = job.file.size
+        job.status = ExportJob.SUCCESS
+    except Exception as e:
+        logger.exception(e)
+        job.status = ExportJob.FAILURE
+        job.error = str(e)
+    job.finished = timezone.now()
+    job.save()
+    return job
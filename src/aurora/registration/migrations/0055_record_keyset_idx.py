@@ -0,0 +1,19 @@
+# Generated by Django 4.2.11 on 2026-10-18 14:28
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("registration", "0054_exportjob"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="record",
+            index=models.Index(fields=["registration", "timestamp", "id"], name="record_keyset_idx"),
+        ),
+    ]
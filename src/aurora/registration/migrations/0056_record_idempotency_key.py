@@ -0,0 +1,40 @@
+# Generated by Django 4.2.11 on 2026-10-18 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("registration", "0055_record_keyset_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="record",
+            name="idempotency_key",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        # build the unique index without locking the records table
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "record_idempotency_key" '
+                    'ON "registration_record" ("registration_id", "idempotency_key") '
+                    'WHERE "idempotency_key" IS NOT NULL',
+                    'DROP INDEX CONCURRENTLY IF EXISTS "record_idempotency_key"',
+                ),
+            ],
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name="record",
+                    constraint=models.UniqueConstraint(
+                        condition=models.Q(("idempotency_key__isnull", False)),
+                        fields=("registration", "idempotency_key"),
+                        name="record_idempotency_key",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -1,14 +1,19 @@
 import base64
 import json
 import logging
+import os
+import time
+import uuid
+from hashlib import md5
 
 from django.conf import settings
 from django.contrib.flatpages.models import FlatPage
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
 from django.utils import timezone, translation
 from django.utils.functional import cached_property
 from django.utils.text import slugify
-from django.utils.translation import gettext as _
+from django.utils.translation import get_language, gettext as _
 
 import jmespath
 from concurrency.fields import AutoIncVersionField
@@ -17,6 +22,7 @@ from natural_keys import NaturalKeyModel, NaturalKeyModelManager
 from strategy_field.fields import StrategyField
 from strategy_field.utils import fqn
 
+from aurora.core.cache import get_forms_version, get_formsets_signature, metadata_cache
 from aurora.core.crypto import crypt, Crypto, decrypt, decrypt_offline
 from aurora.core.fields import AjaxSelectField, LabelOnlyField
 from aurora.core.forms import VersionMedia
@@ -32,6 +38,9 @@ logger = logging.getLogger(__name__)
 
 undefined = object()
 
+METADATA_KEY = "registration:metadata:{}"
+METADATA_TTL = 60 * 60 * 24
+
 
 class RegistrationManager(NaturalKeyModelManager):
     def get_queryset(self):
@@ -212,7 +221,24 @@ class Registration(NaturalKeyModel, I18NModel, models.Model):
         return links
 
     @cached_property
-    def metadata(self):
+    def metadata_signature(self):
+        """changes whenever the metadata may change: form, (nested) formsets, child forms, scripts,
+        OptionSet/CustomFieldType (forms version) and the language"""
+        formsets = get_formsets_signature(self.flex_form)
+        scripts = tuple(self.scripts.order_by("pk").values_list("pk", "name"))
+        signature = (
+            self.pk,
+            self.version,
+            self.flex_form_id,
+            self.flex_form.version,
+            get_language(),
+            formsets,
+            scripts,
+            get_forms_version(),
+        )
+        return md5(str(signature).encode()).hexdigest()
+
+    def get_metadata(self):
         script: Validator
 
         def _get_validator(owner):
@@ -244,7 +270,7 @@ class Registration(NaturalKeyModel, I18NModel, models.Model):
             "scripts": [],
             "validator": _get_validator(self.flex_form),
         }
-        for name, fs in self.flex_form.get_formsets({}).items():
+        for name, fs in self.flex_form.get_formsets_classes().items():
             metadata[name] = {
                 "fields": _process_form(fs.form.flex_form),
                 "min_num": fs.min_num,
@@ -253,11 +279,44 @@ class Registration(NaturalKeyModel, I18NModel, models.Model):
             }
 
         for script in self.scripts.all():
-            url = state.request.build_absolute_uri(script.get_script_url())
-            metadata["scripts"].append({"name": script.name, "url": url})
+            metadata["scripts"].append({"name": script.name, "url": script.get_script_url()})
 
         return metadata
 
+    @cached_property
+    def metadata(self):
+        """`get_metadata()` cached by `metadata_signature` in the process (L1) and in the shared cache.
+
+        Script urls are stored relative and made absolute when a request is available.
+        The returned structure is shared: do not modify it.
+        """
+        key = METADATA_KEY.format(self.metadata_signature)
+        try:
+            metadata = metadata_cache[key]
+        except KeyError:
+            metadata = cache.get(key)
+            if metadata is None:
+                metadata = self.get_metadata()
+                cache.set(key, metadata, timeout=METADATA_TTL)
+            metadata_cache[key] = metadata
+        if request := getattr(state, "request", None):
+            scripts = [{**script, "url": request.build_absolute_uri(script["url"])} for script in metadata["scripts"]]
+            metadata = {**metadata, "scripts": scripts}
+        return metadata
+
+
+WATERMARK_KEY = "registration:watermark:{}"
+
+
+def get_watermark(registration_id):
+    """time (ns) of the last change of the records of `registration_id`. Seeded with 'now' when not set"""
+    return cache.get_or_set(WATERMARK_KEY.format(registration_id), time.time_ns, timeout=None)
+
+
+def touch_watermark(registration_id):
+    """move the watermark once the current transaction (if any) is committed"""
+    transaction.on_commit(lambda: cache.set(WATERMARK_KEY.format(registration_id), time.time_ns(), timeout=None))
+
 
 class RemoteIp(models.GenericIPAddressField):
     def pre_save(self, model_instance, add):
@@ -286,6 +345,8 @@ class Record(models.Model):
     index3 = models.CharField(null=True, blank=True, max_length=255)
 
     is_offline = models.BooleanField(default=False)
+    # client generated key of offline submissions, makes batch uploads idempotent
+    idempotency_key = models.CharField(max_length=64, blank=True, null=True)
     registrar = models.ForeignKey(settings.AUTH_USER_MODEL, blank=True, null=True, on_delete=models.SET_NULL)
 
     @property
@@ -297,6 +358,17 @@ class Record(models.Model):
 
     class Meta:
         unique_together = ("registration", "unique_field")
+        indexes = [
+            # keyset pagination of the records API
+            models.Index(fields=["registration", "timestamp", "id"], name="record_keyset_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["registration", "idempotency_key"],
+                condition=models.Q(idempotency_key__isnull=False),
+                name="record_idempotency_key",
+            ),
+        ]
 
     def decrypt(self, private_key=undefined, secret=undefined):
         if self.is_offline:
@@ -306,11 +378,12 @@ class Record(models.Model):
             if private_key != undefined:
                 files = json.loads(decrypt(self.files, private_key))
                 fields = json.loads(decrypt(base64.b64decode(self.fields), private_key))
-                return router.compress(fields, files)
+                return router.compress(fields, files, lambda content: decrypt(content, private_key, decode=False))
             elif secret != undefined:
-                files = json.loads(Crypto(secret).decrypt(self.files))
-                fields = json.loads(Crypto(secret).decrypt(self.fields))
-                return router.compress(fields, files)
+                crypter = Crypto(secret)
+                files = json.loads(crypter.decrypt(self.files))
+                fields = json.loads(crypter.decrypt(self.fields))
+                return router.compress(fields, files, crypter.decrypt_bytes)
 
     @property
     def unicef_id(self):
@@ -332,6 +405,84 @@ class Record(models.Model):
             return merge(files, self.fields or {})
 
 
+class ExportJob(models.Model):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCESS = "success"
+    FAILURE = "failure"
+
+    registration = models.ForeignKey(Registration, on_delete=models.CASCADE, related_name="export_jobs")
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, blank=True, null=True, on_delete=models.SET_NULL)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(blank=True, null=True)
+    finished = models.DateTimeField(blank=True, null=True)
+    status = models.CharField(
+        max_length=10,
+        default=PENDING,
+        choices=((PENDING, "Pending"), (RUNNING, "Running"), (SUCCESS, "Success"), (FAILURE, "Failure")),
+    )
+    options = models.JSONField(default=dict, blank=True, help_text="submitted export/csv/date formats options")
+    total = models.IntegerField(default=0)
+    processed = models.IntegerField(default=0)
+    file = models.FileField(upload_to="exports/", blank=True, null=True)
+    size = models.BigIntegerField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    task_id = models.CharField(max_length=255, blank=True, null=True)
+
+    class Meta:
+        ordering = ("-created",)
+
+    def __str__(self):
+        return f"{self.registration} #{self.pk}"
+
+    @property
+    def progress(self):
+        if self.status == self.SUCCESS:
+            return 100
+        if not self.total:
+            return 0
+        return min(100, int(self.processed * 100 / self.total))
+
+    @property
+    def filename(self):
+        # csv, parquet or zip (parquet tables of a registration with formsets)
+        ext = os.path.splitext(self.file.name)[1] if self.file else ".csv"
+        return f"Registration_{self.registration.slug}_{self.pk}{ext}"
+
+
+class Submission(models.Model):
+    """Validated data waiting to be saved as Record (see `QueueToDB` strategy).
+
+    `payload` holds the Record columns, already encrypted as the registration requires, sealed with
+    FERNET_KEY. It is cleared once processed.
+    """
+
+    PENDING = "pending"
+    SUCCESS = "success"
+    FAILURE = "failure"
+
+    receipt = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    registration = models.ForeignKey(Registration, on_delete=models.CASCADE, related_name="submissions")
+    registrar = models.ForeignKey(settings.AUTH_USER_MODEL, blank=True, null=True, on_delete=models.SET_NULL)
+    created = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(
+        max_length=10,
+        default=PENDING,
+        choices=((PENDING, "Pending"), (SUCCESS, "Success"), (FAILURE, "Failure")),
+    )
+    payload = models.BinaryField(blank=True, null=True)
+    record = models.OneToOneField(Record, blank=True, null=True, on_delete=models.SET_NULL)
+    error = models.TextField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["id"], condition=models.Q(status="pending"), name="submission_pending_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.registration} {self.receipt}"
+
+
 def merge(a, b, path=None, update=True):
     """merges b into a"""
     if path is None:
@@ -0,0 +1,89 @@
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+from dbtemplates.utils.cache import get_templates_version
+
+from aurora.core.utils import get_system_cache_version
+from aurora.i18n.engine import get_serial
+from aurora.state import state
+from aurora.web.middlewares.minify import HtmlMinMiddleware
+
+KEY = "register:page:{pk}:{etag}:{forms}:{templates}:{i18n}:{encoding}"
+
+re_accepts_gzip = re.compile(r"\bgzip\b")
+
+minifier = HtmlMinMiddleware()
+
+
+class PageCache:
+    """Rendered registration pages, stored minified (and gzipped if accepted by the client) in the shared cache.
+
+    Pages are keyed by the response ETag, so they are dropped with the registration version bump, and by the
+    versions of what the rendering depends on: forms (`Registration.metadata_signature`: main form, formsets,
+    child forms, OptionSet, CustomFieldType), templates and translations.
+    """
+
+    def __init__(self, request, registration, etag):
+        self.request = request
+        self.etag = etag = str(etag)
+        self.encoding = "gzip" if re_accepts_gzip.search(request.headers.get("Accept-Encoding", "")) else ""
+        self.key = KEY.format(
+            pk=registration.pk,
+            etag=etag.strip('"'),
+            forms=registration.metadata_signature,
+            templates=get_templates_version(),
+            i18n=get_serial(),
+            encoding=self.encoding,
+        )
+
+    def get(self):
+        if cached := cache.get(self.key, version=get_system_cache_version()):
+            content, content_type, encoding = cached
+            return self.finalize(HttpResponse(content, content_type=content_type), encoding)
+        return None
+
+    def set(self, response):
+        if response.status_code != 200 or response.streaming:
+            return response
+        if hasattr(response, "render"):
+            response.render()
+        minifier.minify(self.request, response)
+        encoding = ""
+        if self.encoding and len(response.content) >= 200:
+            response.content, encoding = compress_string(response.content), self.encoding
+        cache.set(
+            self.key,
+            (response.content, response["Content-Type"], encoding),
+            settings.PAGE_CACHE_TTL,
+            version=get_system_cache_version(),
+        )
+        return self.finalize(response, encoding)
+
+    def finalize(self, response, encoding):
+        # the body is final: skip HtmlMinMiddleware and GZipMiddleware
+        self.request.no_minify = True
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+            # as GZipMiddleware: the compressed body is not byte-for-byte equal to the uncompressed one
+            response.headers["ETag"] = f"W/{self.etag}"
+        response.headers["Content-Length"] = str(len(response.content))
+        return response
+
+
+def get_page_cache(request, registration, etag):
+    """PageCache for `request`, None if the page must be rendered (authenticated users, I18N_SESSION collect mode)"""
+    if (
+        not settings.PAGE_CACHE_TTL
+        or state.collect_messages
+        or request.user.is_authenticated
+        or request.GET
+        or request.headers.get("X-No-Minify")
+    ):
+        return None
+    return PageCache(request, registration, etag)
@@ -0,0 +1,216 @@
+import datetime
+import json
+import logging
+import zipfile
+from collections import Counter
+from tempfile import TemporaryFile
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from aurora.registration.export import ExportNotSupported, RecordExport
+
+logger = logging.getLogger(__name__)
+
+# form field (fqn) -> arrow type. Everything else is exported as string
+FIELD_TYPES = {
+    "django.forms.fields.BooleanField": pa.bool_(),
+    "django.forms.fields.NullBooleanField": pa.bool_(),
+    "django.forms.fields.IntegerField": pa.int64(),
+    "django.forms.fields.FloatField": pa.float64(),
+    "django.forms.fields.DecimalField": pa.float64(),
+    "django.forms.fields.DateField": pa.date32(),
+    "django.forms.fields.DateTimeField": pa.timestamp("us", tz="UTC"),
+    "django.forms.fields.MultipleChoiceField": pa.list_(pa.string()),
+    "aurora.core.fields.multi_checkbox.MultiCheckboxField": pa.list_(pa.string()),
+}
+
+RECORD_SCHEMA = [
+    ("id", pa.int64()),
+    ("timestamp", pa.timestamp("us", tz="UTC")),
+    ("ignored", pa.bool_()),
+]
+
+
+def to_string(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def to_bool(value):
+    if isinstance(value, str):
+        return {"true": True, "1": True, "y": True, "false": False, "0": False, "n": False}.get(value.lower())
+    return None if value is None else bool(value)
+
+
+def to_date(value):
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value[:10])
+    return value
+
+
+def to_datetime(value):
+    if isinstance(value, str):
+        return datetime.datetime.fromisoformat(value)
+    return value
+
+
+def to_list(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = [v for v in value.split(",") if v]
+    return [to_string(v) for v in value]
+
+
+CONVERTERS = {
+    pa.bool_(): to_bool,
+    pa.int32(): int,
+    pa.int64(): int,
+    pa.float64(): float,
+    pa.date32(): to_date,
+    pa.timestamp("us", tz="UTC"): to_datetime,
+    pa.list_(pa.string()): to_list,
+}
+
+
+def convert(value, type_):
+    if value in (None, ""):
+        return None
+    return CONVERTERS.get(type_, to_string)(value)
+
+
+class TableWriter:
+    def __init__(self, fileobj, schema):
+        self.schema = schema
+        self.writer = pq.ParquetWriter(fileobj, schema, compression="snappy")
+        self.rows = {name: [] for name in schema.names}
+        # column -> values not matching the declared type (ie. older form versions), exported as null
+        self.errors = Counter()
+
+    def __len__(self):
+        return len(self.rows[self.schema.names[0]])
+
+    def append(self, row):
+        for field in self.schema:
+            try:
+                value = convert(row.get(field.name), field.type)
+            except (TypeError, ValueError):
+                value = None
+                self.errors[field.name] += 1
+            self.rows[field.name].append(value)
+
+    def flush(self):
+        if len(self):
+            self.writer.write_batch(pa.RecordBatch.from_pydict(self.rows, schema=self.schema))
+            self.rows = {name: [] for name in self.schema.names}
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.writer.close()
+
+
+class ParquetExport(RecordExport):
+    """Export registration records as Parquet.
+
+    The Arrow schema is derived from `Registration.metadata`: base fields are written to
+    the main table, each formset is exploded into a child table linked by `record_id`.
+    Records are read with a server side cursor and written in row groups of `chunk_size` rows.
+    Values that can not be converted to the column type are written as null and counted in `errors`.
+    Encrypted registrations are not supported: their records hold ciphertext, not the fields.
+    """
+
+    errors = None
+
+    @staticmethod
+    def check_registration(registration):
+        if registration.public_key or registration.encrypt_data:
+            raise ExportNotSupported("Parquet export is not available for encrypted registrations")
+
+    def _selected(self, name):
+        if self.exclude_fields is not None and name in self.exclude_fields:
+            return False
+        return self.include_fields is None or name in self.include_fields
+
+    def _fields_schema(self, fields):
+        return [
+            (name, FIELD_TYPES.get(info["type"], pa.string())) for name, info in fields.items() if self._selected(name)
+        ]
+
+    def get_schemas(self):
+        metadata = self.registration.metadata
+        schemas = {None: pa.schema(self._fields_schema(metadata["base"]["fields"]) + RECORD_SCHEMA)}
+        for name, info in metadata.items():
+            if name not in ["base", "scripts", "validator"]:
+                schemas[name] = pa.schema(
+                    [("record_id", pa.int64()), ("row", pa.int32())] + self._fields_schema(info["fields"])
+                )
+        return schemas
+
+    def get_filenames(self):
+        return {
+            name: f"{self.registration.slug}_{name}.parquet" if name else f"{self.registration.slug}.parquet"
+            for name in self.get_schemas()
+        }
+
+    def get_extension(self):
+        return "parquet" if len(self.get_filenames()) == 1 else "zip"
+
+    def write(self, files, callback=None):
+        """write each table to the matching `files[table]` file object. Returns the number of records written"""
+        writers = {name: TableWriter(files[name], schema) for name, schema in self.get_schemas().items()}
+        count = 0
+        try:
+            for r in self.get_queryset().iterator(chunk_size=self.chunk_size):
+                # records saved before the registration was encrypted
+                fields = r["fields"] if isinstance(r["fields"], dict) else {}
+                writers[None].append({**fields, **r})
+                for name, writer in writers.items():
+                    if name is None:
+                        continue
+                    for i, row in enumerate(fields.get(name) or []):
+                        writer.append({**row, "record_id": r["id"], "row": i})
+                count += 1
+                if count % self.chunk_size == 0:
+                    for writer in writers.values():
+                        writer.flush()
+                    if callback:
+                        callback(count)
+        finally:
+            for writer in writers.values():
+                writer.close()
+        self.errors = {
+            (name or "base", column): errors
+            for name, writer in writers.items()
+            for column, errors in writer.errors.items()
+        }
+        for (table, column), errors in self.errors.items():
+            logger.warning(f"{self.registration.slug}: {errors} '{table}.{column}' values exported as null")
+        if callback:
+            callback(count)
+        return count
+
+    def to_file(self, out, callback=None):
+        """write the export to `out`. A single parquet file if the registration has no formsets, a zip otherwise"""
+        filenames = self.get_filenames()
+        if len(filenames) == 1:
+            self.write({None: out}, callback)
+            return filenames[None]
+        files = {name: TemporaryFile() for name in filenames}
+        try:
+            self.write(files, callback)
+            with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_STORED) as archive:
+                for name, f in files.items():
+                    f.seek(0)
+                    with archive.open(filenames[name], "w") as target:
+                        while chunk := f.read(1024 * 1024):
+                            target.write(chunk)
+        finally:
+            for f in files.values():
+                f.close()
+        return f"{self.registration.slug}.zip"
@@ -1,57 +1,165 @@
 import base64
+import hashlib
+import hmac
+import io
 
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage, storages
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.files.utils import FileProxyMixin
 
+from aurora.core.crypto import crypt, Crypto
 from aurora.core.utils import apply_nested, merge_data
 
-marker = object()
+# multiple of 3: each chunk is base64 encoded on its own without padding
+CHUNK_SIZE = 3 * 64 * 1024
 
+# prefix of the references to files saved by FileStore. Cannot be confused with base64 content
+FILE_REF = "storage:"
 
-def clean_dict(d, filter_func):
-    ret = {}
-    if filter_func(d):
-        return ret
-    if isinstance(d, dict):
-        for key, value in list(d.items()):
-            if filter_func(value):
-                del d[key]
-                continue
-            elif isinstance(value, dict):
-                new_val = clean_dict(value, filter_func)
-            elif isinstance(value, list) and value:
-                if isinstance(value[0], dict):
-                    new_val = [clean_dict(e, filter_func) for e in value]
-                else:
-                    new_val = [e for e in value if not filter_func(e)]
-            else:
-                new_val = value
-            if new_val:
-                ret[key] = new_val or None
-    return ret
+
+def encode_file(f, chunk_size=CHUNK_SIZE):
+    """base64 content of `f`, read `chunk_size` bytes at a time"""
+    out = io.BytesIO()
+    rest = b""
+    while chunk := f.read(chunk_size):
+        data = rest + chunk if rest else chunk
+        cut = len(data) - len(data) % 3
+        out.write(base64.b64encode(memoryview(data)[:cut]))
+        rest = data[cut:]
+    out.write(base64.b64encode(rest))
+    return out.getvalue()
+
+
+def get_files_storage():
+    """storage of the uploaded files: STORAGES["records"] if configured, the default storage otherwise"""
+    if "records" in settings.STORAGES:
+        return storages["records"]
+    return default_storage
+
+
+class FileStore:
+    """Save uploaded files of `registration` to the files storage.
+
+    Names are content addressed (keyed hash of the content) so the same file uploaded twice
+    is stored once. Files of encrypted registrations are encrypted before being saved.
+    Returns a `FILE_REF` reference to be stored in `Record.files`.
+    """
+
+    def __init__(self, registration):
+        self.registration = registration
+        self.storage = get_files_storage()
+
+    def get_key(self):
+        """key the files are encrypted with: contents encrypted with different keys must not share a name"""
+        if self.registration.public_key:
+            return self.registration.public_key.encode()
+        if self.registration.encrypt_data:
+            return str(settings.FERNET_KEY).encode()
+        return b""
+
+    def get_name(self, f):
+        digest = hmac.new(settings.SECRET_KEY.encode(), digestmod=hashlib.sha256)
+        digest.update(hashlib.sha256(self.get_key()).digest())
+        f.seek(0)
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+        f.seek(0)
+        return f"records/{self.registration.pk}/{digest.hexdigest()}"
+
+    def encrypt(self, content):
+        if self.registration.public_key:
+            return crypt(content, self.registration.public_key)
+        return Crypto().encrypt_bytes(content)
+
+    def __call__(self, f):
+        name = self.get_name(f)
+        encrypted = self.registration.public_key or self.registration.encrypt_data
+        if self.storage.exists(name):
+            # plain files are stored as uploaded
+            size = self.storage.size(name) if encrypted else f.size
+        elif encrypted:
+            content = self.encrypt(f.read())
+            name, size = self.storage.save(name, ContentFile(content)), len(content)
+        else:
+            name, size = self.storage.save(name, File(f)), f.size
+        return FILE_REF + name, size
+
+
+class StoredFile(File):
+    """file saved by FileStore, read (and decrypted) on first access"""
+
+    def __init__(self, name, path, decrypt=None):
+        self._file = None
+        self.name = name
+        self.path = path
+        self.decrypt = decrypt
+
+    @property
+    def file(self):
+        if self._file is None:
+            with get_files_storage().open(self.path, "rb") as f:
+                content = f.read()
+            self._file = io.BytesIO(self.decrypt(content) if self.decrypt else content)
+        return self._file
+
+    @file.setter
+    def file(self, value):
+        self._file = value
 
 
 class Router:
-    def compress(self, fields, files):
-        ff = apply_nested(files, lambda v, k: SimpleUploadedFile(k, v if isinstance(v, bytes) else v.encode()))
-        return merge_data(fields, ff)
+    def compress(self, fields, files, decrypt=None):
+        def to_file(v, k):
+            if isinstance(v, str) and v.startswith(FILE_REF):
+                return StoredFile(k, v[len(FILE_REF) :], decrypt)
+            return SimpleUploadedFile(k, v if isinstance(v, bytes) else v.encode())
 
-    def decompress(self, data):
-        def files_exclude(v, k):
-            if isinstance(v, FileProxyMixin):
-                return "::file::"
-            return v
+        return merge_data(fields, apply_nested(files, to_file))
 
-        def files_keep(v, k):
-            if isinstance(v, FileProxyMixin):
-                return base64.b64encode(v.read())
-            return marker
+    @staticmethod
+    def encode(f):
+        content = encode_file(f)
+        return content, len(content)
 
-        fields = {field_name: apply_nested(field, files_exclude) for field_name, field in data.items()}
-        files = {field_name: apply_nested(field, files_keep) for field_name, field in data.items()}
+    def split(self, data, store=None):
+        """split cleaned data in one pass.
 
-        fields = clean_dict(fields, lambda x: x == "::file::")
-        files = clean_dict(files, lambda x: x is marker)
+        Returns the fields tree, the files tree and the size of the stored files.
+        Each file is converted by `store(file) -> (value, size)`, by default to its base64 content.
+        """
+        store = store or self.encode
+        fields, files, size = {}, {}, 0
+        for key, value in data.items():
+            if isinstance(value, FileProxyMixin):
+                field_value, (files_value, value_size) = None, store(value)
+                size += value_size
+            elif isinstance(value, dict):
+                field_value, files_value, value_size = self.split(value, store)
+                size += value_size
+            elif isinstance(value, list) and value and isinstance(value[0], dict):
+                parts = [self.split(e, store) if isinstance(e, dict) else ({}, {}, 0) for e in value]
+                field_value = [p[0] for p in parts]
+                files_value = [p[1] for p in parts]
+                size += sum(p[2] for p in parts)
+            elif isinstance(value, list):
+                field_value = [e for e in value if not isinstance(e, FileProxyMixin)]
+                stored = [store(e) for e in value if isinstance(e, FileProxyMixin)]
+                files_value = [e for e, __ in stored]
+                size += sum(s for __, s in stored)
+            else:
+                field_value, files_value = value, None
+            # empty values are not stored
+            if field_value:
+                fields[key] = field_value
+            if files_value:
+                files[key] = files_value
+        return fields, files, size
+
+    def decompress(self, data):
+        fields, files, __ = self.split(data)
         return fields, files
 
 
@@ -1,14 +1,17 @@
 import base64
 
+from django.db import transaction
 from django.db.transaction import atomic
+from django.http import HttpResponseRedirect
 from django.shortcuts import render
 from django.urls import reverse
 
 from strategy_field.registry import Registry
 
 from aurora.core.crypto import Crypto
-from aurora.core.utils import jsonfy, safe_json, total_size
-from aurora.registration.storage import router
+from aurora.core.utils import json_dumpb, json_loads, safe_json
+from aurora.counters import live as live_counters
+from aurora.registration.storage import FileStore, router
 from aurora.state import state
 
 
@@ -23,10 +26,19 @@ class RegistrationStrategy:
 class SaveToDB(RegistrationStrategy):
     verbose_name = "Save To DB"
 
-    def save(self, fields_data, **kwargs):
+    def split(self, fields_data):
+        return router.split(fields_data)
+
+    def get_registrar(self):
+        if state.request and state.request.user.is_authenticated:
+            return state.request.user
+        return None
+
+    def get_record(self, fields, files, files_size, registrar=None, counters=None, index1=None):
+        """encrypt the split data into a new, unsaved, Record"""
         from aurora.registration.models import Record
 
-        fields, files = router.decompress(fields_data)
+        fields_json = json_dumpb(fields)
         crypter = Crypto()
         if self.registration.public_key:
             kwargs = {
@@ -44,25 +56,79 @@ class SaveToDB(RegistrationStrategy):
             kwargs = {
                 # "storage": safe_json(fields_data).encode(),
                 "files": safe_json(files).encode(),
-                "fields": jsonfy(fields),
+                "fields": json_loads(fields_json),
             }
         if self.registration.unique_field_path and not kwargs.get("unique_field", None):
             unique_value = self.registration.get_unique_value(fields)
             kwargs["unique_field"] = unique_value
-        if state.request and state.request.user.is_authenticated:
-            registrar = state.request.user
-        else:
-            registrar = None
         kwargs.update(
             {
                 "registrar": registrar,
-                "size": total_size(fields) + total_size(files),
-                "counters": fields_data.get("counters", {}),
-                "index1": fields_data.get("index1", None),
+                "size": len(fields_json) + files_size,
+                "counters": counters or {},
+                "index1": index1,
             }
         )
+        return Record(registration=self.registration, **kwargs)
+
+    def build_record(self, fields_data):
+        fields, files, files_size = self.split(fields_data)
+        return self.get_record(
+            fields,
+            files,
+            files_size,
+            registrar=self.get_registrar(),
+            counters=fields_data.get("counters", {}),
+            index1=fields_data.get("index1", None),
+        )
+
+    def save(self, fields_data, **kwargs):
+        record = self.build_record(fields_data)
+        record.save(force_insert=True)
+        transaction.on_commit(lambda: live_counters.increment(record.registration_id, record.timestamp))
+        return record
+
+
+class SaveToStorage(SaveToDB):
+    """Save To DB, uploaded files are saved to the files storage and `Record.files` only holds references"""
+
+    verbose_name = "Save To DB (files to storage)"
+
+    def split(self, fields_data):
+        return router.split(fields_data, store=FileStore(self.registration))
+
 
-        return Record.objects.create(registration=self.registration, **kwargs)
+class QueueToDB(SaveToDB):
+    """Save To DB in background.
+
+    Validated data is staged as `Submission` and saved in batches by `aurora.tasks.process_submissions`,
+    the user is redirected to the receipt page that resolves the record once processed.
+    """
+
+    verbose_name = "Save To DB (queued)"
+
+    def save(self, fields_data, **kwargs):
+        from aurora.registration.models import Submission
+        from aurora.tasks import process_submissions
+
+        # data is encrypted here: with a `public_key` the staged payload can not be read by the server
+        record = self.build_record(fields_data)
+        payload = {
+            "fields": record.fields,
+            "files": base64.b64encode(bytes(record.files)).decode(),
+            "size": record.size,
+            "unique_field": record.unique_field,
+            "counters": record.counters,
+            "index1": record.index1,
+        }
+        submission = Submission.objects.create(
+            registration=self.registration,
+            registrar=record.registrar,
+            payload=Crypto().encrypt_bytes(json_dumpb(payload)),
+        )
+        # broker errors are logged, not raised: pending submissions are swept by the beat schedule
+        transaction.on_commit(lambda: process_submissions.delay(self.registration.pk), robust=True)
+        return HttpResponseRedirect(reverse("register-receipt", args=[self.registration.pk, submission.receipt]))
 
 
 class TransactionTestStrategy(SaveToDB):
@@ -106,7 +172,7 @@ class DisplayTestStrategy(RegistrationStrategy):
     def save(self, fields_data, **kwargs):
         from aurora.registration.models import Record
 
-        fields, files = router.decompress(fields_data)
+        fields, files, files_size = router.split(fields_data)
 
         if state.request and state.request.user.is_authenticated:
             registrar = state.request.user
@@ -115,7 +181,7 @@ class DisplayTestStrategy(RegistrationStrategy):
         kwargs.update(
             {
                 "registrar": registrar,
-                "size": total_size(fields) + total_size(files),
+                "size": len(json_dumpb(fields)) + files_size,
                 "counters": fields_data.get("counters", {}),
                 "index1": fields_data.get("index1", None),
                 "fields": fields,
@@ -135,6 +201,8 @@ class Strategies(Registry):
 strategies = Strategies(RegistrationStrategy, label_attribute="verbose_name")
 
 strategies.register(SaveToDB)
+strategies.register(SaveToStorage)
+strategies.register(QueueToDB)
 strategies.register(SaveAndDisplayTestStrategy)
 strategies.register(DisplayTestStrategy)
 strategies.register(TransactionTestStrategy)
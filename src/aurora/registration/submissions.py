@@ -0,0 +1,82 @@
+import base64
+import logging
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from aurora.core.crypto import Crypto
+from aurora.core.utils import json_loads
+from aurora.counters import live as live_counters
+from aurora.registration.models import Record, Submission, touch_watermark
+
+logger = logging.getLogger(__name__)
+
+
+def get_record(submission: Submission) -> Record:
+    payload = json_loads(Crypto().decrypt_bytes(bytes(submission.payload)))
+    payload["files"] = base64.b64decode(payload["files"])
+    return Record(registration=submission.registration, registrar=submission.registrar, **payload)
+
+
+def save_batch(submissions):
+    """save `submissions` as records with a single insert.
+
+    If the insert fails (ie. unique_field collisions, values too long) records are saved one by one,
+    only the failing submissions are marked as failed.
+    """
+    pairs = []
+    for submission in submissions:
+        try:
+            pairs.append((submission, get_record(submission)))
+        except Exception as e:
+            logger.exception(e)
+            submission.status, submission.error = Submission.FAILURE, str(e)
+    try:
+        with transaction.atomic():
+            Record.objects.bulk_create([record for __, record in pairs])
+        saved = pairs
+    except DatabaseError:
+        saved = []
+        for submission, record in pairs:
+            record.pk = None
+            try:
+                with transaction.atomic():
+                    record.save(force_insert=True)
+                saved.append((submission, record))
+            except DatabaseError as e:
+                submission.status, submission.error = Submission.FAILURE, str(e)
+
+    # records keep their insert time (`timestamp` is a cursor for the records API), the submission time
+    # is `record.submission.created`. Payloads are kept on failure so the data can be recovered
+    for submission, record in saved:
+        submission.status, submission.record, submission.payload = Submission.SUCCESS, record, None
+    Submission.objects.bulk_update(submissions, ["status", "record", "payload", "error"])
+
+    for registration_id, count in Counter(record.registration_id for __, record in saved).items():
+        touch_watermark(registration_id)
+        transaction.on_commit(lambda r=registration_id, c=count: live_counters.increment(r, count=c))
+    return len(saved)
+
+
+def process_submissions(registration_id=None, batch_size=None):
+    """save pending submissions as records, `batch_size` at a time. Returns the number of saved records.
+
+    Pending rows are locked with SKIP LOCKED so any number of workers can run concurrently.
+    """
+    batch_size = batch_size or settings.SUBMISSION_BATCH_SIZE
+    qs = (
+        Submission.objects.filter(status=Submission.PENDING)
+        .select_related("registration", "registrar")
+        .select_for_update(skip_locked=True, of=("self",))
+        .order_by("id")
+    )
+    if registration_id:
+        qs = qs.filter(registration_id=registration_id)
+    saved = 0
+    while True:
+        with transaction.atomic():
+            submissions = list(qs[:batch_size])
+            if not submissions:
+                return saved
+            saved += save_batch(submissions)
@@ -3,6 +3,7 @@ from django.urls import path
 from .views import (
     authorize_cookie,
     get_pwa_enabled,
+    OfflineBatchView,
     QRVerify,
     RegisterAuthView,
     RegisterCompleteView,
@@ -10,19 +11,25 @@ from .views import (
     RegisterView,
     RegistrationDataApi,
     RegistrationDataView,
+    RegistrationFeedApi,
+    RegistrationFileApi,
     registrations,
 )
 
 urlpatterns = [
     path("route/", RegisterRouter.as_view(), name="registration-router"),
     path("register/complete/<int:reg>/<int:rec>/", RegisterCompleteView.as_view(), name="register-done"),
+    path("register/complete/<int:reg>/<uuid:receipt>/", RegisterCompleteView.as_view(), name="register-receipt"),
     path("register/qr/<int:pk>/<str:hash>/", QRVerify.as_view(), name="register-verify"),
     path("register/<slug:slug>/", RegisterView.as_view(), name="register"),
     # path("register/<int:pk>/data/", RegistrationDataView.as_view(), name="register-data"),
     path("register/<slug:slug>/data/", RegistrationDataView.as_view(), name="register-data"),
+    path("register/<slug:slug>/offline/", OfflineBatchView.as_view(), name="register-offline"),
     path("register/<slug:slug>/auth/", RegisterAuthView.as_view(), name="register-auth"),
     path("register/<slug:slug>/<int:version>/", RegisterView.as_view(), name="register"),
     path("api/data/<int:pk>/<int:start>/<int:end>/", RegistrationDataApi.as_view(), name="api"),
+    path("api/data/<int:pk>/feed/", RegistrationFeedApi.as_view(), name="api-feed"),
+    path("api/data/<int:pk>/file/<path:name>", RegistrationFileApi.as_view(), name="api-file"),
     path("registrations/", registrations, name="registrations"),
     path("get_pwa_enabled/", get_pwa_enabled, name="get_pwa_enabled"),
     path("authorize_cookie/", authorize_cookie, name="authorize_cookie"),
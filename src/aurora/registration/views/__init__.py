@@ -1,5 +1,6 @@
-from .api import RegistrationDataApi
+from .api import RegistrationDataApi, RegistrationFeedApi, RegistrationFileApi
 from .data import RegistrationDataView
+from .offline import OfflineBatchView
 from .registration import (
     authorize_cookie,
     get_pwa_enabled,
@@ -1,17 +1,29 @@
+import base64
+import json
+
+from django.conf import settings
 from django.core.exceptions import PermissionDenied
-from django.http import HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_datetime
+from django.views import View
 from django.views.generic.list import ListView
 
 from admin_extra_buttons.utils import handle_basic_auth
 
-from aurora.core.utils import JSONEncoder
+from aurora.core.db import get_read_db, read_only_view
+from aurora.core.utils import json_dumpb, JSONResponse, ranged_file_response
 from aurora.registration.models import Record, Registration
+from aurora.registration.storage import get_files_storage
+
+FEED_FIELDS = ["id", "remote_ip", "timestamp", "fields", "index1", "is_offline"]
+FEED_BLOBS = ["files", "storage"]
 
 
 class RegistrationDataApi(ListView):
     model = Record
 
+    @read_only_view()
     def get(self, request, *args, **kwargs):
         try:
             handle_basic_auth(request)
@@ -29,4 +41,84 @@ class RegistrationDataApi(ListView):
                 "id", "remote_ip", "timestamp", "files", "fields", "storage"
             )[:1000]
         )
-        return JsonResponse({"reg": reg.pk, "start": start, "end": end, "data": data}, encoder=JSONEncoder)
+        return JSONResponse({"reg": reg.pk, "start": start, "end": end, "data": data})
+
+
+def encode_resume_token(last_id):
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode()).decode()
+
+
+def decode_resume_token(token):
+    return int(json.loads(base64.urlsafe_b64decode(token.encode()))["id"])
+
+
+class RegistrationFeedApi(View):
+    """Incremental NDJSON feed of the records of a registration.
+
+    Query params:
+    - `after`: resume token returned by a previous call, or the id of the last record received
+    - `since`: ISO timestamp, only used when `after` is not provided
+    - `blobs=1`: include `files` and `storage`
+    - `limit`: max number of records to return (capped at FEED_MAX_RECORDS)
+
+    One record per line, ordered by id, read with a server side cursor. The last line is
+    `{"resume": <token>, "count": <n>, "complete": <bool>}`; a client interrupted mid-stream
+    can resume from the `id` of the last record it received.
+    Responses are gzip-compressed by GZipMiddleware when the client accepts it.
+    """
+
+    @staticmethod
+    def get_after(request):
+        after = request.GET.get("after", "")
+        if not after:
+            return 0
+        if after.isdigit():
+            return int(after)
+        return decode_resume_token(after)
+
+    def get(self, request, pk):
+        try:
+            handle_basic_auth(request)
+        except PermissionDenied:
+            return HttpResponse(status=401)
+        reg = get_object_or_404(Registration, id=pk)
+        try:
+            after = self.get_after(request)
+            limit = min(int(request.GET.get("limit") or settings.FEED_MAX_RECORDS), settings.FEED_MAX_RECORDS)
+        except (TypeError, ValueError, KeyError):
+            return HttpResponseBadRequest("Invalid 'after' or 'limit'")
+        qs = Record.objects.using(get_read_db()).filter(registration_id=reg.pk, id__gt=after)
+        if not after and (since := parse_datetime(request.GET.get("since", ""))):
+            qs = qs.filter(timestamp__gte=since)
+        fields = FEED_FIELDS + FEED_BLOBS if request.GET.get("blobs") == "1" else FEED_FIELDS
+        qs = qs.order_by("id").values(*fields)[: limit + 1]
+        return StreamingHttpResponse(self.stream(qs, after, limit), content_type="application/x-ndjson")
+
+    def stream(self, qs, last_id, limit):
+        count = 0
+        complete = True
+        for record in qs.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+            if count == limit:
+                complete = False
+                break
+            yield json_dumpb(record) + b"\n"
+            last_id = record["id"]
+            count += 1
+        yield json_dumpb({"resume": encode_resume_token(last_id), "count": count, "complete": complete}) + b"\n"
+
+
+class RegistrationFileApi(View):
+    """Download a file saved by the `SaveToStorage` strategy (`storage:<name>` references in `Record.files`).
+
+    The content is returned as stored: files of encrypted registrations are still encrypted.
+    """
+
+    def get(self, request, pk, name):
+        try:
+            handle_basic_auth(request)
+        except PermissionDenied:
+            return HttpResponse(status=401)
+        storage = get_files_storage()
+        if not name.startswith(f"records/{pk}/") or ".." in name or not storage.exists(name):
+            raise Http404
+        return ranged_file_response(request, storage.open(name, "rb"), name.rsplit("/", 1)[-1])
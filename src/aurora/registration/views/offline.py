@@ -0,0 +1,133 @@
+import logging
+import zlib
+
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404, HttpResponse, HttpResponseBadRequest
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from aurora.core.utils import json_loads, JSONResponse
+from aurora.counters import live as live_counters
+from aurora.registration.models import Record, Registration, touch_watermark
+
+logger = logging.getLogger(__name__)
+
+CREATED = "created"
+DUPLICATE = "duplicate"
+INVALID = "invalid"
+
+
+class BatchTooLarge(Exception):
+    pass
+
+
+def read_body(request, max_size):
+    """request body, gunzipped if needed. Never reads or inflates more than `max_size` bytes"""
+    body = request.read(max_size + 1)
+    if len(body) > max_size:
+        raise BatchTooLarge()
+    if request.headers.get("Content-Encoding", "").lower() == "gzip":
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        body = decompressor.decompress(body, max_size + 1)
+        if len(body) > max_size or decompressor.unconsumed_tail:
+            raise BatchTooLarge()
+    return body
+
+
+def validate_item(item):
+    """returns (key, data, index1) of a batch item or None if it is not valid"""
+    if not isinstance(item, dict):
+        return None
+    key, data, index1 = item.get("key"), item.get("data"), item.get("index1")
+    if not (isinstance(key, str) and 0 < len(key) <= 64):
+        return None
+    if not (isinstance(data, str) and data):
+        return None
+    if index1 is not None and not (isinstance(index1, str) and len(index1) <= 255):
+        return None
+    return key, data, index1
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class OfflineBatchView(View):
+    """Ingest a batch of encrypted offline (PWA) submissions.
+
+    The body is a JSON array (optionally `Content-Encoding: gzip`) of `{"key": ..., "data": ..., "index1": ...}`,
+    where `key` is generated by the client and `data` is the payload encrypted with the registration public key.
+    Keys already stored are not inserted again, so a batch can be safely retried; the response holds the
+    status of each item (`created`, `duplicate` or `invalid`) so the client can prune its queue.
+    """
+
+    http_method_names = ["post"]
+
+    def get_registration(self):
+        try:
+            return Registration.objects.get(slug=self.kwargs["slug"], active=True, is_pwa_enabled=True)
+        except Registration.DoesNotExist:
+            raise Http404
+
+    def post(self, request, *args, **kwargs):
+        registration = self.get_registration()
+        if registration.protected:
+            if request.user.is_anonymous:
+                return HttpResponse(status=401)
+            if not request.user.has_perm("registration.register", registration):
+                return HttpResponse(status=403)
+        try:
+            items = json_loads(read_body(request, settings.OFFLINE_BATCH_MAX_SIZE))
+        except BatchTooLarge:
+            return HttpResponse(status=413)
+        except (ValueError, zlib.error):
+            return HttpResponseBadRequest("Invalid batch")
+        if not isinstance(items, list):
+            return HttpResponseBadRequest("Invalid batch")
+        if len(items) > settings.OFFLINE_BATCH_MAX_RECORDS:
+            return HttpResponse(status=413)
+
+        registrar = request.user if request.user.is_authenticated else None
+        results = []
+        objs = {}
+        for item in items:
+            if valid := validate_item(item):
+                key, data, index1 = valid
+                results.append({"key": key, "status": CREATED})
+                objs.setdefault(
+                    key,
+                    Record(
+                        registration=registration,
+                        fields=data,
+                        size=len(data),
+                        is_offline=True,
+                        idempotency_key=key,
+                        index1=index1,
+                        registrar=registrar,
+                        remote_ip=request.META.get("REMOTE_ADDR"),
+                    ),
+                )
+            else:
+                results.append({"key": item.get("key") if isinstance(item, dict) else None, "status": INVALID})
+
+        records = Record.objects.filter(registration=registration, idempotency_key__in=objs.keys())
+        with transaction.atomic():
+            # concurrent batches of the same registration are serialized, so `existing` is exact and
+            # only the records inserted here are counted and reported as created
+            Registration.objects.select_for_update(no_key=True).values("pk").get(pk=registration.pk)
+            existing = set(records.values_list("idempotency_key", flat=True))
+            new = [obj for key, obj in objs.items() if key not in existing]
+            Record.objects.bulk_create(new, batch_size=500, ignore_conflicts=True)
+            # ids are not set on the instances when conflicts are ignored
+            ids = dict(records.values_list("idempotency_key", "id"))
+            if new:
+                touch_watermark(registration.pk)
+                transaction.on_commit(lambda: live_counters.increment(registration.pk, count=len(new)))
+
+        seen = existing
+        for result in results:
+            if result["status"] == CREATED:
+                if result["key"] in seen:
+                    result["status"] = DUPLICATE
+                seen.add(result["key"])
+                result["id"] = ids.get(result["key"])
+        return JSONResponse(results, safe=False)
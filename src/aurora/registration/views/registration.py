@@ -6,6 +6,7 @@ import os
 import time
 from functools import wraps
 from hashlib import md5
+from itertools import chain
 from json import JSONDecodeError
 
 from django.conf import settings
@@ -26,14 +27,16 @@ from django.views.generic import TemplateView
 from django.views.generic.edit import FormView
 
 import sentry_sdk
-from constance import config
 from sentry_sdk import set_tag
 
+from aurora.core.images import normalize_images
 from aurora.core.models import FormSet
+from aurora.core.snapshot import get_config
 from aurora.core.utils import get_etag, get_qrcode, has_token, never_ever_cache
 from aurora.core.version_media import VersionMedia
 from aurora.i18n.gettext import gettext as _
-from aurora.registration.models import Record, Registration
+from aurora.registration.models import Record, Registration, Submission
+from aurora.registration.page_cache import get_page_cache
 from aurora.state import state
 from aurora.web.middlewares.admin import is_admin_site, is_public_site
 
@@ -63,6 +66,31 @@ class RegisterCompleteView(TemplateView):
     def registration(self):
         return self.record.registration
 
+    @cached_property
+    def submission(self):
+        try:
+            return Submission.objects.select_related("registration").get(
+                registration__id=self.kwargs["reg"], receipt=self.kwargs["receipt"]
+            )
+        except Submission.DoesNotExist:
+            raise Http404
+
+    def get(self, request, *args, **kwargs):
+        # queued submission (see QueueToDB), the page is reloaded until the record is saved
+        if "receipt" in self.kwargs:
+            submission = self.submission
+            if submission.record_id:
+                return HttpResponseRedirect(
+                    reverse("register-done", args=[submission.registration_id, submission.record_id])
+                )
+            return render(
+                request,
+                "registration/register_pending.html",
+                {"submission": submission, "registration_url": submission.registration.get_absolute_url()},
+                status=202 if submission.status == Submission.PENDING else 200,
+            )
+        return super().get(request, *args, **kwargs)
+
     @cached_property
     def record(self):
         try:
@@ -81,7 +109,7 @@ class RegisterCompleteView(TemplateView):
         return get_qrcode(hashed_url), url
 
     def get_context_data(self, **kwargs):
-        if config.QRCODE:
+        if get_config().QRCODE:
             qrcode, url = self.get_qrcode(self.record)
         else:
             qrcode, url = None, None
@@ -196,22 +224,20 @@ class RegisterView(RegistrationMixin, AdminAccesMixin, FormView):
             )
         response = get_conditional_response(request, str(self.res_etag))
         if response is None:
-            response = super().get(request, *args, **kwargs)
+            if page_cache := get_page_cache(request, self.registration, self.res_etag):
+                response = page_cache.get()
+            if response is None:
+                response = super().get(request, *args, **kwargs)
+                if page_cache:
+                    response = page_cache.set(response)
             response.headers.setdefault("ETag", self.res_etag)
         return response
 
     def get_form_class(self):
         return self.registration.flex_form.get_form_class()
 
-    # @cache_formset
     def get_formsets_classes(self) -> Dict[str, Type[FormSet]]:
-        #     return self.registration.flex_form.get_formsets_classes()
-        formsets = {}
-        # attrs = self.get_form_kwargs().copy()
-        # attrs.pop("prefix")
-        for fs in self.registration.flex_form.formsets.select_related("flex_form", "parent").filter(enabled=True):
-            formsets[fs.name] = fs.get_formset()
-        return formsets
+        return self.registration.flex_form.get_formsets_classes()
 
     def get_initial(self):
         return self.registration.flex_form.get_initial()
@@ -316,6 +342,7 @@ class RegisterView(RegistrationMixin, AdminAccesMixin, FormView):
             return self.form_invalid(form, formsets)
 
     def form_valid(self, form, formsets):
+        normalize_images([form, *chain.from_iterable(formsets.values())])
         data = form.cleaned_data
 
         for name, fs in formsets.items():
@@ -340,7 +367,7 @@ class RegisterView(RegistrationMixin, AdminAccesMixin, FormView):
 
     def form_invalid(self, form, formsets):
         """If the form is invalid, render the invalid form."""
-        if config.LOG_POST_ERRORS:
+        if get_config().LOG_POST_ERRORS:
             with sentry_sdk.push_scope() as scope:
                 scope.set_extra("errors", self.errors)
                 scope.set_extra("form.errors", form.errors)
@@ -363,7 +390,7 @@ class RegisterAuthView(RegistrationMixin, View):
             "debug": settings.DEBUG,
             "env": settings.SMART_ADMIN_HEADER,
             "sentry_dsn": settings.SENTRY_DSN,
-            "cache": config.CACHE_VERSION,
+            "cache": get_config().CACHE_VERSION,
             "has_token": has_token(request),
         }
         return JsonResponse(
@@ -1,39 +1,99 @@
+import time
+
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
-from django.db.models import Q
+from django.core.cache import cache
+from django.db import transaction
 from django.utils import timezone
 
 from ..core.models import Organization, Project
 from .models import AuroraRole
 
+ROLES_KEY = "security:roles:{}:{}"
+ROLES_VERSION_KEY = "security:roles:version"
+
+
+def get_roles_version():
+    return cache.get_or_set(ROLES_VERSION_KEY, time.time_ns, timeout=None)
+
+
+def invalidate_roles():
+    """drop cached roles of all users. Runs again once committed: a concurrent request may cache the old roles"""
+    cache.set(ROLES_VERSION_KEY, time.time_ns(), timeout=None)
+    transaction.on_commit(lambda: cache.set(ROLES_VERSION_KEY, time.time_ns(), timeout=None))
+
+
+def load_roles(user_obj):
+    """returns [(organization_id, project_id, registration_id, valid_from, valid_until, {perms}), ...]"""
+    roles = {}
+    for *scope, app_label, codename in AuroraRole.objects.filter(user=user_obj).values_list(
+        "organization_id",
+        "project_id",
+        "registration_id",
+        "valid_from",
+        "valid_until",
+        "role__permissions__content_type__app_label",
+        "role__permissions__codename",
+    ):
+        perms = roles.setdefault(tuple(scope), set())
+        if codename:
+            perms.add(f"{app_label}.{codename}")
+    return [(*scope, perms) for scope, perms in roles.items()]
+
 
 class AuroraAuthBackend(ModelBackend):
+    """Object permissions granted by `AuroraRole`.
+
+    A role on a Registration also grants its permissions on the Project and on the Organization.
+    Roles are loaded once per user and kept on the user object and in the cache, for ROLES_CACHE_TTL seconds.
+    """
+
+    def get_roles(self, user_obj):
+        if not hasattr(user_obj, "_aurora_roles_cache"):
+            key = ROLES_KEY.format(user_obj.pk, get_roles_version())
+            roles = cache.get(key)
+            if roles is None:
+                roles = load_roles(user_obj)
+                cache.set(key, roles, timeout=settings.ROLES_CACHE_TTL)
+            user_obj._aurora_roles_cache = roles
+        return user_obj._aurora_roles_cache
+
+    def get_permitted_ids(self, user_obj, perm, model):
+        """ids of the `model` (Organization|Project|Registration) objects `user_obj` has `perm` on"""
+        from aurora.registration.models import Registration
+
+        for index, scope in enumerate((Organization, Project, Registration)):
+            if issubclass(model, scope):
+                break
+        else:
+            raise ValueError(f"{model} must be one of Organization|Project|Registration")
+        if not user_obj.is_authenticated:
+            return set()
+        today = timezone.localdate()
+        return {
+            role[index]
+            for role in self.get_roles(user_obj)
+            if role[index] and perm in role[5] and role[3] <= today and (role[4] is None or role[4] >= today)
+        }
+
     def has_perm(self, user_obj, perm, obj=None):
         from aurora.registration.models import Registration
 
         if obj and obj._meta.app_label in ["core", "registration"]:
-            if isinstance(obj, Organization):
-                qs = AuroraRole.objects.filter(organization=obj)
-            elif isinstance(obj, Project):
-                qs = AuroraRole.objects.filter(project=obj)
-            elif isinstance(obj, Registration):
-                qs = AuroraRole.objects.filter(registration=obj)
-            else:
+            if not isinstance(obj, (Organization, Project, Registration)):
                 raise ValueError("{obj} must be one instance of Organization|Project|Registration|")
-            app_label, perm_name = perm.split(".")
-            return (
-                qs.filter(
-                    user=user_obj,
-                    role__permissions__codename=perm_name,
-                    role__permissions__content_type__app_label=app_label,
-                )
-                .filter(valid_from__lte=timezone.now())
-                .filter(Q(valid_until__gte=timezone.now()) | Q(valid_until__isnull=True))
-                .exists()
-            )
+            return obj.pk in self.get_permitted_ids(user_obj, perm, obj.__class__)
 
         return user_obj.is_active and super().has_perm(user_obj, perm, obj=obj)
 
 
+def filter_permitted(user, perm, queryset):
+    """restrict `queryset` (of Organization|Project|Registration) to the objects `user` has `perm` on"""
+    if user.is_active and user.is_superuser:
+        return queryset
+    return queryset.filter(pk__in=AuroraAuthBackend().get_permitted_ids(user, perm, queryset.model))
+
+
 #
 # class RegistrationAuthBackend(ModelBackend):
 #     def has_perm(self, user_obj, perm, obj=None):
@@ -1,8 +1,10 @@
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.contrib.auth.models import Group, Permission
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 
-from aurora.security.models import UserProfile
+from aurora.security.backend import invalidate_roles
+from aurora.security.models import AuroraRole, UserProfile
 
 User = get_user_model()
 
@@ -10,3 +12,17 @@ User = get_user_model()
 @receiver(post_save, sender=User)
 def create_profile(sender, instance, created, **kwargs):
     UserProfile.objects.get_or_create(id=instance.pk, user=instance)
+
+
+@receiver(post_save, sender=AuroraRole)
+@receiver(post_delete, sender=AuroraRole)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def invalidate_roles_cache(sender, **kwargs):
+    invalidate_roles()
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_roles_cache_on_permissions(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_roles()
@@ -4,6 +4,7 @@ from threading import local
 
 class State(local):
     request = None
+    database = None
     data = {"collect_messages": False, "hit_messages": False}
 
     def __init__(self):
@@ -0,0 +1,33 @@
+from aurora.config.celery import app
+
+
+@app.task()
+def export_registration(job_id):
+    from aurora.registration.export import run_export_job
+    from aurora.registration.models import ExportJob
+
+    job = ExportJob.objects.select_related("registration").get(pk=job_id)
+    run_export_job(job)
+    return job.status
+
+
+@app.task()
+def collect_counters(registrations=None):
+    from aurora.counters.models import Counter
+
+    __, result = Counter.objects.collect(registrations=registrations)
+    return {"registration": result["registration"], "records": result["records"], "days": result["days"]}
+
+
+@app.task()
+def flush_live_counters():
+    from aurora.counters import live
+
+    return live.flush()
+
+
+@app.task()
+def process_submissions(registration_id=None):
+    from aurora.registration.submissions import process_submissions
+
+    return process_submissions(registration_id)
@@ -1,12 +1,10 @@
 import logging
-import re
 from urllib.parse import urlparse
 
 from django.conf import settings
 from django.http import HttpResponse
 
-from constance import config
-
+from aurora.core.snapshot import get_config
 from aurora.core.utils import is_root
 
 logger = logging.getLogger(__name__)
@@ -14,12 +12,14 @@ logger = logging.getLogger(__name__)
 
 def is_admin_site(request):
     parts = urlparse(request.build_absolute_uri())
-    return re.compile(config.WAF_ADMIN_ALLOWED_HOSTNAMES).match(parts.netloc)
+    regex = get_config().regex("WAF_ADMIN_ALLOWED_HOSTNAMES")
+    return regex and regex.match(parts.netloc)
 
 
 def is_public_site(request):
     parts = urlparse(request.build_absolute_uri())
-    return re.compile(config.WAF_REGISTRATION_ALLOWED_HOSTNAMES).match(parts.netloc)
+    regex = get_config().regex("WAF_REGISTRATION_ALLOWED_HOSTNAMES")
+    return regex and regex.match(parts.netloc)
 
 
 class AdminSiteMiddleware:
@@ -4,8 +4,7 @@ from django.conf import settings
 from django.http import HttpResponseRedirect
 from django.urls import reverse
 
-from constance import config
-
+from aurora.core.snapshot import get_config
 from aurora.core.utils import has_token
 
 logger = logging.getLogger(__name__)
@@ -20,7 +19,7 @@ class MaintenanceMiddleware:
         Code to be executed for each request before the view (and later
         middleware) are called.
         """
-        if config.MAINTENANCE_MODE:
+        if get_config().MAINTENANCE_MODE:
             url = reverse("maintenance")
             if not (url == request.path or settings.DJANGO_ADMIN_URL in request.path or has_token(request)):
                 return HttpResponseRedirect(url)
@@ -1,13 +1,10 @@
 import logging
-import re
 from enum import IntFlag, unique
 
-from django.utils.functional import cached_property
-
-from constance import config
-from constance.signals import config_updated
 from htmlmin import Minifier
 
+from aurora.core.snapshot import get_config
+
 logger = logging.getLogger(__name__)
 
 
@@ -28,27 +25,20 @@ class HtmlMinMiddleware:
             remove_optional_attribute_quotes=True,
             reduce_empty_attributes=True,
         )
-        config_updated.connect(self.update_config)
 
-    @cached_property
+    @property
     def config_value(self):
-        return int(config.MINIFY_RESPONSE)
+        return int(get_config().MINIFY_RESPONSE)
 
-    @cached_property
+    @property
     def ignore_regex(self):
+        config = get_config()
         if config.MINIFY_IGNORE_PATH:
-            return re.compile(config.MINIFY_IGNORE_PATH)
-
-    def update_config(self, sender, key, old_value, new_value, **kwargs):
-        if hasattr(self, "config_value"):
-            del self.config_value
-
-        if hasattr(self, "ignore_regex"):
-            del self.ignore_regex
+            return config.regex("MINIFY_IGNORE_PATH")
 
     def ignore_path(self, path):
-        if self.ignore_regex:
-            return self.ignore_regex.match(path)
+        if regex := self.ignore_regex:
+            return regex.match(path)
 
     def can_minify(self, request, response):
         return (
@@ -64,7 +54,9 @@ class HtmlMinMiddleware:
         response = self.get_response(request)
         if not response.streaming and len(response.content) < 200:
             return response
+        return self.minify(request, response)
 
+    def minify(self, request, response):
         if self.can_minify(request, response):
             if bool(self.config_value & MinifyFlag.HTML):
                 response.content = self.minifier.minify(response.content.decode()).encode()
@@ -11,8 +11,7 @@ from django.views import View
 from django.views.decorators.cache import cache_control
 from django.views.generic import TemplateView
 
-from constance import config
-
+from aurora.core.snapshot import get_config
 from aurora.core.utils import get_etag, get_qrcode, render
 from aurora.registration.models import Registration
 
@@ -57,13 +56,13 @@ class HomeView(TemplateView):
     template_name = "home.html"
 
     def get_template_names(self):
-        return [config.HOME_TEMPLATE, self.template_name]
+        return [get_config().HOME_TEMPLATE, self.template_name]
 
     def get(self, request, *args, **kwargs):
         res_etag = get_etag(
             request,
-            config.HOME_TEMPLATE,
-            config.CACHE_VERSION,
+            get_config().HOME_TEMPLATE,
+            get_config().CACHE_VERSION,
             os.environ.get("BUILD_DATE", ""),
             get_language(),
             {True: "staff", False: ""}[request.user.is_staff],
@@ -104,7 +103,7 @@ class MaintenanceView(TemplateView):
     template_name = "maintenance.html"
 
     def get(self, request, *args, **kwargs):
-        if not config.MAINTENANCE_MODE:
+        if not get_config().MAINTENANCE_MODE:
             return HttpResponseRedirect("/")
         context = self.get_context_data(**kwargs)
         return self.render_to_response(context)
@@ -2,9 +2,10 @@ from django.contrib.sites.models import Site
 from django.db import router
 from django.template import Origin, TemplateDoesNotExist
 from django.template.loaders.base import Loader as BaseLoader
+from django.template.loaders.cached import Loader as DjangoCachedLoader
 
 from dbtemplates.models import Template
-from dbtemplates.utils.cache import cache, get_cache_key, get_cache_notfound_key, set_and_return
+from dbtemplates.utils.cache import cache, get_cache_key, get_cache_notfound_key, get_templates_version, set_and_return
 
 
 class Loader(BaseLoader):
@@ -50,7 +51,7 @@ class Loader(BaseLoader):
         #   in the cache indicating that queries failed, with the current
         #   timestamp.
         site = Site.objects.get_current()
-        cache_key = get_cache_key(template_name)
+        cache_key = get_cache_key(template_name, site)
         if cache:
             try:
                 backend_template = cache.get(cache_key)
@@ -60,7 +61,7 @@ class Loader(BaseLoader):
                 pass
 
         # Not found in cache, move on.
-        cache_notfound_key = get_cache_notfound_key(template_name)
+        cache_notfound_key = get_cache_notfound_key(template_name, site)
         if cache:
             try:
                 notfound = cache.get(cache_notfound_key)
@@ -82,3 +83,23 @@ class Loader(BaseLoader):
         # Mark as not-found in cache.
         cache.set(cache_notfound_key, "1")
         raise TemplateDoesNotExist(template_name)
+
+
+class CachedLoader(DjangoCachedLoader):
+    """
+    Django's cached loader (compiled templates and negative lookups, per
+    process) dropped whenever a database template is saved or deleted.
+
+    Wraps all the loaders, ie.::
+
+        "loaders": [("dbtemplates.loader.CachedLoader", ["dbtemplates.loader.Loader", ...])]
+    """
+
+    version = None
+
+    def get_template(self, template_name, skip=None):
+        version = get_templates_version()
+        if version != self.version:
+            self.reset()
+            self.version = version
+        return super().get_template(template_name, skip)
@@ -1,9 +1,14 @@
+import time
+
 from django.contrib.sites.models import Site
 from django.core import signals
+from django.db import transaction
 from django.template.defaultfilters import slugify
 
 from dbtemplates.conf import settings
 
+VERSION_KEY = "dbtemplates::version"
+
 
 def get_cache_backend():
     """
@@ -22,13 +27,24 @@ def get_cache_backend():
 cache = get_cache_backend()
 
 
-def get_cache_key(name):
-    current_site = Site.objects.get_current()
+def get_cache_key(name, site=None):
+    current_site = site or Site.objects.get_current()
     return "dbtemplates::%s::%s" % (slugify(name), current_site.pk)
 
 
-def get_cache_notfound_key(name):
-    return get_cache_key(name) + "::notfound"
+def get_templates_version():
+    """global version of the database templates, see `dbtemplates.loader.CachedLoader`"""
+    return cache.get_or_set(VERSION_KEY, time.time_ns, timeout=None)
+
+
+def bump_templates_version():
+    cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+    # again once committed: another process may have loaded the old template in between
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, time.time_ns(), timeout=None))
+
+
+def get_cache_notfound_key(name, site=None):
+    return get_cache_key(name, site) + "::notfound"
 
 
 def remove_notfound_key(instance):
@@ -52,6 +68,7 @@ def add_template_to_cache(instance, **kwargs):
     remove_notfound_key(instance)
     if instance.active:
         cache.set(get_cache_key(instance.name), instance.content)
+    bump_templates_version()
 
 
 def remove_cached_template(instance, **kwargs):
@@ -60,3 +77,4 @@ def remove_cached_template(instance, **kwargs):
     in the database was changed or deleted.
     """
     cache.delete(get_cache_key(instance.name))
+    bump_templates_version()
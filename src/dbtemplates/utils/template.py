@@ -6,7 +6,9 @@ def get_loaders():
 
     loaders = []
     for engine in _engine_list():
-        loaders.extend(engine.engine.template_loaders)
+        for loader in engine.engine.template_loaders:
+            # cached loaders (ie. `dbtemplates.loader.CachedLoader`) wrap the actual ones
+            loaders.extend(getattr(loader, "loaders", [loader]))
     return loaders
 
 
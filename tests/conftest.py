@@ -13,6 +13,10 @@ def pytest_addoption(parser):
         "--selenium", action="store_true", dest="enable_selenium", default=False, help="enable selenium tests"
     )
 
+    parser.addoption(
+        "--benchmark", action="store_true", dest="enable_benchmark", default=False, help="enable benchmark tests"
+    )
+
     parser.addoption(
         "--show-browser",
         "-S",
@@ -27,9 +31,13 @@ def pytest_addoption(parser):
 def configure_settings(settings):
     from cryptography.fernet import Fernet
 
+    from aurora.core.snapshot import reset_snapshot
+
     settings.FERNET_KEY = Fernet.generate_key()
     settings.ADMINS = ["admin@demo.org"]
     settings.CAPTCHA_TEST_MODE = True
+    # constance values restored by the db rollback do not send `config_updated`
+    reset_snapshot()
 
 
 def pytest_configure(config):
@@ -40,8 +48,13 @@ def pytest_configure(config):
     if config.option.show_browser:
         setattr(config.option, "enable_selenium", True)
 
+    disabled = []
     if not config.option.enable_selenium:
-        setattr(config.option, "markexpr", "not selenium")
+        disabled.append("not selenium")
+    if not config.option.enable_benchmark:
+        disabled.append("not benchmark")
+    if disabled:
+        setattr(config.option, "markexpr", " and ".join(disabled))
 
     from django.conf import global_settings, settings
 
@@ -22,7 +22,7 @@ from aurora.core.models import (
     Validator,
 )
 from aurora.counters.models import Counter
-from aurora.registration.models import Record, Registration
+from aurora.registration.models import ExportJob, Record, Registration, Submission
 from aurora.security.models import AuroraRole
 
 factories_registry = {}
@@ -170,6 +170,20 @@ class RecordFactory(AutoRegisterModelFactory):
         model = Record
 
 
+class ExportJobFactory(AutoRegisterModelFactory):
+    registration = factory.SubFactory(RegistrationFactory)
+
+    class Meta:
+        model = ExportJob
+
+
+class SubmissionFactory(AutoRegisterModelFactory):
+    registration = factory.SubFactory(RegistrationFactory)
+
+    class Meta:
+        model = Submission
+
+
 class CounterFactory(AutoRegisterModelFactory):
     registration = factory.SubFactory(RegistrationFactory)
     details = {"hours": {str(x): 10 for x in range(23)}}
@@ -59,6 +59,7 @@ class user_grant_permissions(ContextDecorator):  # noqa
         "_officepermissionchecker",
         "_perm_cache",
         "_dss_acl_cache",
+        "_aurora_roles_cache",
     ]
 
     def __init__(self, user, permissions=None, target: "Registration|Project|Organization" = None):
@@ -1,4 +1,5 @@
 import base64
+import json
 import time
 
 import pytest
@@ -141,3 +142,376 @@ def test_version_lang(django_app, registration, admin_user):
     assert data["protected"] == registration.protected
     assert data["session_id"]
     assert data["auth"]
+
+
+@pytest.mark.django_db
+def test_csv_stream(django_app, simple_form, admin_user, settings):
+    from testutils.factories import RegistrationFactory
+
+    from aurora.registration.models import Record
+
+    reg = RegistrationFactory(name="registration #2", flex_form=simple_form, encrypt_data=False)
+    for i in range(5):
+        Record.objects.create(registration=reg, fields={"first_name": f"first{i}", "last_name": "last"})
+
+    settings.EXPORT_CHUNK_SIZE = 2
+    url = f"/api/registration/{reg.pk}/csv/?download=1&csv-header=1&include=^(first|last)_name$"
+    res = django_app.get(url, user=admin_user)
+    assert res.status_code == 200
+    lines = res.body.decode().splitlines()
+    assert lines[0] == "first_name;last_name"
+    assert lines[1:] == [f"first{i};last" for i in range(5)]
+
+    settings.EXPORT_MAX_RECORDS = 4
+    res = django_app.get(url, user=admin_user, expect_errors=True)
+    assert res.status_code == 400
+
+
+@pytest.mark.django_db
+def test_csv_columns(complex_form, settings):
+    from testutils.factories import RegistrationFactory
+
+    from aurora.registration.export import RecordExport
+    from aurora.registration.models import Record
+
+    settings.EXPORT_SAMPLE_SIZE = 2
+    complex_form.formsets.update(max_num=3)
+    reg = RegistrationFactory(name="registration #16", flex_form=complex_form, encrypt_data=False)
+    formset = [name for name in reg.metadata if name not in ["base", "scripts", "validator"]][0]
+    Record.objects.create(registration=reg, fields={"family_name": "family", formset: "not a list"})
+    Record.objects.create(registration=reg, fields={"removed": "x", "address": {"city": "Rome"}})
+    # keys outside the metadata are only looked for in the sample
+    Record.objects.create(registration=reg, fields={"after_sample": "x"})
+    columns = RecordExport(reg).get_columns()
+    assert {"removed", "address_city", f"{formset}_0_first_name", f"{formset}_2_first_name"} <= set(columns)
+    assert f"{formset}_3_first_name" not in columns
+    assert "after_sample" not in columns
+
+    # unbounded formsets are expanded up to the longest one in the sample
+    complex_form.formsets.update(max_num=None)
+    reg = RegistrationFactory(name="registration #17", flex_form=complex_form, encrypt_data=False)
+    Record.objects.create(registration=reg, fields={formset: [{"first_name": "a"}, {"first_name": "b"}]})
+    columns = RecordExport(reg).get_columns()
+    assert f"{formset}_1_first_name" in columns
+    assert f"{formset}_2_first_name" not in columns
+
+
+@pytest.mark.django_db
+def test_export_job(django_app, simple_form, admin_user, settings, tmp_path, monkeypatch):
+    from testutils.factories import RegistrationFactory
+
+    from aurora.config.celery import app
+    from aurora.registration.models import ExportJob, Record
+
+    settings.MEDIA_ROOT = str(tmp_path)
+    monkeypatch.setattr(app.conf, "CELERY_TASK_ALWAYS_EAGER", True)
+    reg = RegistrationFactory(name="registration #3", flex_form=simple_form, encrypt_data=False, export_allowed=True)
+    for i in range(5):
+        Record.objects.create(registration=reg, fields={"first_name": f"first{i}", "last_name": "last"})
+
+    url = reverse("admin:registration_registration_export_as_csv", args=[reg.pk])
+    res = django_app.get(url, user=admin_user)
+    res.forms[1]["include"] = "^(first|last)_name$"
+    res = res.forms[1].submit("filter").forms[1].submit("enqueue")
+    assert res.status_code == 302
+    job = ExportJob.objects.get(registration=reg)
+    assert job.status == ExportJob.SUCCESS
+    assert (job.processed, job.total, job.progress) == (5, 5, 100)
+
+    download = reverse("admin:registration_exportjob_download", args=[job.pk])
+    res = django_app.get(download, user=admin_user)
+    assert res.body.decode().splitlines() == [f"first{i};last" for i in range(5)]
+    assert res.headers["Accept-Ranges"] == "bytes"
+
+    res = django_app.get(download, user=admin_user, headers={"Range": "bytes=0-10"})
+    assert res.status_code == 206
+    assert res.headers["Content-Range"] == f"bytes 0-10/{job.size}"
+    assert res.body.decode() == "first0;last"
+    res = django_app.get(download, user=admin_user, headers={"Range": f"bytes={job.size}-"}, expect_errors=True)
+    assert res.status_code == 416
+
+
+@pytest.mark.django_db
+def test_parquet(django_app, complex_form, admin_user):
+    import io
+    import zipfile
+
+    import pyarrow.parquet as pq
+    from testutils.factories import RegistrationFactory
+
+    from aurora.registration.models import Record
+
+    reg = RegistrationFactory(name="registration #4", flex_form=complex_form, encrypt_data=False)
+    formset = [name for name in reg.metadata if name not in ["base", "scripts", "validator"]][0]
+    for i in range(3):
+        members = [
+            {"first_name": f"first{i}{j}", "last_name": "last", "date_of_birth": "2000-01-0%s" % (j + 1)}
+            for j in range(i)
+        ]
+        Record.objects.create(registration=reg, fields={"family_name": f"family{i}", formset: members})
+
+    res = django_app.get(f"/api/registration/{reg.pk}/parquet/", user=admin_user)
+    assert res.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(res.body))
+    records = pq.read_table(archive.open(f"{reg.slug}.parquet")).to_pylist()
+    assert [r["family_name"] for r in records] == ["family0", "family1", "family2"]
+    members = pq.read_table(archive.open(f"{reg.slug}_{formset}.parquet"))
+    assert str(members.schema.field("date_of_birth").type) == "date32[day]"
+    assert [(m["record_id"], m["row"], m["first_name"]) for m in members.to_pylist()] == [
+        (records[1]["id"], 0, "first10"),
+        (records[2]["id"], 0, "first20"),
+        (records[2]["id"], 1, "first21"),
+    ]
+
+
+@pytest.mark.django_db
+def test_parquet_job(django_app, complex_form, admin_user, user, settings, tmp_path, monkeypatch):
+    from testutils.factories import RegistrationFactory
+
+    from aurora.config.celery import app
+    from aurora.registration.models import ExportJob, Record
+    from aurora.registration.parquet import ParquetExport
+
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.EXPORT_SYNC_MAX_RECORDS = 1
+    monkeypatch.setattr(app.conf, "CELERY_TASK_ALWAYS_EAGER", True)
+    reg = RegistrationFactory(name="registration #15", flex_form=complex_form, encrypt_data=False)
+    formset = [name for name in reg.metadata if name not in ["base", "scripts", "validator"]][0]
+    for i in range(2):
+        Record.objects.create(
+            registration=reg, fields={"family_name": f"family{i}", formset: [{"date_of_birth": "not a date"}]}
+        )
+    url = f"/api/registration/{reg.pk}/parquet/"
+    assert django_app.get(url, user=user, expect_errors=True).status_code == 403
+
+    write = ParquetExport.write
+    errors = {}
+
+    def spy(self, *args, **kwargs):
+        result = write(self, *args, **kwargs)
+        errors.update(self.errors)
+        return result
+
+    monkeypatch.setattr(ParquetExport, "write", spy)
+    res = django_app.get(url, user=admin_user)
+    assert res.status_code == 202
+    job = ExportJob.objects.get(pk=res.json["job"])
+    assert (job.status, job.processed, job.filename) == (ExportJob.SUCCESS, 2, f"Registration_{reg.slug}_{job.pk}.zip")
+    assert errors == {(formset, "date_of_birth"): 2}
+
+
+@pytest.mark.django_db
+def test_parquet_encrypted(django_app, simple_form, admin_user):
+    from testutils.factories import RegistrationFactory
+
+    reg = RegistrationFactory(name="registration #18", flex_form=simple_form, encrypt_data=False)
+    reg.setup_encryption_keys()
+    reg.add_record({"first_name": "first", "last_name": "last"})
+    res = django_app.get(f"/api/registration/{reg.pk}/parquet/", user=admin_user, expect_errors=True)
+    assert res.status_code == 400
+    assert res.json["message"] == "Parquet export is not available for encrypted registrations"
+
+
+@pytest.mark.django_db
+def test_records_cursor(django_app, simple_form, admin_user):
+    from testutils.factories import RegistrationFactory
+
+    from aurora.registration.models import Record
+
+    reg = RegistrationFactory(name="registration #5", flex_form=simple_form, encrypt_data=False)
+    ids = [Record.objects.create(registration=reg, fields={"first_name": f"first{i}"}).pk for i in range(5)]
+
+    url = f"/api/registration/{reg.pk}/records/?cursor=&size=2"
+    seen = []
+    while url:
+        res = django_app.get(url, user=admin_user)
+        assert "count" not in res.json
+        seen.extend(r["id"] for r in res.json["results"])
+        url = res.json["next"]
+    assert seen == ids
+
+    for cursor in ["xxx", base64.urlsafe_b64encode(b'["not a date", 1]').decode()]:
+        res = django_app.get(
+            f"/api/registration/{reg.pk}/records/?cursor={cursor}", user=admin_user, expect_errors=True
+        )
+        assert res.status_code == 400
+
+    res = django_app.get(f"/api/registration/{reg.pk}/records/count/", user=admin_user)
+    assert res.json == {"count": 5, "estimated": False}
+
+
+@pytest.mark.django_db
+def test_records_feed(django_app, simple_form, monkeypatch):
+    from testutils.factories import RegistrationFactory
+
+    from aurora.registration.models import Record
+
+    reg = RegistrationFactory(name="registration #6", flex_form=simple_form, encrypt_data=False)
+    ids = [Record.objects.create(registration=reg, fields={"first_name": f"first{i}"}).pk for i in range(5)]
+    url = reverse("api-feed", args=[reg.pk])
+    res = django_app.get(url, expect_errors=True)
+    assert res.status_code == 401
+
+    monkeypatch.setattr("aurora.registration.views.api.handle_basic_auth", lambda x: True)
+    seen = []
+    after = ""
+    while True:
+        res = django_app.get(url, {"after": after, "limit": 2})
+        assert res.content_type == "application/x-ndjson"
+        *lines, tail = [json.loads(line) for line in res.text.splitlines()]
+        assert all("storage" not in r for r in lines)
+        seen.extend(r["id"] for r in lines)
+        assert tail["count"] == len(lines)
+        after = tail["resume"]
+        if tail["complete"]:
+            break
+    assert seen == ids
+
+    res = django_app.get(url, {"after": ids[2], "blobs": "1"})
+    lines = [json.loads(line) for line in res.text.splitlines()]
+    assert [r["id"] for r in lines[:-1]] == ids[3:]
+    assert "storage" in lines[0]
+
+    res = django_app.get(url, {"after": "xxx"}, expect_errors=True)
+    assert res.status_code == 400
+
+
+@pytest.mark.django_db(transaction=True)
+def test_records_etag(django_app, simple_form, admin_user):
+    from testutils.factories import RegistrationFactory
+
+    from aurora.registration.models import Record
+
+    reg = RegistrationFactory(name="registration #7", flex_form=simple_form, encrypt_data=False)
+    record = Record.objects.create(registration=reg, fields={"first_name": "first"})
+    for url in [f"/api/registration/{reg.pk}/records/", f"/api/registration/{reg.pk}/csv/?download=1"]:
+        res = django_app.get(url, user=admin_user)
+        etag = res.headers["ETag"]
+        res = django_app.get(url, user=admin_user, headers={"If-None-Match": etag})
+        assert res.status_code == 304
+
+        record.ignored = not record.ignored
+        record.save()
+        res = django_app.get(url, user=admin_user, headers={"If-None-Match": etag})
+        assert res.status_code == 200
+        assert res.headers["ETag"] != etag
+        etag = res.headers["ETag"]
+
+        Record.objects.create(registration=reg, fields={"first_name": "second"})
+        res = django_app.get(url, user=admin_user, headers={"If-None-Match": etag})
+        assert res.status_code == 200
+
+
+@pytest.mark.django_db
+def test_metadata(django_app, complex_form, admin_user):
+    from testutils.factories import FlexFormFieldFactory, RegistrationFactory, ValidatorFactory
+
+    from aurora.core.cache import bump_forms_version
+
+    reg = RegistrationFactory(name="registration #8", flex_form=complex_form)
+    url = f"/api/registration/{reg.pk}/metadata/"
+    res = django_app.get(url)
+    etag = res.headers["ETag"]
+    assert django_app.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    formset = reg.flex_form.formsets.first()
+    FlexFormFieldFactory(flex_form=formset.flex_form, name="nickname")
+    res = django_app.get(url, headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert "nickname" in res.json[formset.name]["fields"]
+
+    # OptionSet/CustomFieldType changes
+    etag = res.headers["ETag"]
+    bump_forms_version()
+    assert django_app.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+    reg.scripts.add(ValidatorFactory(name="script", target="script", code="true"))
+    res = django_app.get(url)
+    assert res.json["scripts"][0]["url"].startswith("http://testserver/")
+
+
+@pytest.mark.django_db
+def test_files_storage(django_app, simple_form, settings, tmp_path, monkeypatch):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    from testutils.factories import RegistrationFactory
+
+    from aurora.registration.storage import FILE_REF, get_files_storage
+
+    STORAGE_STRATEGY = "aurora.registration.strategies.SaveToStorage"
+    settings.MEDIA_ROOT = str(tmp_path)
+    content = bytes(range(256)) * 100
+    reg = RegistrationFactory(
+        name="registration #9", flex_form=simple_form, encrypt_data=False, handler=STORAGE_STRATEGY
+    )
+    record = reg.add_record(
+        {
+            "first_name": "first",
+            "photo": SimpleUploadedFile("photo.png", content),
+            "members": [{"photo": SimpleUploadedFile("photo.png", content)}],
+        }
+    )
+    files = json.loads(bytes(record.files))
+    ref = files["photo"]
+    assert ref.startswith(FILE_REF) and files["members"][0]["photo"] == ref
+    name = ref[len(FILE_REF) :]
+    assert get_files_storage().open(name).read() == content
+
+    res = django_app.get(reverse("api-file", args=[reg.pk, name]), expect_errors=True)
+    assert res.status_code == 401
+    monkeypatch.setattr("aurora.registration.views.api.handle_basic_auth", lambda x: True)
+    assert django_app.get(reverse("api-file", args=[reg.pk, name])).body == content
+    res = django_app.get(reverse("api-file", args=[reg.pk + 1, name]), expect_errors=True)
+    assert res.status_code == 404
+
+    reg = RegistrationFactory(name="registration #10", flex_form=simple_form, handler=STORAGE_STRATEGY)
+    private_pem, __ = reg.setup_encryption_keys()
+    record = reg.add_record({"first_name": "first", "photo": SimpleUploadedFile("photo.png", content)})
+    name = json.loads(decrypt(bytes(record.files), private_pem))["photo"][len(FILE_REF) :]
+    assert get_files_storage().open(name).read() != content
+    assert record.decrypt(private_pem)["photo"].read() == content
+
+    # a new key does not reuse the files encrypted with the old one
+    private_pem, __ = reg.setup_encryption_keys()
+    record = reg.add_record({"first_name": "first", "photo": SimpleUploadedFile("photo.png", content)})
+    assert json.loads(decrypt(bytes(record.files), private_pem))["photo"][len(FILE_REF) :] != name
+    assert record.decrypt(private_pem)["photo"].read() == content
+
+
+@pytest.mark.django_db
+def test_offline_batch(django_app, simple_form):
+    import gzip
+
+    from testutils.factories import RegistrationFactory
+
+    reg = RegistrationFactory(name="registration #11", flex_form=simple_form, is_pwa_enabled=True)
+    url = reverse("register-offline", args=[reg.slug])
+    batch = [
+        {"key": "k1", "data": "encrypted1"},
+        {"key": "k2", "data": "encrypted2", "index1": "x"},
+        {"key": "k1", "data": "encrypted1"},
+        {"key": "", "data": "encrypted3"},
+        "xxx",
+    ]
+    body = gzip.compress(json.dumps(batch).encode())
+    res = django_app.post(url, body, content_type="application/json", headers={"Content-Encoding": "gzip"})
+    assert [r["status"] for r in res.json] == ["created", "created", "duplicate", "invalid", "invalid"]
+    assert res.json[0]["id"] == res.json[2]["id"]
+    record = reg.record_set.get(idempotency_key="k2")
+    assert (record.fields, record.index1, record.is_offline) == ("encrypted2", "x", True)
+
+    # retry after a partial upload
+    batch.append({"key": "k3", "data": "encrypted3"})
+    res = django_app.post(url, json.dumps(batch), content_type="application/json")
+    assert [r["status"] for r in res.json] == ["duplicate", "duplicate", "duplicate", "invalid", "invalid", "created"]
+    assert reg.record_set.count() == 3
+
+    res = django_app.post(url, "{}", content_type="application/json", expect_errors=True)
+    assert res.status_code == 400
+    res = django_app.post(url, gzip.compress(b"[]" * 2), headers={"Content-Encoding": "gzip"}, expect_errors=True)
+    assert res.status_code == 400
+
+    reg.is_pwa_enabled = False
+    reg.save()
+    res = django_app.post(url, json.dumps(batch), content_type="application/json", expect_errors=True)
+    assert res.status_code == 404
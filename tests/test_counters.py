@@ -0,0 +1,128 @@
+import datetime
+
+import pytest
+
+from django.utils import timezone
+
+
+@pytest.mark.django_db
+def test_collect(simple_form):
+    from testutils.factories import RegistrationFactory
+
+    from aurora.counters.models import Counter
+    from aurora.registration.models import Record
+
+    reg1 = RegistrationFactory(name="reg #1", flex_form=simple_form)
+    reg2 = RegistrationFactory(name="reg #2", flex_form=simple_form)
+    archived = RegistrationFactory(name="reg #3", flex_form=simple_form, archived=True)
+    now = timezone.now().replace(hour=10)
+    yesterday = now - datetime.timedelta(days=1)
+
+    def add(reg, ts, num=1):
+        for __ in range(num):
+            Record.objects.filter(pk=Record.objects.create(registration=reg, fields={}).pk).update(timestamp=ts)
+
+    add(reg1, yesterday, 2)
+    add(reg1, now, 3)
+    add(reg2, now.replace(hour=11))
+    add(archived, now)
+
+    __, result = Counter.objects.collect()
+    assert result["records"] == 6
+    assert {(c.registration, c.day, c.records) for c in Counter.objects.all()} == {
+        (reg1, yesterday.date(), 2),
+        (reg1, now.date(), 3),
+        (reg2, now.date(), 1),
+    }
+    assert Counter.objects.get(registration=reg1, day=now.date()).details == {"hours": {"10": 3}}
+
+    # only days from the watermark are counted again, existing counters are updated
+    add(reg1, now.replace(hour=12), 2)
+    __, result = Counter.objects.collect()
+    assert result["records"] == 6
+    c = Counter.objects.get(registration=reg1, day=now.date())
+    assert (c.records, c.details) == (5, {"hours": {"10": 3, "12": 2}})
+    assert Counter.objects.get(registration=reg1, day=yesterday.date()).records == 2
+
+    # the watermark is per registration: collecting reg1 alone does not skip reg2 missing days
+    add(reg2, yesterday)
+    Counter.objects.filter(registration=reg2).delete()
+    Counter.objects.collect(registrations=[reg1.pk])
+    Counter.objects.collect()
+    assert {(c.day, c.records) for c in Counter.objects.filter(registration=reg2)} == {
+        (yesterday.date(), 1),
+        (now.date(), 1),
+    }
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.calls = []
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def hincrby(self, key, field, amount):
+        h = self.data.setdefault(key, {})
+        h[field] = h.get(field, 0) + amount
+        self.calls.append(h[field])
+
+    def hgetall(self, key):
+        self.calls.append({k.encode(): str(v).encode() for k, v in self.data.get(key, {}).items()})
+
+    def expire(self, key, ttl):
+        self.calls.append(True)
+
+    def sadd(self, key, value):
+        self.data.setdefault(key, set()).add(value)
+        self.calls.append(1)
+
+    def smembers(self, key):
+        return {k.encode() for k in self.data.get(key, set())}
+
+    def srem(self, key, *values):
+        self.data[key] -= set(values)
+
+    def delete(self, *keys):
+        for k in keys:
+            self.data.pop(k, None)
+
+    def register_script(self, script):
+        def take(keys, args):
+            values = self.data.pop(keys[0], {})
+            self.srem(args[0], keys[0])
+            return [x for k, v in values.items() for x in (k.encode(), str(v).encode())]
+
+        return take
+
+    def execute(self):
+        ret, self.calls = self.calls, []
+        return ret
+
+
+@pytest.mark.django_db
+def test_live_counters(simple_form, monkeypatch):
+    from testutils.factories import RegistrationFactory
+
+    from aurora.counters import live
+    from aurora.counters.models import Counter
+
+    con = FakeRedis()
+    monkeypatch.setattr(live, "is_enabled", lambda: True)
+    monkeypatch.setattr(live, "get_connection", lambda: con)
+    reg = RegistrationFactory(name="reg #1", flex_form=simple_form)
+    now = timezone.localtime().replace(hour=10)
+    yesterday = now - datetime.timedelta(days=1)
+    for ts in [yesterday, now, now, now.replace(hour=11)]:
+        live.increment(reg.pk, ts)
+    Counter.objects.create(registration=reg, day=now.date(), records=3, details={"hours": {"9": 1, "10": 1}})
+
+    assert live.get_buckets(reg.pk, [now.date()]) == {now.date(): {"10": 2, "11": 1}}
+    assert live.flush() == 1
+    c = Counter.objects.get(registration=reg, day=now.date())
+    assert (c.records, c.details["hours"]) == (4, {"9": 1, "10": 2, "11": 1})
+    # days without counters are left to collect(): a row would move its watermark
+    assert not Counter.objects.filter(registration=reg, day=yesterday.date()).exists()
+    # past days buckets are removed once folded
+    assert live.get_buckets(reg.pk, [yesterday.date(), now.date()]) == {now.date(): {"10": 2, "11": 1}}
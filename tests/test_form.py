@@ -27,3 +27,68 @@ def test_add_formset(db):
     detail = FormFactory(name="Detail")
     fs = master.add_formset(detail)
     assert fs.name == "details"
+
+
+@pytest.mark.django_db
+def test_form_class_cache(db):
+    from django import forms
+
+    from testutils.factories import FormFactory
+
+    from aurora.core.models import FlexForm
+
+    master = FormFactory(name="Master")
+    detail = FormFactory(name="Detail")
+    master.fields.create(label="Name", field_type=forms.CharField, advanced={"kwargs": {"default_value": "abc"}})
+    detail.fields.create(label="Age", field_type=forms.IntegerField)
+    master.add_formset(detail)
+
+    master = FlexForm.objects.get(pk=master.pk)
+    form_class = master.get_form_class()
+    formsets = master.get_formsets_classes()
+    assert master.get_form_class() is form_class
+    assert master.get_formsets_classes() is formsets
+
+    fresh = FlexForm.objects.get(pk=master.pk)
+    assert fresh.get_form_class() is form_class
+    assert fresh.get_initial() == {"name": "abc"}
+
+    master.fields.create(label="Surname", field_type=forms.CharField)
+    master = FlexForm.objects.get(pk=master.pk)
+    assert "surname" in master.get_form_class().base_fields
+
+    detail.fields.create(label="Weight", field_type=forms.IntegerField)
+    formsets = master.get_formsets_classes()
+    assert "weight" in formsets["details"].form.base_fields
+    assert master.get_formsets_classes() is formsets
+
+
+@pytest.mark.django_db
+def test_form_class_cache_dependencies(db):
+    from django import forms
+
+    from testutils.factories import FormFactory, OptionSetFactory
+
+    from aurora.core.models import FlexForm
+
+    colors = OptionSetFactory(name="colors", separator="", data="Red\r\nBlue")
+    master = FormFactory(name="Master")
+    detail = FormFactory(name="Detail")
+    nested = FormFactory(name="Nested")
+    master.fields.create(label="Name", field_type=forms.CharField)
+    master.add_formset(detail)
+    detail.add_formset(nested)
+
+    master = FlexForm.objects.get(pk=master.pk)
+    form_class = master.get_form_class()
+    formsets = master.get_formsets_classes()
+
+    # OptionSet (choices) changes are compiled again
+    colors.data = "Red\r\nBlue\r\nGreen"
+    colors.save()
+    assert master.get_form_class() is not form_class
+    formsets = master.get_formsets_classes()
+
+    # so are nested formsets changes
+    nested.fields.create(label="Weight", field_type=forms.IntegerField)
+    assert master.get_formsets_classes() is not formsets
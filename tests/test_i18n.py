@@ -52,3 +52,38 @@ def test_create_translation(django_app, simple_registration, admin_user):
     # res.form["last_name"] = "last"
     # res = res.form.submit().follow()
     # assert res.context["record"].data["first_name"] == "first"
+
+
+@pytest.mark.django_db
+def test_dictionary_reload(settings, django_capture_on_commit_callbacks):
+    from aurora.i18n.engine import translator
+    from aurora.i18n.models import Message
+
+    settings.I18N_DELTA_RELOAD = True
+    translator["it-it"].reset()
+    with django_capture_on_commit_callbacks(execute=True):
+        msg = Message.objects.create(locale="it-it", msgid="Hello", msgstr="Ciao", draft=False)
+
+    assert translator["it-it"].refresh() == "miss"
+    assert translator["it-it"]["Hello"] == "Ciao"
+    assert translator["it-it"].refresh() == "hit"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        msg.msgstr = "Salve"
+        msg.save()
+        # the serial changes only once the transaction is committed
+        assert translator["it-it"].refresh() == "hit"
+    assert translator["it-it"].refresh() == "reload"
+    assert translator["it-it"]["Hello"] == "Salve"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        msg.msgstr = "Buongiorno"
+        # as loaddata does: `last_modified` is not trusted, the dictionary is fully reloaded
+        msg.save_base(raw=True)
+    assert translator["it-it"].refresh() == "miss"
+    assert translator["it-it"]["Hello"] == "Buongiorno"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        msg.delete()
+    assert translator["it-it"].refresh() == "miss"
+    assert translator["it-it"].messages == {}
@@ -3,7 +3,9 @@ import time
 from datetime import datetime
 from decimal import Decimal
 
-from aurora.core.utils import jsonfy, safe_json
+import pytest
+
+from aurora.core.utils import JSONEncoder, jsonfy, safe_json
 
 LANGUAGES = {
     "english": "first",
@@ -56,3 +58,62 @@ def test_encoding(string):
 
 def test_jsonfy(string):
     assert jsonfy({"string": string}) == {"string": string}
+
+
+def get_record_payload():
+    from pathlib import Path
+
+    image = memoryview((Path(__file__).parent / "data" / "image.png").read_bytes())
+    return {
+        "household": [
+            {
+                "family_name": LANGUAGES["ukrainian"],
+                "size": 4,
+                "income": Decimal("1234.50"),
+                "registered": datetime(2022, 3, 1, 10, 30, 15, 123456),
+                "location": {"lat": 50.4501, "lng": 30.5234},
+            }
+        ],
+        "members": [
+            {
+                "first_name": name,
+                "birth_date": datetime(1980 + i, 1, 1).date(),
+                "disabilities": {"seeing", "hearing"} if i % 2 else set(),
+                "photo": image,
+            }
+            for i, name in enumerate(LANGUAGES[k] for k in ["english", "chinese", "japanese", "arabic"] * 5)
+        ],
+        "consent": True,
+        "notes": None,
+    }
+
+
+def test_fast_encoder_parity(settings):
+    data = {
+        "types": DATA_TYPES,
+        "labels": LANGUAGES,
+        "record": get_record_payload(),
+    }
+    fast = safe_json(data)
+    settings.JSON_FAST_ENCODER = False
+    assert fast.isascii()
+    assert fast == safe_json(data) == json.dumps(data, cls=JSONEncoder, separators=(",", ":"))
+    assert jsonfy(data) == json.loads(fast)
+    # refused by orjson: handled by the stdlib
+    settings.JSON_FAST_ENCODER = True
+    assert jsonfy({1: 2**70}) == {"1": 2**70}
+
+
+@pytest.mark.benchmark
+def test_fast_encoder_benchmark(settings):
+    import timeit
+
+    data = [get_record_payload() for __ in range(10)]
+
+    def bench():
+        return min(timeit.repeat(lambda: jsonfy(data), number=10, repeat=5))
+
+    fast = bench()
+    settings.JSON_FAST_ENCODER = False
+    stdlib = bench()
+    assert fast < stdlib
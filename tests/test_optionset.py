@@ -76,3 +76,59 @@ def test_view_parent(db, django_app):
     assert json.loads(res.content) == {
         "results": [{"id": "1", "parent": "1", "text": "Rome"}, {"id": "2", "parent": "1", "text": "Milan"}]
     }
+
+
+def test_index(db):
+    obj = OptionSet.objects.create(
+        name="locations-4",
+        data="1:1:Rome\r\n2:1:Milan\r\n3:2:Rovigo\r\n4:2:roma nord",
+        separator=":",
+        pk_col=0,
+        parent_col=1,
+        locale="en-us",
+        languages="-,-,en-us",
+    )
+    index = obj.get_index("en-us")
+    assert obj.get_index("en-us") is index
+    assert [r["pk"] for r in index.filter(term="ro")] == ["1", "3", "4"]
+    assert [r["pk"] for r in index.filter(term="ROM")] == ["1", "4"]
+    assert [r["pk"] for r in index.filter(parent="2")] == ["3", "4"]
+    assert [r["pk"] for r in index.filter(term="ro", parent="2")] == ["3", "4"]
+    assert [r["pk"] for r in index.filter(pk="2")] == ["2"]
+    assert index.filter(term="x") == []
+
+    obj.save()
+    assert obj.get_index("en-us") is not index
+
+
+def test_view_pagination(db, django_app):
+    obj = OptionSet.objects.create(
+        name="locations-5", data="\r\n".join(f"City {i}" for i in range(5)), locale="en-us", languages="en-us"
+    )
+    url = obj.get_api_url()
+    res = django_app.get(url, params={"q": "city", "limit": 2})
+    assert res.json == {
+        "results": [
+            {"id": "city 0", "parent": None, "text": "City 0"},
+            {"id": "city 1", "parent": None, "text": "City 1"},
+        ],
+        "pagination": {"more": True},
+    }
+    res = django_app.get(url, params={"q": "city", "limit": 2, "page": 3})
+    assert res.json == {"results": [{"id": "city 4", "parent": None, "text": "City 4"}]}
+    res = django_app.get(url, params={"q": "city", "limit": 0})
+    assert len(res.json["results"]) == 1
+    res = django_app.get(url, params={"q": "city", "limit": "all"}, expect_errors=True)
+    assert res.status_code == 400
+
+
+def test_view_no_pagination(db, django_app):
+    obj = OptionSet.objects.create(
+        name="locations-150", data="\r\n".join(f"City {i}" for i in range(150)), locale="en-us", languages="en-us"
+    )
+    res = django_app.get(obj.get_api_url())
+    assert len(res.json["results"]) == 150
+    assert "pagination" not in res.json
+    res = django_app.get(obj.get_api_url(), params={"page": 1})
+    assert len(res.json["results"]) == 100
+    assert res.json["pagination"] == {"more": True}
@@ -37,3 +37,36 @@ def test_roles(db, user, simple_registration: Registration):
         assert not s.has_perm(user, "counters.view_counter", simple_registration)
         assert not s.has_perm(user, "counters.view_counter", simple_registration.project)
         assert s.has_perm(user, "counters.view_counter", simple_registration.project.organization)
+
+
+def test_roles_cache(db, user, simple_registration: Registration, django_assert_num_queries):
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    from aurora.security.backend import filter_permitted
+    from aurora.security.models import AuroraRole
+
+    s = AuroraAuthBackend()
+    project = simple_registration.project
+    with user_grant_permissions(user, "counters.view_counter", simple_registration):
+        with django_assert_num_queries(1):
+            assert s.has_perm(user, "counters.view_counter", simple_registration)
+            assert s.has_perm(user, "counters.view_counter", project)
+            assert not s.has_perm(user, "registration.register", simple_registration)
+        # shared cache
+        del user._aurora_roles_cache
+        with django_assert_num_queries(0):
+            assert s.has_perm(user, "counters.view_counter", simple_registration)
+        assert list(filter_permitted(user, "counters.view_counter", Registration.objects.all())) == [
+            simple_registration
+        ]
+        assert not filter_permitted(user, "registration.register", Registration.objects.all()).exists()
+
+        AuroraRole.objects.filter(user=user).update(valid_until=timezone.localdate() - timedelta(days=1))
+        AuroraRole.objects.get(user=user).save()
+        del user._aurora_roles_cache
+        assert not s.has_perm(user, "counters.view_counter", simple_registration)
+    del user._aurora_roles_cache
+    assert not AuroraRole.objects.filter(user=user).exists()
+    assert not s.has_perm(user, "counters.view_counter", project)
@@ -5,7 +5,7 @@ import pytest
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 from aurora.core.utils import apply_nested, extract_content, flatten_dict, merge_data, namify, underscore_to_camelcase
-from aurora.registration.storage import Router
+from aurora.registration.storage import encode_file, Router
 
 
 @pytest.mark.parametrize("v", ["underscore_to_camelcase", "underscore to camelcase", "underscore__to_camelcase"])
@@ -65,6 +65,26 @@ def test_storage_router_nested2():
     assert extract_content(r.compress(fields, files)) == extract_content(data)
 
 
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 1000, 3 * 1024])
+def test_storage_encode_file(chunk_size):
+    content = bytes(range(256)) * 10
+    assert encode_file(SimpleUploadedFile("f", content), chunk_size) == base64.b64encode(content)
+
+
+def test_storage_router_split():
+    c = base64.b64encode(b"content")
+    data = {
+        "name": "pippo",
+        "empty": "",
+        "photos": [SimpleUploadedFile("a", b"content"), SimpleUploadedFile("b", b"content")],
+        "childs": [{"file": SimpleUploadedFile("c", b"content"), "age": 1}, {"age": 2}],
+    }
+    fields, files, size = Router().split(data)
+    assert fields == {"name": "pippo", "childs": [{"age": 1}, {"age": 2}]}
+    assert files == {"photos": [c, c], "childs": [{"file": c}, {}]}
+    assert size == 3 * len(c)
+
+
 def test_merge():
     d1 = {"a": "1", "b": 2, "d": [{"bb": 3}]}
     d2 = {"c": [1], "d": [{"aa": 2}], "aa": {"vv": 1}}
@@ -117,3 +137,197 @@ def test_flatten_dict4():
         "individuals_0_lang": "russian,hungarian",
         "individuals_0_label": "Name",
     }
+
+
+@pytest.mark.django_db
+def test_read_only_router(monkeypatch, settings):
+    from django.db import connection
+
+    from aurora.core import db
+    from aurora.counters.models import Counter
+
+    router = db.ReadOnlyRouter()
+    settings.READ_ONLY_MAX_LAG = 10
+    monkeypatch.setattr(db, "replica_lag", lambda: 0)
+    # tests run inside a transaction, reads must stay on `default`
+    with db.read_only():
+        assert router.db_for_read(Counter) is None
+    assert db.get_read_db() == "default"
+
+    monkeypatch.setattr(connection, "in_atomic_block", False)
+    assert db.get_read_db() == "read_only"
+    with db.read_only():
+        assert router.db_for_read(Counter) == "read_only"
+    assert router.db_for_read(Counter) is None
+    assert router.db_for_write(Counter) == "default"
+
+    monkeypatch.setattr(db, "replica_lag", lambda: 20)
+    assert db.get_read_db() == "default"
+    assert db.get_read_db(max_lag=30) == "read_only"
+
+
+def test_normalize_images():
+    import io
+
+    from django import forms
+
+    from PIL import Image
+
+    from aurora.core.images import normalize_images
+
+    def image(fmt, **kwargs):
+        buf = io.BytesIO()
+        Image.new("RGB", (3000, 2000), "red").save(buf, format=fmt, **kwargs)
+        return buf.getvalue()
+
+    exif = Image.Exif()
+    exif[0x0112] = 6  # orientation: rotate 90
+    photo = "data:image/png;base64," + base64.b64encode(image("PNG")).decode()
+
+    class Form(forms.Form):
+        photo = forms.CharField()
+        picture = forms.FileField()
+        document = forms.FileField()
+
+    form = Form(
+        {"photo": photo},
+        {
+            "picture": SimpleUploadedFile("picture.jpeg", image("JPEG", exif=exif)),
+            "document": SimpleUploadedFile("doc.txt", b"text"),
+        },
+    )
+    assert form.is_valid()
+    form.fields["photo"].smart_attrs = {"image": {"max_width": 300, "format": "webp"}}
+    form.fields["picture"].smart_attrs = {"image": True}
+    form.fields["document"].smart_attrs = {"image": True}
+    normalize_images([form])
+
+    header, data = form.cleaned_data["photo"].split(",", 1)
+    assert header == "data:image/webp;base64"
+    assert Image.open(io.BytesIO(base64.b64decode(data))).size == (300, 200)
+    picture = form.cleaned_data["picture"]
+    assert picture.name == "picture.jpg"
+    with Image.open(picture) as img:
+        assert img.size == (1067, 1600)
+        assert not img.getexif()
+    assert form.cleaned_data["document"].read() == b"text"
+
+
+def test_two_tier_cache(monkeypatch):
+    from django.core.cache.backends.locmem import LocMemCache
+
+    from aurora.core.cache import cache_stats, TwoTierCache
+
+    published = []
+
+    class FakeRedis:
+        def publish(self, channel, message):
+            published.append((channel, message))
+
+    cache = TwoTierCache("remote", {"OPTIONS": {"MAX_ENTRIES": 2, "CHANNEL": "test:invalidate"}})
+    cache.remote = remote = LocMemCache("two-tier", {})
+    monkeypatch.setattr(cache, "has_channel", lambda: True)
+    monkeypatch.setattr(cache, "get_connection", lambda: FakeRedis())
+    monkeypatch.setattr(cache, "listen", lambda: None)
+    cache.ensure_listener()
+    tier = cache.tier
+
+    # not subscribed: nothing is kept locally
+    cache.set("a:1", {"x": 1})
+    assert cache.get("a:1") == {"x": 1}
+    assert not tier.entries
+    tier.active = True
+
+    key = cache.make_key("a:1")
+    assert published == [("test:invalidate", f"{tier.node}|{key}")]
+    value = cache.get("a:1")
+    value["x"] = 2
+    assert cache.get("a:1") == {"x": 1}
+    assert key in tier.entries
+
+    # written by another process
+    remote.set("a:1", {"x": 3})
+    assert cache.get("a:1") == {"x": 1}
+    tier.on_message(f"{tier.node}|{key}".encode())
+    assert cache.get("a:1") == {"x": 1}
+    tier.on_message(f"other|{key}".encode())
+    assert cache.get("a:1") == {"x": 3}
+
+    cache.set_many({"b:1": 1, "b:2": 2})
+    assert cache.get_many(["a:1", "b:1", "b:2", "b:3"]) == {"a:1": {"x": 3}, "b:1": 1, "b:2": 2}
+    assert len(tier.entries) == 2
+    cache.delete("b:1")
+    assert cache.get("b:1") is None
+    assert cache.get_or_set("b:1", 10) == 10
+
+    stats = cache_stats()["test:invalidate"]
+    assert (stats["a"]["local"], stats["a"]["remote"], stats["a"]["missing"]) == (4, 3, 0)
+    assert stats["b"]["missing"] == 3
+
+
+def test_constance_snapshot(db, settings, django_assert_num_queries):
+    from constance import config
+
+    from aurora.core import snapshot
+
+    settings.CONSTANCE_SNAPSHOT_INTERVAL = 60
+    assert snapshot.get_config().MAINTENANCE_MODE is False
+    with django_assert_num_queries(0):
+        assert snapshot.get_config().regex("WAF_REGISTRATION_ALLOWED_HOSTNAMES").match("localhost")
+    with pytest.raises(AttributeError):
+        snapshot.get_config().MAINTENANCE_MODE = True
+
+    # changed by this worker
+    config.MINIFY_IGNORE_PATH = "/api/.*"
+    assert snapshot.get_config().regex("MINIFY_IGNORE_PATH").match("/api/x/")
+
+    # changed by another worker: seen once the version is checked
+    cfg = snapshot.get_config()
+    config.MAINTENANCE_MODE = True
+    snapshot._snapshot = cfg
+    assert snapshot.get_config().MAINTENANCE_MODE is False
+    settings.CONSTANCE_SNAPSHOT_INTERVAL = 0
+    assert snapshot.get_config().MAINTENANCE_MODE is True
+    config.MAINTENANCE_MODE = False
+
+
+def test_cached_template_loader(db, django_assert_num_queries):
+    from django.template import engines, TemplateDoesNotExist
+
+    from dbtemplates.models import Template
+
+    engine = engines["django"]
+    Template.objects.create(name="test_cached_loader.html", content="v1")
+    assert engine.get_template("test_cached_loader.html").render() == "v1"
+    with pytest.raises(TemplateDoesNotExist):
+        engine.get_template("test_cached_loader_missing.html")
+    with django_assert_num_queries(0):
+        assert engine.get_template("test_cached_loader.html").render() == "v1"
+        with pytest.raises(TemplateDoesNotExist):
+            engine.get_template("test_cached_loader_missing.html")
+
+    Template.objects.create(name="test_cached_loader_missing.html", content="found")
+    assert engine.get_template("test_cached_loader_missing.html").render() == "found"
+    tpl = Template.objects.get(name="test_cached_loader.html")
+    tpl.content = "v2"
+    tpl.save()
+    assert engine.get_template("test_cached_loader.html").render() == "v2"
+    tpl.delete()
+    with pytest.raises(TemplateDoesNotExist):
+        engine.get_template("test_cached_loader.html")
+
+
+def test_normalize_decompression_bomb(monkeypatch):
+    import io
+
+    from PIL import Image
+
+    from aurora.core.images import DEFAULTS, normalize
+
+    buf = io.BytesIO()
+    Image.new("RGB", (100, 100), "red").save(buf, format="PNG")
+    # twice the limit is refused by Pillow
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100 * 100 // 2 - 1)
+    upload = SimpleUploadedFile("bomb.png", buf.getvalue())
+    assert normalize(upload, DEFAULTS) is upload
+    assert upload.read() == buf.getvalue()
@@ -119,3 +119,42 @@ def test_form_fail_default_message(db, code):
 def test_form_success_custom_message(db, code):
     v = Validator(code=code, active=True)
     v.validate({"last_name": "ABC"})
+
+
+def test_pool_reuse_context(db):
+    from aurora.core.jspool import ContextPool
+
+    pool = ContextPool(f"{Validator.CONSOLE};{Validator.LIB};", size=1, max_memory=0, timeout=1)
+    assert pool.run((1, 1), "value > 1", "22") is True
+    assert pool.run((1, 1), "value > 1", "0") is False
+    assert pool.run(None, "var a = value; a.length", '"abc"') == 3
+    assert pool.stats["created"] == 1
+
+
+def test_pool_reset_tainted(db):
+    from aurora.core.jspool import ContextPool
+
+    pool = ContextPool(f"{Validator.CONSOLE};{Validator.LIB};", size=1, max_memory=0, timeout=1)
+    ctx = pool.acquire()
+    ctx.tainted = True
+    pool.release(ctx)
+    assert pool.stats["reset"] == 1
+    assert pool.run(None, "true", "1") is True
+    assert pool.stats["created"] == 2
+
+
+def test_pool_discard_polluted(db):
+    from aurora.core.jspool import ContextPool
+
+    pool = ContextPool(f"{Validator.CONSOLE};{Validator.LIB};", size=1, max_memory=0, timeout=1)
+    assert pool.run((1, 1), "leak = value; true", "1") is True
+    assert pool.run(None, "typeof leak", "1") == "undefined"
+    assert pool.stats["reset"] == 0
+    with pytest.raises(Exception):
+        pool.run(None, "throw 'error'", "1")
+    assert pool.stats["reset"] == 0
+    assert pool.run(None, "_.is_child = null; true", "1") is True
+    assert pool.stats["reset"] == 1
+    assert pool.run(None, "TODAY.setFullYear(1970); true", "1") is True
+    assert pool.stats["reset"] == 2
+    assert pool.run(None, "_.is_child !== null && TODAY.getFullYear() > 1970", "1") is True
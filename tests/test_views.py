@@ -453,3 +453,169 @@ def test_register_protected_registration(django_app, user, protected_registratio
     with user_grant_permissions(user, "registration.register", protected_registration):
         res = django_app.get(url, user=user.username)
     assert res.status_code == 200
+
+
+@pytest.mark.django_db
+def test_register_queued(django_app, simple_form, django_capture_on_commit_callbacks, monkeypatch):
+    from testutils.factories import RegistrationFactory
+
+    from aurora import tasks
+    from aurora.registration.models import Submission
+    from aurora.registration.submissions import process_submissions
+
+    def broker_down(*args, **kwargs):
+        raise ConnectionError("broker down")
+
+    monkeypatch.setattr(tasks.process_submissions, "delay", broker_down)
+
+    reg = RegistrationFactory(
+        name="registration #12",
+        flex_form=simple_form,
+        encrypt_data=True,
+        unique_field_path="last_name",
+        handler="aurora.registration.strategies.QueueToDB",
+    )
+    url = reg.get_absolute_url()
+    receipts = []
+    for first_name in ["first", "second"]:
+        res = django_app.get(url)
+        res.form["first_name"] = first_name
+        res.form["last_name"] = "last"
+        # the submission is staged even if the task can not be enqueued
+        with django_capture_on_commit_callbacks(execute=True):
+            res = res.form.submit()
+        receipts.append(res.location)
+        res = res.follow(status=202)
+        assert res.context["submission"].status == Submission.PENDING
+    assert not reg.record_set.exists()
+
+    assert process_submissions(reg.pk) == 1
+    res = django_app.get(receipts[0]).follow()
+    record = res.context["record"]
+    assert record.decrypt(secret=None)["first_name"] == "first"
+    assert record.timestamp >= record.submission.created
+    assert not record.submission.payload
+
+    # unique_field collision, the payload is kept
+    res = django_app.get(receipts[1])
+    assert res.context["submission"].status == Submission.FAILURE
+    assert res.context["submission"].payload
+
+
+@pytest.mark.django_db
+def test_register_queued_invalid(simple_form, django_capture_on_commit_callbacks):
+    from testutils.factories import RegistrationFactory
+
+    from aurora.registration.models import Submission
+    from aurora.registration.strategies import QueueToDB
+    from aurora.registration.submissions import process_submissions
+
+    reg = RegistrationFactory(name="registration #19", flex_form=simple_form, encrypt_data=False)
+    with django_capture_on_commit_callbacks(execute=False):
+        # index1 too long for the column
+        QueueToDB(reg).save({"first_name": "first", "index1": "x" * 300})
+        QueueToDB(reg).save({"first_name": "second"})
+
+    assert process_submissions(reg.pk) == 1
+    assert reg.record_set.get().index1 is None
+    failed = Submission.objects.get(registration=reg, status=Submission.FAILURE)
+    assert failed.error and failed.payload
+    assert not Submission.objects.filter(status=Submission.PENDING).exists()
+
+
+@pytest.mark.django_db
+def test_register_queued_public_key(rsa_encrypted_registration, django_capture_on_commit_callbacks):
+    from aurora.core.crypto import Crypto
+    from aurora.registration.models import Submission
+    from aurora.registration.strategies import QueueToDB
+    from aurora.registration.submissions import process_submissions
+
+    reg = rsa_encrypted_registration
+    with django_capture_on_commit_callbacks(execute=False):
+        QueueToDB(reg).save({"first_name": "first", "last_name": "last"})
+    submission = Submission.objects.get(registration=reg)
+    # the server key alone can not read the staged data
+    assert b"first" not in Crypto().decrypt_bytes(bytes(submission.payload))
+
+    assert process_submissions(reg.pk) == 1
+    record = reg.record_set.get()
+    assert record.decrypt(reg._private_pem)["first_name"] == "first"
+
+
+@pytest.mark.django_db
+def test_save_counters(simple_form):
+    from testutils.factories import RegistrationFactory
+
+    from aurora.registration.strategies import SaveToDB
+
+    reg = RegistrationFactory(name="registration #14", flex_form=simple_form, encrypt_data=False)
+    record = SaveToDB(reg).save({"first_name": "first", "counters": {"members": 0, "children": 2}, "index1": "x"})
+    assert record.counters == {"members": 0, "children": 2}
+    assert record.index1 == "x"
+
+
+@pytest.mark.django_db
+def test_register_page_cache(django_app, simple_form, monkeypatch):
+    from testutils.factories import RegistrationFactory
+
+    from aurora.core.cache import bump_forms_version
+    from aurora.i18n.handlers import bump_serial
+    from aurora.registration.views.registration import RegisterView
+
+    reg = RegistrationFactory(name="registration #13", flex_form=simple_form, encrypt_data=False)
+    url = reg.get_absolute_url()
+    page = django_app.get(url).body
+    gzipped = django_app.get(url, headers={"Accept-Encoding": "gzip"})
+    # webtest decodes the body, the weak ETag tells it was compressed
+    assert gzipped.headers["ETag"].startswith("W/")
+    assert b'id="registrationForm"' in gzipped.body
+
+    def fail(*args, **kwargs):
+        raise AssertionError("page not served from the cache")
+
+    with monkeypatch.context() as m:
+        m.setattr(RegisterView, "get_form_class", fail)
+        assert django_app.get(url).body == page
+        res = django_app.get(url, headers={"Accept-Encoding": "gzip"})
+        assert res.headers["ETag"] == gzipped.headers["ETag"]
+        assert res.body == gzipped.body
+        # I18N_SESSION (collect mode) is never served from the cache
+        with pytest.raises(AssertionError):
+            django_app.get(url, headers={"I18N_SESSION": "abc"})
+
+    for bump in (bump_forms_version, bump_serial):
+        bump()
+        with monkeypatch.context() as m:
+            m.setattr(RegisterView, "get_form_class", fail)
+            # options or translations changed, the page is rendered again
+            with pytest.raises(AssertionError):
+                django_app.get(url)
+
+    reg.title = "Updated title"
+    reg.save()
+    res = django_app.get(reg.get_absolute_url())
+    assert "Updated title" in res.text
+
+
+@pytest.mark.django_db
+def test_register_page_cache_child_form(django_app, complex_form, monkeypatch):
+    from testutils.factories import FlexFormFieldFactory, RegistrationFactory
+
+    from aurora.registration.views.registration import RegisterView
+
+    reg = RegistrationFactory(name="registration #17", flex_form=complex_form, encrypt_data=False)
+    url = reg.get_absolute_url()
+    django_app.get(url)
+
+    formset = reg.flex_form.formsets.first()
+    FlexFormFieldFactory(flex_form=formset.flex_form, name="nickname")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("page not served from the cache")
+
+    with monkeypatch.context() as m:
+        m.setattr(RegisterView, "get_form_class", fail)
+        # the child form changed, the page is rendered again
+        with pytest.raises(AssertionError):
+            django_app.get(url)
+    assert "nickname" in django_app.get(url).text